@@ -0,0 +1,226 @@
+import json
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+
+import numpy as np
+
+from app import cache
+from app.knowledge.config import knowledge_version
+
+# Cosine similarity above which two DOCS questions share an answer
+ANSWER_CACHE_THRESHOLD = float(os.getenv("ANSWER_CACHE_THRESHOLD", "0.95"))
+# Max entries per intent scope (least recently used are evicted first)
+ANSWER_CACHE_SIZE = int(os.getenv("ANSWER_CACHE_SIZE", "500"))
+
+# Seconds an answer stays valid, per intent. 0 bypasses the cache: order and
+# revenue data change under us, and rates already have their own cache.
+_DEFAULT_TTLS = {"ORDER": 0, "REVENUE": 0, "CURRENCY": 0, "EXCHANGE": 0, "DOCS": 24 * 60 * 60}
+ANSWER_CACHE_TTLS = {
+    intent: int(os.getenv(f"ANSWER_CACHE_TTL_{intent}", default))
+    for intent, default in _DEFAULT_TTLS.items()
+}
+
+# Only DOCS answers are matched by meaning. "order 5" and "order 6" embed
+# almost identically, so every other intent matches on its exact arguments.
+SEMANTIC_INTENTS = {"DOCS"}
+
+
+@dataclass
+class _Entry:
+    answer: str
+    expires_at: float
+    vector: np.ndarray = None
+
+
+class _Scope:
+    """LRU of answers for one intent, with a vector matrix for similarity search."""
+
+    def __init__(self, semantic: bool):
+        self.semantic = semantic
+        self.entries = OrderedDict()
+        self.version = knowledge_version()
+        self._matrix = None
+        self._keys = []
+
+    def _search(self, vector: np.ndarray):
+        if self._matrix is None:
+            self._keys = [k for k, e in self.entries.items() if e.vector is not None]
+            self._matrix = np.stack([self.entries[k].vector for k in self._keys]) if self._keys else None
+        if self._matrix is None:
+            return None
+        scores = self._matrix @ vector
+        best = int(np.argmax(scores))
+        return self._keys[best] if scores[best] >= ANSWER_CACHE_THRESHOLD else None
+
+    def get(self, key: str, vector):
+        if key not in self.entries and self.semantic and vector is not None:
+            key = self._search(vector)
+        entry = self.entries.get(key) if key is not None else None
+        if entry is None:
+            return None
+        if entry.expires_at <= time.time():
+            self.remove(key)
+            return None
+        self.entries.move_to_end(key)
+        return entry.answer
+
+    def put(self, key: str, entry: _Entry):
+        self.entries[key] = entry
+        self.entries.move_to_end(key)
+        while len(self.entries) > ANSWER_CACHE_SIZE:
+            self.entries.popitem(last=False)
+        self._matrix = None
+
+    def remove(self, key: str):
+        self.entries.pop(key, None)
+        self._matrix = None
+
+
+_lock = threading.Lock()
+_scopes: dict[str, _Scope] = {}
+_stats = {"hits": 0, "misses": 0, "shared_hits": 0}
+
+# Exact-question answers are also kept on the shared backend (CACHE_BACKEND),
+# so one worker's answer serves the others; similarity search stays local
+_shared = {
+    intent: cache.shared_cache(f"answers.{intent}", ttl=ttl)
+    for intent, ttl in ANSWER_CACHE_TTLS.items()
+    if ttl > 0
+}
+
+
+def enabled(intent: str) -> bool:
+    return ANSWER_CACHE_TTLS.get(intent, 0) > 0
+
+
+def is_semantic(intent: str) -> bool:
+    return intent in SEMANTIC_INTENTS
+
+
+def _key(question: str, args: dict) -> str:
+    normalized = " ".join(re.sub(r"[^\w\s]", " ", question.lower()).split())
+    return f"{normalized}|{json.dumps(args or {}, sort_keys=True)}"
+
+
+def _normalize(vector) -> np.ndarray:
+    vector = np.asarray(vector, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+def _scope(intent: str) -> _Scope:
+    scope = _scopes.get(intent)
+    if scope is None:
+        scope = _scopes[intent] = _Scope(semantic=is_semantic(intent))
+    # DOCS answers are only as good as the index they came from
+    if scope.semantic and scope.version != knowledge_version():
+        scope = _scopes[intent] = _Scope(semantic=True)
+    return scope
+
+
+def _shared_key(intent: str, key: str) -> str:
+    # DOCS answers are only as good as the index they came from
+    return f"{knowledge_version()}|{key}" if is_semantic(intent) else key
+
+
+def _lookup_local(intent: str, question: str, args: dict, vector):
+    vector = _normalize(vector) if vector is not None else None
+    key = _key(question, args)
+    with _lock:
+        return key, vector, _scope(intent).get(key, vector)
+
+
+def _found(intent: str, key: str, vector, answer, shared: bool):
+    """Count the lookup; an answer from the shared tier is kept locally too."""
+    if answer is not None and shared:
+        _put_local(intent, key, answer, vector)
+    with _lock:
+        _stats["hits" if answer is not None else "misses"] += 1
+        if answer is not None and shared:
+            _stats["shared_hits"] += 1
+    return answer
+
+
+def lookup(intent: str, question: str, args: dict = None, vector=None):
+    """Cached answer for this question, or None. Pass the question embedding for semantic scopes."""
+    if not enabled(intent):
+        return None
+    key, vector, answer = _lookup_local(intent, question, args, vector)
+    shared = _shared.get(intent)
+    if answer is None and shared is not None:
+        return _found(intent, key, vector, shared.get(_shared_key(intent, key)), shared=True)
+    return _found(intent, key, vector, answer, shared=False)
+
+
+async def alookup(intent: str, question: str, args: dict = None, vector=None):
+    """Async version of lookup, which keeps the event loop free while the shared tier answers."""
+    if not enabled(intent):
+        return None
+    key, vector, answer = _lookup_local(intent, question, args, vector)
+    shared = _shared.get(intent)
+    if answer is None and shared is not None:
+        return _found(intent, key, vector, await shared.aget(_shared_key(intent, key)), shared=True)
+    return _found(intent, key, vector, answer, shared=False)
+
+
+def _put_local(intent: str, key: str, answer: str, vector):
+    entry = _Entry(answer=answer, expires_at=time.time() + ANSWER_CACHE_TTLS[intent], vector=vector)
+    with _lock:
+        _scope(intent).put(key, entry)
+
+
+def _store_local(intent: str, question: str, answer: str, args: dict, vector) -> str:
+    key = _key(question, args)
+    _put_local(intent, key, answer, _normalize(vector) if vector is not None else None)
+    return key
+
+
+def store(intent: str, question: str, answer: str, args: dict = None, vector=None):
+    if not enabled(intent):
+        return
+    key = _store_local(intent, question, answer, args, vector)
+    shared = _shared.get(intent)
+    if shared is not None:
+        shared.set(_shared_key(intent, key), answer)
+
+
+async def astore(intent: str, question: str, answer: str, args: dict = None, vector=None):
+    if not enabled(intent):
+        return
+    key = _store_local(intent, question, answer, args, vector)
+    shared = _shared.get(intent)
+    if shared is not None:
+        await shared.aset(_shared_key(intent, key), answer)
+
+
+def invalidate(intent: str = None):
+    """Drop cached answers for one intent, or for all of them, in every worker sharing the backend."""
+    with _lock:
+        if intent is None:
+            _scopes.clear()
+        else:
+            _scopes.pop(intent, None)
+    for name, shared in _shared.items():
+        if shared is not None and intent in (None, name):
+            shared.invalidate()
+
+
+def stats() -> dict:
+    with _lock:
+        hits, misses, shared_hits = _stats["hits"], _stats["misses"], _stats["shared_hits"]
+        sizes = {intent: len(scope.entries) for intent, scope in _scopes.items()}
+    total = hits + misses
+    return {
+        "hits": hits,
+        "misses": misses,
+        "shared_hits": shared_hits,
+        "hit_ratio": round(hits / total, 4) if total else 0.0,
+        "entries": sizes,
+        "ttls": ANSWER_CACHE_TTLS,
+        "threshold": ANSWER_CACHE_THRESHOLD,
+        "shared": {intent: shared.stats() for intent, shared in _shared.items() if shared is not None},
+    }
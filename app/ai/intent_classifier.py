@@ -0,0 +1,173 @@
+import os
+import re
+import threading
+
+# Minimum confidence for every clause before we trust the rules over the LLM.
+# Set above 1 to disable the fast path.
+FAST_INTENT_THRESHOLD = float(os.getenv("FAST_INTENT_THRESHOLD", "0.8"))
+
+# ISO codes served by frankfurter.app plus the mock-rate currencies
+CURRENCY_CODES = {
+    "AUD", "BDT", "BGN", "BRL", "CAD", "CHF", "CNY", "CZK", "DKK", "EUR", "GBP",
+    "HKD", "HUF", "IDR", "ILS", "INR", "ISK", "JPY", "KRW", "MXN", "MYR", "NOK",
+    "NZD", "PHP", "PLN", "RON", "SEK", "SGD", "THB", "TRY", "USD", "ZAR",
+}
+_CUR = r"(?:" + "|".join(sorted(CURRENCY_CODES)) + r")"
+_AMOUNT = r"\d[\d,]*(?:\.\d+)?"
+
+# (pattern, weight) per intent, built from the intent definitions in the
+# detection prompt. A clause's score for an intent is its best matching weight.
+RULES = {
+    "ORDER": [
+        (r"\borders?\s*(?:#|no\.?|number|ids?)?\s*#?\d+\b", 0.95),
+        (r"\b(?:track|tracking)\b.*\b\d+\b", 0.85),
+        (r"\border(?:s)?\b.*\bstatus\b|\bstatus\b.*\border\b", 0.6),
+    ],
+    "REVENUE": [
+        (r"\b(?:revenue|sales|income|earnings|turnover)\b", 0.9),
+        (r"\b(?:payments?|paid)\b.*\b(?:last|this|between|from|since|in|for)\b", 0.7),
+    ],
+    "CURRENCY": [
+        (rf"{_AMOUNT}\s*{_CUR}\b.*\b(?:to|in|into)\s+{_CUR}\b", 0.95),
+        (rf"\bconvert\b.*{_AMOUNT}", 0.85),
+        (r"\bconvert\b", 0.5),
+    ],
+    "EXCHANGE": [
+        (rf"\b(?:exchange\s+)?rates?\b.*\b{_CUR}\b.*\b{_CUR}\b", 0.9),
+        (rf"\b{_CUR}\s*(?:to|/)\s*{_CUR}\b.*\brates?\b", 0.9),
+        (r"\bexchange\s+rates?\b", 0.6),
+    ],
+    "DOCS": [
+        (r"\b(?:refunds?|returns?|returning|shipping|ship|delivery|warranty|warranties|policy|policies|terms|faq)\b", 0.85),
+        (r"\b(?:how long|how do i|can i|do you)\b", 0.5),
+    ],
+}
+_ORDER_ID = re.compile(r"\border\s*(?:#|no\.?|number|id)?\s*#?(\d+)\b|\b(\d+)\b", re.IGNORECASE)
+# "orders 12, 15 and #19": the list of IDs after the word order(s)
+_ORDER_ID_LIST = re.compile(
+    r"\borders?\s*(?:#|no\.?|numbers?|ids?)?\s*((?:#?\d+\b(?:\s*(?:,|&|and|or)\s*)?)+)", re.IGNORECASE
+)
+_CONVERSION = re.compile(rf"({_AMOUNT})\s*({_CUR})\b.*\b(?:to|in|into)\s+({_CUR})\b", re.IGNORECASE)
+_CODE = re.compile(rf"\b{_CUR}\b", re.IGNORECASE)
+# "usd to eur", "usd/eur": two codes the wording itself pairs up
+_PAIR = re.compile(rf"\b({_CUR})\s*(?:to|/)\s*({_CUR})\b", re.IGNORECASE)
+
+_COMPILED = {
+    intent: [(re.compile(pattern, re.IGNORECASE), weight) for pattern, weight in rules]
+    for intent, rules in RULES.items()
+}
+
+# Clause boundaries: sentence ends, semicolons, commas and joining words.
+# Splitting too eagerly only produces a low-confidence clause, which sends
+# the whole question to the LLM, so this errs on the side of splitting.
+# A bare number after a comma or "and" continues a list of IDs instead.
+_ID_CONTINUES = r"(?!#?\d+\s*(?:$|[,?.!;&]|\band\b|\bor\b))"
+_CLAUSE_SPLIT = re.compile(
+    rf"[?;!\n]+|,\s+(?:and\s+|also\s+)?{_ID_CONTINUES}|\s+(?:and also|and|also|plus|as well as)\s+{_ID_CONTINUES}",
+    re.IGNORECASE,
+)
+
+_stats_lock = threading.Lock()
+_stats = {"fast_path": 0, "llm": 0}
+
+
+def _score(clause: str) -> tuple[str, float]:
+    """Best intent for a clause and how confident the rules are in it."""
+    scores = {}
+    for intent, rules in _COMPILED.items():
+        scores[intent] = max((w for pattern, w in rules if pattern.search(clause)), default=0.0)
+
+    ranked = sorted(scores.items(), key=lambda kv: kv[1], reverse=True)
+    (best, top), (_, runner_up) = ranked[0], ranked[1]
+    # Two strong candidates in one clause is exactly what the LLM is for
+    if runner_up >= 0.5:
+        return best, top - runner_up
+    return best, top
+
+
+def extract_order_ids(text: str) -> list[int]:
+    """Every ID in "orders 12, 15 and 19"; otherwise the first number, as before."""
+    match = _ORDER_ID_LIST.search(text)
+    if match:
+        ids = [int(i) for i in re.findall(r"\d+", match.group(1))]
+        if len(ids) > 1:
+            return list(dict.fromkeys(ids))
+    match = _ORDER_ID.search(text)
+    return [int(match.group(1) or match.group(2))] if match else []
+
+
+def extract_args(intent: str, clause: str) -> dict:
+    """Handler arguments the rules can read straight off the clause."""
+    if intent == "ORDER":
+        order_ids = extract_order_ids(clause)
+        if len(order_ids) > 1:
+            return {"order_ids": order_ids}
+        return {"order_id": order_ids[0]} if order_ids else {}
+
+    if intent == "CURRENCY":
+        match = _CONVERSION.search(clause)
+        if not match:
+            return {}
+        return {
+            "amount": float(match.group(1).replace(",", "")),
+            "from_currency": match.group(2).upper(),
+            "to_currency": match.group(3).upper(),
+        }
+
+    if intent == "EXCHANGE":
+        codes = [c for c in _CODE.findall(clause) if c.isupper()]
+        if len(codes) >= 2:
+            return {"from_currency": codes[0], "to_currency": codes[1]}
+        # In lower case "try", "cad" and the like are words too, so only an
+        # explicit pair counts; anything less certain is left to the LLM
+        match = _PAIR.search(clause)
+        if match:
+            return {"from_currency": match.group(1).upper(), "to_currency": match.group(2).upper()}
+
+    # REVENUE dates need real date reasoning; the handler extracts them
+    return {}
+
+
+def split_clauses(question: str) -> list[str]:
+    return [c.strip(" .") for c in _CLAUSE_SPLIT.split(question) if c and c.strip(" .")]
+
+
+def classify(question: str, threshold: float = None):
+    """
+    Resolve intents locally when every clause is unambiguous.
+    Returns the same shape as detect_intents, or None to defer to the LLM.
+    """
+    threshold = FAST_INTENT_THRESHOLD if threshold is None else threshold
+    clauses = split_clauses(question)
+    if not clauses:
+        return None
+
+    intents = []
+    for clause in clauses:
+        intent, confidence = _score(clause)
+        if confidence < threshold:
+            return None
+        intents.append({"intent": intent, "sub_question": clause, "args": extract_args(intent, clause)})
+
+    # Keep the original wording when there is nothing to split
+    if len(intents) == 1:
+        intents[0]["sub_question"] = question.strip()
+    return intents
+
+
+def record(fast_path: bool):
+    with _stats_lock:
+        _stats["fast_path" if fast_path else "llm"] += 1
+
+
+def stats() -> dict:
+    with _stats_lock:
+        fast, llm = _stats["fast_path"], _stats["llm"]
+    total = fast + llm
+    return {
+        "fast_path": fast,
+        "llm": llm,
+        "total": total,
+        "fast_path_ratio": round(fast / total, 4) if total else 0.0,
+        "threshold": FAST_INTENT_THRESHOLD,
+    }
@@ -0,0 +1,403 @@
+import asyncio
+import hashlib
+import json
+import os
+import random
+import threading
+import time
+import weakref
+from collections import deque
+from concurrent.futures import Future
+from contextlib import asynccontextmanager, contextmanager
+from dotenv import load_dotenv
+from langchain_core.messages import AIMessage
+from langchain_openai import ChatOpenAI
+from openai import APIConnectionError, APIStatusError, APITimeoutError, InternalServerError, RateLimitError
+from app import cache, metrics
+
+load_dotenv()
+
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")
+# Calls in flight across the process (sync callers and every event loop
+# alike), and per purpose ("detect=4,docs=8"); a purpose that is not listed is
+# only bound by the global limit
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "16"))
+LLM_PURPOSE_CONCURRENCY = {
+    purpose.strip(): int(limit)
+    for purpose, _, limit in (
+        item.partition("=") for item in os.getenv("LLM_PURPOSE_CONCURRENCY", "detect=8,extract=8,docs=12").split(",")
+    )
+    if purpose.strip() and limit
+}
+# Retries after a 429, timeout or 5xx; the wait doubles from LLM_RETRY_BASE up
+# to LLM_RETRY_MAX seconds and is drawn uniformly below that ("full jitter")
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "4"))
+LLM_RETRY_BASE = float(os.getenv("LLM_RETRY_BASE", "0.5"))
+LLM_RETRY_MAX = float(os.getenv("LLM_RETRY_MAX", "8"))
+# Exact-match response cache for temperature 0 calls, on CACHE_BACKEND (so
+# workers can share it); size 0 turns it off
+LLM_CACHE_SIZE = int(os.getenv("LLM_CACHE_SIZE", "2000"))
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))
+
+RETRYABLE = (RateLimitError, APITimeoutError, APIConnectionError, InternalServerError)
+
+_lock = threading.Lock()
+_cache = cache.get_cache("llm", ttl=LLM_CACHE_TTL, size=LLM_CACHE_SIZE)
+_inflight: dict[str, Future] = {}
+_stats = {"calls": 0, "hits": 0, "coalesced": 0, "retries": 0, "errors": 0}
+
+
+class _Budget:
+    """
+    A semaphore that threads and coroutines on any event loop draw from
+    alike, so sync and async callers share one limit. Slots are handed to
+    waiters first come, first served.
+    """
+
+    def __init__(self, slots: int):
+        self._lock = threading.Lock()
+        self._free = slots
+        self._waiters = deque()  # threading.Event or asyncio.Future
+
+    def _take(self, waiter):
+        with self._lock:
+            if self._free > 0 and not self._waiters:
+                self._free -= 1
+                return True
+            self._waiters.append(waiter)
+            return False
+
+    def acquire(self):
+        event = threading.Event()
+        if not self._take(event):
+            event.wait()
+
+    async def aacquire(self):
+        future = asyncio.get_running_loop().create_future()
+        if self._take(future):
+            return
+        try:
+            await future
+        except asyncio.CancelledError:
+            with self._lock:
+                queued = future in self._waiters
+                if queued:
+                    self._waiters.remove(future)
+            # Handed a slot just before being cancelled: give it back
+            if not queued and future.done() and not future.cancelled():
+                self.release()
+            raise
+
+    def _wake(self, future: asyncio.Future):
+        # A waiter cancelled after the hand-over does not keep the slot
+        if future.done():
+            self.release()
+        else:
+            future.set_result(None)
+
+    def release(self):
+        with self._lock:
+            while self._waiters:
+                waiter = self._waiters.popleft()
+                if isinstance(waiter, threading.Event):
+                    waiter.set()
+                    return
+                try:
+                    waiter.get_loop().call_soon_threadsafe(self._wake, waiter)
+                    return
+                except RuntimeError:
+                    continue  # its loop is closed
+            self._free += 1
+
+
+_global_limit = _Budget(LLM_MAX_CONCURRENCY)
+_purpose_limits = {purpose: _Budget(n) for purpose, n in LLM_PURPOSE_CONCURRENCY.items()}
+
+
+class _Abandoned(Exception):
+    """Set on an in-flight call's future when its caller was cancelled, so a follower takes over."""
+
+
+class _LoopState:
+    """asyncio futures belong to one event loop, so each loop coalesces its own calls."""
+
+    def __init__(self):
+        self.inflight: dict[str, asyncio.Future] = {}
+
+
+_loop_states = weakref.WeakKeyDictionary()
+
+
+def _loop_state() -> _LoopState:
+    loop = asyncio.get_running_loop()
+    state = _loop_states.get(loop)
+    if state is None:
+        state = _loop_states[loop] = _LoopState()
+    return state
+
+
+def chat_model(**options) -> ChatOpenAI:
+    """ChatOpenAI for use behind LLM: the gateway does the retrying, so the client does not."""
+    return ChatOpenAI(model=LLM_MODEL, temperature=0, max_retries=0, callbacks=metrics.CALLBACKS, **options)
+
+
+def _params(model) -> tuple[dict, dict]:
+    # bind_tools() and friends wrap the model; the bound kwargs change the reply too
+    bound = getattr(model, "bound", None)
+    if bound is not None:
+        return getattr(bound, "_identifying_params", {}), getattr(model, "kwargs", {})
+    return getattr(model, "_identifying_params", {}), {}
+
+
+def _backoff(attempt: int, exc: Exception) -> float:
+    response = getattr(exc, "response", None)
+    retry_after = response.headers.get("retry-after") if isinstance(exc, APIStatusError) and response is not None else None
+    try:
+        if retry_after is not None:
+            return min(float(retry_after), LLM_RETRY_MAX)
+    except ValueError:
+        pass
+    return random.uniform(0, min(LLM_RETRY_MAX, LLM_RETRY_BASE * 2 ** attempt))
+
+
+def _count(event: str, purpose: str):
+    with _lock:
+        _stats[event] += 1
+    metrics.LLM_GATEWAY.labels(purpose, event).inc()
+
+
+def _cache_get(key: str, schema=None):
+    # Stored as JSON: a message, or the structured output's fields
+    data = _cache.get(key)
+    return (schema or AIMessage).model_validate(data) if data is not None else None
+
+
+def _cache_put(key: str, value):
+    _cache.set(key, value.model_dump(mode="json"))
+
+
+async def _acache_get(key: str, schema=None):
+    data = await _cache.aget(key)
+    return (schema or AIMessage).model_validate(data) if data is not None else None
+
+
+async def _acache_put(key: str, value):
+    await _cache.aset(key, value.model_dump(mode="json"))
+
+
+class LLM:
+    """
+    Every model call in the app goes through one of these. Calls share the
+    global and per-purpose concurrency limits, are retried with backoff on
+    rate limits, and, at temperature 0, identical prompts share one call
+    while in flight and one cached reply afterwards.
+    """
+
+    def __init__(self, model=None, **options):
+        # Without a model, chat_model(**options) is built on first use
+        self._model = model
+        self.options = options
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._model = chat_model(**self.options)
+        return self._model
+
+    @property
+    def cacheable(self) -> bool:
+        params, _ = _params(self.model)
+        return LLM_CACHE_SIZE > 0 and LLM_CACHE_TTL > 0 and params.get("temperature") == 0
+
+    def _key(self, prompt: str, schema) -> str:
+        params, bound = _params(self.model)
+        parts = [
+            json.dumps(params, sort_keys=True, default=str),
+            json.dumps(bound, sort_keys=True, default=str),
+            json.dumps(schema.model_json_schema(), sort_keys=True) if schema is not None else "",
+            prompt,
+        ]
+        return hashlib.sha256("\0".join(parts).encode()).hexdigest()
+
+    def _runnable(self, schema):
+        return self.model.with_structured_output(schema) if schema is not None else self.model
+
+    @contextmanager
+    def _limits(self, purpose: str):
+        purpose_limit = _purpose_limits.get(purpose)
+        # Purpose first, so a call waiting on its purpose holds no global slot
+        if purpose_limit is not None:
+            purpose_limit.acquire()
+        try:
+            _global_limit.acquire()
+            try:
+                yield
+            finally:
+                _global_limit.release()
+        finally:
+            if purpose_limit is not None:
+                purpose_limit.release()
+
+    @asynccontextmanager
+    async def _alimits(self, purpose: str):
+        purpose_limit = _purpose_limits.get(purpose)
+        if purpose_limit is not None:
+            await purpose_limit.aacquire()
+        try:
+            await _global_limit.aacquire()
+            try:
+                yield
+            finally:
+                _global_limit.release()
+        finally:
+            if purpose_limit is not None:
+                purpose_limit.release()
+
+    def _call(self, prompt: str, purpose: str, schema):
+        runnable = self._runnable(schema)
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                with self._limits(purpose):
+                    _count("calls", purpose)
+                    return runnable.invoke(prompt)
+            except RETRYABLE as exc:
+                if attempt == LLM_MAX_RETRIES:
+                    _count("errors", purpose)
+                    raise
+                _count("retries", purpose)
+                # Sleep outside the limits, so waiting does not hold a slot
+                time.sleep(_backoff(attempt, exc))
+
+    async def _acall(self, prompt: str, purpose: str, schema):
+        runnable = self._runnable(schema)
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            try:
+                async with self._alimits(purpose):
+                    _count("calls", purpose)
+                    return await runnable.ainvoke(prompt)
+            except RETRYABLE as exc:
+                if attempt == LLM_MAX_RETRIES:
+                    _count("errors", purpose)
+                    raise
+                _count("retries", purpose)
+                await asyncio.sleep(_backoff(attempt, exc))
+
+    def invoke(self, prompt: str, purpose: str = "other", schema=None):
+        """The model's reply to `prompt` (an AIMessage, or a `schema` instance for structured output)."""
+        if not self.cacheable:
+            return self._call(prompt, purpose, schema)
+        key = self._key(prompt, schema)
+        cached = _cache_get(key, schema)
+        if cached is not None:
+            _count("hits", purpose)
+            return cached
+
+        with _lock:
+            future = _inflight.get(key)
+            leader = future is None
+            if leader:
+                future = _inflight[key] = Future()
+        if not leader:
+            _count("coalesced", purpose)
+            return future.result()
+
+        try:
+            result = self._call(prompt, purpose, schema)
+        except BaseException as exc:
+            future.set_exception(exc)
+            raise
+        else:
+            _cache_put(key, result)
+            future.set_result(result)
+            return result
+        finally:
+            with _lock:
+                _inflight.pop(key, None)
+
+    async def ainvoke(self, prompt: str, purpose: str = "other", schema=None):
+        """Async version of invoke."""
+        if not self.cacheable:
+            return await self._acall(prompt, purpose, schema)
+        key = self._key(prompt, schema)
+        cached = await _acache_get(key, schema)
+        if cached is not None:
+            _count("hits", purpose)
+            return cached
+
+        inflight = _loop_state().inflight
+        if key in inflight:
+            _count("coalesced", purpose)
+        while key in inflight:
+            try:
+                # shield: one caller giving up must not cancel the others' result
+                return await asyncio.shield(inflight[key])
+            except _Abandoned:
+                # Its caller was cancelled; the first follower to wake makes the call
+                continue
+
+        future = inflight[key] = asyncio.get_running_loop().create_future()
+        try:
+            result = await self._acall(prompt, purpose, schema)
+        except asyncio.CancelledError:
+            # A timeout or disconnect of this request only, not of the followers
+            future.set_exception(_Abandoned())
+            future.exception()
+            raise
+        except BaseException as exc:
+            if not future.done():
+                future.set_exception(exc)
+                # Followers re-raise it; nobody may be waiting
+                future.exception()
+            raise
+        else:
+            # Followers need not wait for the cache write
+            future.set_result(result)
+            await _acache_put(key, result)
+            return result
+        finally:
+            inflight.pop(key, None)
+
+    async def astream(self, prompt: str, purpose: str = "other"):
+        """
+        The reply as AIMessageChunks. A cached reply comes back as one chunk;
+        streams are not coalesced, and are only retried before the first chunk.
+        """
+        key = self._key(prompt, None) if self.cacheable else None
+        cached = await _acache_get(key) if key else None
+        if cached is not None:
+            _count("hits", purpose)
+            yield cached
+            return
+
+        for attempt in range(LLM_MAX_RETRIES + 1):
+            message = None
+            try:
+                async with self._alimits(purpose):
+                    _count("calls", purpose)
+                    async for chunk in self.model.astream(prompt):
+                        message = chunk if message is None else message + chunk
+                        yield chunk
+                break
+            except RETRYABLE as exc:
+                if message is not None or attempt == LLM_MAX_RETRIES:
+                    _count("errors", purpose)
+                    raise
+                _count("retries", purpose)
+                await asyncio.sleep(_backoff(attempt, exc))
+        if key and message is not None:
+            await _acache_put(key, AIMessage(content=message.content, usage_metadata=message.usage_metadata))
+
+
+def stats() -> dict:
+    with _lock:
+        counts = dict(_stats)
+    answered = counts["calls"] - counts["retries"] - counts["errors"] + counts["hits"] + counts["coalesced"]
+    return {
+        **counts,
+        "saved_ratio": round((counts["hits"] + counts["coalesced"]) / answered, 4) if answered else 0.0,
+        "cache": _cache.stats(),
+        "cache_size": LLM_CACHE_SIZE,
+        "cache_ttl": LLM_CACHE_TTL,
+        "max_concurrency": LLM_MAX_CONCURRENCY,
+        "purpose_concurrency": LLM_PURPOSE_CONCURRENCY,
+    }
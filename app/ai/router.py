@@ -1,190 +1,722 @@
-import re
-import json
-from langchain_openai import ChatOpenAI
-from app.ai.tools.order_tool import get_order_status
-from app.ai.tools.revenue_tool import get_revenue_summary
+import asyncio
+import contextvars
+import os
+import time
+from dataclasses import dataclass
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+from langchain_core.exceptions import OutputParserException
+from pydantic import ValidationError
+from app import metrics
+from app.ai import answer_cache, intent_classifier, llm_gateway
+from app.ai.tools.order_tool import get_order_status, get_order_statuses, aget_order_statuses
+from app.ai.tools.revenue_tool import get_revenue_series, get_revenue_summary
 from app.ai.tools.currency_tool import convert_currency
-from app.ai.tools.exchange_rate_tool import convert_with_live_rate
-from app.knowledge.query import ask as ask_docs
+from app.ai.tools.exchange_rate_tool import convert_with_live_rate, get_live_exchange_rate
+from app.knowledge.query import (
+    ask as ask_docs, aask as aask_docs, astream as astream_docs,
+    embed_question, aembed_question, aembed_questions, needs_embedding,
+)
+from app.schemas.intents import BatchIntentPlan, IntentPlan
 
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0)
+llm = llm_gateway.LLM()
+
+# Deadline (seconds) for each intent of a multi-intent question
+INTENT_TIMEOUT = float(os.getenv("INTENT_TIMEOUT", "15"))
+
+# Shared pool for multi-intent fan-out. Never used as a context manager:
+# shutdown() would wait for a stalled handler and defeat the deadline.
+_intent_pool = ThreadPoolExecutor(
+    max_workers=int(os.getenv("INTENT_WORKERS", "16")),
+    thread_name_prefix="intent",
+)
+
+# /agent/ask/batch: questions per intent-detection call, and handlers in flight
+BATCH_DETECT_SIZE = int(os.getenv("BATCH_DETECT_SIZE", "20"))
+BATCH_CONCURRENCY = int(os.getenv("BATCH_CONCURRENCY", "8"))
 
 # Data sources registry for visibility
 DATA_SOURCES = {
     "ORDER": "PostgreSQL Database (orders table)",
     "REVENUE": "PostgreSQL Database (payments table)",
     "CURRENCY": "Internal API (mock rates) with External API fallback",
-    "EXCHANGE": "External API (frankfurter.app - live rates)",
-    "DOCS": "Pinecone Vector DB (knowledge base documents)",
+    "EXCHANGE": "External API (frankfurter.app - daily rates, cached)",
+    "DOCS": "Vector store + BM25 keyword index (knowledge base documents)",
 }
 
 # Handler mapping
 HANDLERS = {
-    "ORDER": lambda q: handle_order(q),
-    "REVENUE": lambda q: handle_revenue(q),
-    "CURRENCY": lambda q: handle_currency(q),
-    "EXCHANGE": lambda q: handle_exchange_rate(q),
-    "DOCS": lambda q: handle_docs(q),
+    "ORDER": lambda q, args=None: handle_order(q, args),
+    "REVENUE": lambda q, args=None: handle_revenue(q, args),
+    "CURRENCY": lambda q, args=None: handle_currency(q, args),
+    "EXCHANGE": lambda q, args=None: handle_exchange_rate(q, args),
+    "DOCS": lambda q, args=None: handle_docs(q, args),
 }
 
+# Async handler mapping (used by the /agent/ask endpoint)
+ASYNC_HANDLERS = {
+    "ORDER": lambda q, args=None: ahandle_order(q, args),
+    "REVENUE": lambda q, args=None: ahandle_revenue(q, args),
+    "CURRENCY": lambda q, args=None: ahandle_currency(q, args),
+    "EXCHANGE": lambda q, args=None: ahandle_exchange_rate(q, args),
+    "DOCS": lambda q, args=None: ahandle_docs(q, args),
+}
 
-def detect_intents(question: str) -> list[dict]:
-    """
-    Detect multiple intents in a single question.
-    Returns a list of intents with their relevant sub-questions.
-    """
-    detect_prompt = f"""
-Analyze this question and identify ALL intents present.
+DETECT_PROMPT = """
+Analyze this question and identify ALL intents present, together with the
+arguments each intent needs.
 
 Available intent types:
-- ORDER: questions about order status, order tracking (needs order ID)
-- REVENUE: questions about revenue, sales, payments for a time period
-- CURRENCY: questions about converting specific amounts between currencies
-- EXCHANGE: questions about current exchange rates
-- DOCS: questions about policies, shipping, returns, refunds, FAQ, terms
-
-Return a JSON array of objects, each with "intent" and "sub_question" fields.
-Extract the relevant part of the question for each intent.
+- ORDER: questions about order status, order tracking. Set order_id, or
+  order_ids when several orders are asked about.
+- REVENUE: questions about revenue, sales, payments for a time period.
+  Set start_date and end_date (YYYY-MM-DD). If no specific dates are
+  mentioned, use the last 30 days from today (2025-01-15). To compare
+  periods, set ranges instead (one per period). For revenue per day,
+  week or month over a range, also set bucket.
+- CURRENCY: questions about converting specific amounts between currencies.
+  Set amount, from_currency and to_currency (ISO codes).
+- EXCHANGE: questions about current exchange rates. Set from_currency and
+  to_currency (ISO codes).
+- DOCS: questions about policies, shipping, returns, refunds, FAQ, terms.
+
+For each intent, sub_question is the relevant part of the question.
+Leave arguments that do not apply to an intent empty.
 
 Question: {question}
 
 Examples:
 
 Input: "What is the status of order 5 and what's the refund policy?"
-Output: [{{"intent": "ORDER", "sub_question": "What is the status of order 5?"}}, {{"intent": "DOCS", "sub_question": "What's the refund policy?"}}]
+Intents: ORDER (sub_question "What is the status of order 5?", order_id 5), DOCS (sub_question "What's the refund policy?")
 
 Input: "Convert 100 USD to EUR"
-Output: [{{"intent": "CURRENCY", "sub_question": "Convert 100 USD to EUR"}}]
+Intents: CURRENCY (sub_question "Convert 100 USD to EUR", amount 100, from_currency USD, to_currency EUR)
 
 Input: "Show me order 3 status, revenue for January, and shipping policy"
-Output: [{{"intent": "ORDER", "sub_question": "Show me order 3 status"}}, {{"intent": "REVENUE", "sub_question": "revenue for January"}}, {{"intent": "DOCS", "sub_question": "shipping policy"}}]
+Intents: ORDER (order_id 3), REVENUE (start_date 2025-01-01, end_date 2025-01-31), DOCS (sub_question "shipping policy")
+
+Input: "Compare revenue for November vs December, and monthly revenue for 2024"
+Intents: REVENUE (ranges [2024-11-01 to 2024-11-30, 2024-12-01 to 2024-12-31]), REVENUE (start_date 2024-01-01, end_date 2024-12-31, bucket month)
+"""
+
+REVENUE_PROMPT = """
+Extract the date range from this question.
+Return ONLY in this exact format: START_DATE,END_DATE
+Use YYYY-MM-DD format.
+If no specific dates mentioned, use last 30 days from today (2025-01-15).
+If the question compares several periods, return one range per line.
+If it asks for revenue per day, week or month, add a last line
+BUCKET=day, BUCKET=week or BUCKET=month.
 
-Return ONLY the JSON array, no other text.
+Question: {question}
+
+Example outputs:
+2025-01-01,2025-01-15
+2024-12-01,2024-12-31
+
+2024-11-01,2024-11-30
+2024-12-01,2024-12-31
+
+2024-01-01,2024-12-31
+BUCKET=month
 """
-    response = llm.invoke(detect_prompt).content.strip()
 
-    # Clean up response - remove markdown code blocks if present
-    if response.startswith("```"):
-        response = response.split("```")[1]
-        if response.startswith("json"):
-            response = response[4:]
-    response = response.strip()
+CURRENCY_PROMPT = """
+Extract currency conversion details from this question.
+Return ONLY in this exact format: AMOUNT,FROM_CURRENCY,TO_CURRENCY
+
+Question: {question}
+
+Example outputs:
+100,USD,BDT
+50,USD,EUR
+"""
+
+EXCHANGE_PROMPT = """
+Extract the two currencies from this exchange rate question.
+Return ONLY in this exact format: FROM_CURRENCY,TO_CURRENCY
+
+Question: {question}
+
+Example outputs:
+USD,EUR
+GBP,JPY
+"""
+
+DETECT_BATCH_PROMPT = """
+Below is a numbered list of independent questions. Analyze each one as
+described, and return one plan per question with index set to its number.
+""" + DETECT_PROMPT.replace("Question: {question}", "Questions:\n{questions}")
+
+TIMEOUT_MESSAGE = "Timed out after {timeout:g}s waiting for this source."
+
+
+def detect_intents(question: str) -> list[dict]:
+    """
+    Detect multiple intents in a single question.
+    Returns a list of intents with their relevant sub-questions and the
+    handler arguments ("args") extracted in the same pass.
+    Unambiguous questions are resolved by local rules without an LLM call.
+    """
+    intents = intent_classifier.classify(question)
+    intent_classifier.record(fast_path=intents is not None)
+    if intents is not None:
+        return intents
 
     try:
-        intents = json.loads(response)
+        with metrics.span("detect_intents"):
+            plan = llm.invoke(DETECT_PROMPT.format(question=question), purpose="detect", schema=IntentPlan)
+    except (OutputParserException, ValidationError):
+        plan = None
+    return _plan_to_intents(plan, question)
+
+
+async def adetect_intents(question: str) -> list[dict]:
+    """Async version of detect_intents."""
+    intents = intent_classifier.classify(question)
+    intent_classifier.record(fast_path=intents is not None)
+    if intents is not None:
         return intents
-    except json.JSONDecodeError:
+
+    try:
+        with metrics.span("detect_intents"):
+            plan = await llm.ainvoke(DETECT_PROMPT.format(question=question), purpose="detect", schema=IntentPlan)
+    except (OutputParserException, ValidationError):
+        plan = None
+    return _plan_to_intents(plan, question)
+
+
+def _plan_to_intents(plan, question: str) -> list[dict]:
+    if not plan or not plan.intents:
         # Fallback: treat as single intent
-        return [{"intent": "DOCS", "sub_question": question}]
+        return [{"intent": "DOCS", "sub_question": question, "args": {}}]
+
+    return [
+        {
+            "intent": item.intent,
+            "sub_question": item.sub_question,
+            "args": item.model_dump(exclude={"intent", "sub_question"}, exclude_none=True),
+        }
+        for item in plan.intents
+    ]
+
+
+def _format_single(intent: str, result: str) -> str:
+    source = DATA_SOURCES.get(intent, DATA_SOURCES["DOCS"])
+    return f"[Source: {source}]\n\n{result}"
+
+
+def _format_sections(sections: list[tuple[str, str]]) -> str:
+    results = []
+    for i, (intent, result) in enumerate(sections, 1):
+        source = DATA_SOURCES.get(intent, DATA_SOURCES["DOCS"])
+        results.append(f"**[{i}] {intent}**\n[Source: {source}]\n{result}")
+    return "\n\n---\n\n".join(results)
+
+
+@dataclass
+class RoutedAnswer:
+    answer: str
+    intents: list[dict]
+    # True when every section was served from the answer cache
+    cached: bool
+
+
+def _cached_call(intent: str, handler, sub_question: str, args: dict) -> tuple[str, bool]:
+    with metrics.span(f"intent.{intent}"):
+        result, hit = _call_through_cache(intent, handler, sub_question, args)
+    metrics.count_intent(intent, hit)
+    return result, hit
+
+
+def _call_through_cache(intent: str, handler, sub_question: str, args: dict) -> tuple[str, bool]:
+    if not answer_cache.enabled(intent):
+        return handler(sub_question, args), False
+
+    # The embedding is memoized, so the DOCS handler reuses it on a miss.
+    # When BM25 alone answers, skip it and match the cache exactly.
+    semantic = answer_cache.is_semantic(intent) and needs_embedding(sub_question)
+    vector = embed_question(sub_question) if semantic else None
+    cached = answer_cache.lookup(intent, sub_question, args, vector)
+    if cached is not None:
+        return cached, True
+
+    result = handler(sub_question, args)
+    answer_cache.store(intent, sub_question, result, args, vector)
+    return result, False
+
+
+async def _acache_lookup(intent: str, sub_question: str, args: dict):
+    """(cached answer or None, question embedding to store the answer under)."""
+    semantic = answer_cache.is_semantic(intent) and needs_embedding(sub_question)
+    vector = await aembed_question(sub_question) if semantic else None
+    return await answer_cache.alookup(intent, sub_question, args, vector), vector
+
+
+async def _acached_call(intent: str, handler, sub_question: str, args: dict) -> tuple[str, bool]:
+    with metrics.span(f"intent.{intent}"):
+        result, hit = await _acall_through_cache(intent, handler, sub_question, args)
+    metrics.count_intent(intent, hit)
+    return result, hit
+
+
+async def _acall_through_cache(intent: str, handler, sub_question: str, args: dict) -> tuple[str, bool]:
+    if not answer_cache.enabled(intent):
+        return await handler(sub_question, args), False
+
+    cached, vector = await _acache_lookup(intent, sub_question, args)
+    if cached is not None:
+        return cached, True
+
+    result = await handler(sub_question, args)
+    await answer_cache.astore(intent, sub_question, result, args, vector)
+    return result, False
 
 
 def route_question(question: str) -> str:
     """
     Route user questions to appropriate data sources.
     Supports multi-intent queries (e.g., "Order 1 status AND refund policy").
+    Blocking version, kept for scripts; the API uses aroute_question.
     """
+    return answer_question(question).answer
+
+
+def answer_question(question: str) -> RoutedAnswer:
+    """route_question, plus the detected intents and cache status."""
     # Detect all intents in the question
     intents = detect_intents(question)
 
     # Single intent - simple response
     if len(intents) == 1:
         intent = intents[0]["intent"].upper()
-        sub_question = intents[0]["sub_question"]
         handler = HANDLERS.get(intent, HANDLERS["DOCS"])
-        result = handler(sub_question)
-        source = DATA_SOURCES.get(intent, DATA_SOURCES["DOCS"])
-        return f"[Source: {source}]\n\n{result}"
+        result, hit = _cached_call(intent, handler, intents[0]["sub_question"], intents[0].get("args"))
+        return RoutedAnswer(_format_single(intent, result), intents, hit)
 
-    # Multiple intents - parallel processing
-    results = []
-    for i, item in enumerate(intents, 1):
+    # Multiple intents - run handlers concurrently, each under its own deadline
+    started = time.monotonic()
+    futures = []
+    for item in intents:
         intent = item["intent"].upper()
-        sub_question = item["sub_question"]
         handler = HANDLERS.get(intent, HANDLERS["DOCS"])
-        source = DATA_SOURCES.get(intent, DATA_SOURCES["DOCS"])
-
+        # In a copy of our context, so stage timings reach this request's Server-Timing
+        futures.append((intent, _intent_pool.submit(
+            contextvars.copy_context().run, _cached_call, intent, handler, item["sub_question"], item.get("args")
+        )))
+
+    # Collect in the original intent order; a slow source only costs its own section
+    sections = []
+    hits = []
+    for intent, future in futures:
+        remaining = max(0.0, started + INTENT_TIMEOUT - time.monotonic())
+        hit = False
         try:
-            result = handler(sub_question)
+            result, hit = future.result(timeout=remaining)
+        except FutureTimeoutError:
+            future.cancel()
+            result = TIMEOUT_MESSAGE.format(timeout=INTENT_TIMEOUT)
         except Exception as e:
             result = f"Error: {str(e)}"
+        sections.append((intent, result))
+        hits.append(hit)
 
-        results.append(f"**[{i}] {intent}**\n[Source: {source}]\n{result}")
+    return RoutedAnswer(_format_sections(sections), intents, all(hits))
 
-    return "\n\n---\n\n".join(results)
+
+async def aroute_question(question: str) -> str:
+    """
+    Async version of route_question. Network waits (LLM, DB, HTTP) yield
+    the event loop instead of holding a threadpool worker.
+    """
+    return (await aanswer_question(question)).answer
+
+
+async def aanswer_question(question: str) -> RoutedAnswer:
+    intents = await adetect_intents(question)
+
+    if len(intents) == 1:
+        intent = intents[0]["intent"].upper()
+        handler = ASYNC_HANDLERS.get(intent, ASYNC_HANDLERS["DOCS"])
+        result, hit = await _acached_call(intent, handler, intents[0]["sub_question"], intents[0].get("args"))
+        return RoutedAnswer(_format_single(intent, result), intents, hit)
+
+    # gather() keeps the original intent order
+    results = await asyncio.gather(*(_arun_intent(item) for item in intents))
+    sections = [(intent, result) for intent, result, _ in results]
+    return RoutedAnswer(_format_sections(sections), intents, all(hit for _, _, hit in results))
+
+
+async def _arun_intent(item: dict, handler=None) -> tuple[str, str, bool]:
+    intent = item["intent"].upper()
+    handler = handler or ASYNC_HANDLERS.get(intent, ASYNC_HANDLERS["DOCS"])
+    hit = False
+    try:
+        result, hit = await asyncio.wait_for(
+            _acached_call(intent, handler, item["sub_question"], item.get("args")), INTENT_TIMEOUT
+        )
+    except asyncio.TimeoutError:
+        result = TIMEOUT_MESSAGE.format(timeout=INTENT_TIMEOUT)
+    except Exception as e:
+        result = f"Error: {str(e)}"
+    return intent, result, hit
 
 
-def handle_order(question: str) -> str:
-    """Extract order ID and fetch order status."""
-    match = re.search(r'\b(\d+)\b', question)
-    if not match:
-        return "I couldn't find an order ID in your question. Please provide an order ID."
+@dataclass
+class BatchAnswer:
+    question: str
+    answer: str = None
+    cached: bool = False
+    error: str = None
 
-    order_id = int(match.group(1))
-    data = get_order_status.invoke({"order_id": order_id})
+
+async def adetect_intents_batch(questions: list[str]) -> list:
+    """
+    detect_intents for many questions: local rules first, then one LLM call
+    per BATCH_DETECT_SIZE questions left. An entry is the exception instead
+    of the intents when its detection call failed.
+    """
+    results = []
+    for question in questions:
+        intents = intent_classifier.classify(question)
+        intent_classifier.record(fast_path=intents is not None)
+        results.append(intents)
+
+    async def detect(indices: list[int]):
+        listing = "\n".join(f"{n}. {questions[i]}" for n, i in enumerate(indices, 1))
+        try:
+            with metrics.span("detect_intents_batch"):
+                batch = await llm.ainvoke(
+                    DETECT_BATCH_PROMPT.format(questions=listing), purpose="detect", schema=BatchIntentPlan
+                )
+        except (OutputParserException, ValidationError):
+            batch = None
+        except Exception as e:
+            for i in indices:
+                results[i] = e
+            return
+        plans = {plan.index: plan for plan in batch.plans} if batch else {}
+        for n, i in enumerate(indices, 1):
+            results[i] = _plan_to_intents(plans.get(n), questions[i])
+
+    pending = [i for i, intents in enumerate(results) if intents is None]
+    chunks = [pending[i:i + BATCH_DETECT_SIZE] for i in range(0, len(pending), BATCH_DETECT_SIZE)]
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def bounded(indices):
+        async with semaphore:
+            await detect(indices)
+
+    await asyncio.gather(*(bounded(indices) for indices in chunks))
+    return results
+
+
+def _work_key(item: dict) -> tuple:
+    return item["intent"].upper(), item["sub_question"].strip().lower(), repr(sorted(item.get("args", {}).items()))
+
+
+async def aanswer_batch(questions: list[str]) -> list[BatchAnswer]:
+    """
+    Answer many questions at once. Identical questions and sub-questions
+    are answered once, DOCS sub-questions are embedded in one call, ORDER
+    lookups share one query, and at most BATCH_CONCURRENCY handlers run at
+    a time. Results come back in input order.
+    """
+    unique = list(dict.fromkeys(questions))
+    detected = dict(zip(unique, await adetect_intents_batch(unique)))
+
+    work = {}
+    for intents in detected.values():
+        if not isinstance(intents, Exception):
+            for item in intents:
+                work.setdefault(_work_key(item), item)
+
+    # Prefetch what the handlers would otherwise fetch one by one
+    to_embed = [
+        item["sub_question"] for key, item in work.items()
+        if key[0] == "DOCS" and needs_embedding(item["sub_question"])
+    ]
+    order_ids = {
+        key: _order_ids(item["sub_question"], item.get("args"))
+        for key, item in work.items() if key[0] == "ORDER"
+    }
+    wanted = [i for ids in order_ids.values() for i in ids]
+    # A failed prefetch only costs its items the shortcut: they fall back to
+    # their own handlers, and any error stays with them
+    _, orders = await asyncio.gather(
+        aembed_questions(to_embed), aget_order_statuses(wanted), return_exceptions=True
+    )
+    if isinstance(orders, Exception):
+        order_ids = {}
+
+    def prefetched_order(ids):
+        async def handler(question, args=None):
+            if not ids:
+                return NO_ORDER_ID
+            if len(ids) == 1:
+                return _order_answer(ids[0], orders[ids[0]])
+            return _orders_answer({i: orders[i] for i in ids})
+        return handler
+
+    semaphore = asyncio.Semaphore(BATCH_CONCURRENCY)
+
+    async def run(key, item):
+        handler = prefetched_order(order_ids[key]) if key in order_ids else None
+        async with semaphore:
+            return await _arun_intent(item, handler)
+
+    keys = list(work)
+    finished = dict(zip(keys, await asyncio.gather(*(run(key, work[key]) for key in keys))))
+
+    answers = {}
+    for question, intents in detected.items():
+        if isinstance(intents, Exception):
+            answers[question] = BatchAnswer(question, error=f"Intent detection failed: {intents}")
+            continue
+        results = [finished[_work_key(item)] for item in intents]
+        if len(results) == 1:
+            answer = _format_single(results[0][0], results[0][1])
+        else:
+            answer = _format_sections([(intent, result) for intent, result, _ in results])
+        answers[question] = BatchAnswer(question, answer, all(hit for _, _, hit in results))
+    return [answers[question] for question in questions]
+
+
+async def astream_answer(question: str):
+    """
+    aanswer_question as (event, data) pairs, for the SSE endpoint:
+    "intents" once detection is done, "token" for DOCS answer text as the
+    LLM writes it, "section" for each intent as it finishes (in completion
+    order), and finally "done" with the full RoutedAnswer.
+    """
+    intents = await adetect_intents(question)
+    yield "intents", {
+        "intents": [{"intent": item["intent"], "sub_question": item["sub_question"]} for item in intents]
+    }
+
+    queue = asyncio.Queue()
+    tasks = [asyncio.create_task(_astream_intent(index, item, queue)) for index, item in enumerate(intents)]
+    sections = [None] * len(intents)
+    try:
+        while any(section is None for section in sections):
+            event, data = await queue.get()
+            if event == "section":
+                sections[data["index"]] = data
+            yield event, data
+    finally:
+        # Client went away: stop the remaining handlers
+        for task in tasks:
+            task.cancel()
+
+    if len(sections) == 1:
+        answer = _format_single(sections[0]["intent"], sections[0]["result"])
+    else:
+        answer = _format_sections([(s["intent"], s["result"]) for s in sections])
+    yield "done", RoutedAnswer(answer, intents, all(s["cached"] for s in sections))
+
+
+async def _astream_intent(index: int, item: dict, queue: asyncio.Queue):
+    intent = item["intent"].upper()
+    hit = False
+    try:
+        if intent in ASYNC_HANDLERS and intent != "DOCS":
+            result, hit = await asyncio.wait_for(
+                _acached_call(intent, ASYNC_HANDLERS[intent], item["sub_question"], item.get("args")),
+                INTENT_TIMEOUT,
+            )
+        else:
+            with metrics.span(f"intent.{intent}"):
+                result, hit = await asyncio.wait_for(_astream_docs(index, intent, item, queue), INTENT_TIMEOUT)
+            metrics.count_intent(intent, hit)
+    except asyncio.TimeoutError:
+        result = TIMEOUT_MESSAGE.format(timeout=INTENT_TIMEOUT)
+    except Exception as e:
+        result = f"Error: {str(e)}"
+    await queue.put(("section", {"index": index, "intent": intent, "result": result, "cached": hit}))
+
+
+async def _astream_docs(index: int, intent: str, item: dict, queue: asyncio.Queue) -> tuple[str, bool]:
+    sub_question, args = item["sub_question"], item.get("args")
+    cached, vector = None, None
+    if answer_cache.enabled("DOCS"):
+        cached, vector = await _acache_lookup("DOCS", sub_question, args)
+        if cached is not None:
+            return cached, True
+
+    parts = []
+    async for text in astream_docs(sub_question):
+        parts.append(text)
+        await queue.put(("token", {"index": index, "intent": intent, "text": text}))
+    result = "".join(parts)
+    await answer_cache.astore("DOCS", sub_question, result, args, vector)
+    return result, False
+
+
+def _extract(name: str, prompt: str, question: str) -> str:
+    """Reply to an argument-extraction prompt, for questions detection left incomplete."""
+    with metrics.span(f"extract.{name}"):
+        return llm.invoke(prompt.format(question=question), purpose="extract").content.strip()
+
+
+async def _aextract(name: str, prompt: str, question: str) -> str:
+    with metrics.span(f"extract.{name}"):
+        return (await llm.ainvoke(prompt.format(question=question), purpose="extract")).content.strip()
+
+
+def _order_ids(question: str, args: dict) -> list[int]:
+    if args and args.get("order_ids"):
+        return list(dict.fromkeys(args["order_ids"]))
+    if _complete(args, "order_id"):
+        return [args["order_id"]]
+    return intent_classifier.extract_order_ids(question)
+
+
+def _complete(args: dict, *keys) -> bool:
+    return bool(args) and all(args.get(key) is not None for key in keys)
+
+
+NO_ORDER_ID = "I couldn't find an order ID in your question. Please provide an order ID."
+
+
+def handle_order(question: str, args: dict = None) -> str:
+    """Fetch order status for the detected order IDs (or the numbers in the question)."""
+    order_ids = _order_ids(question, args)
+    if not order_ids:
+        return NO_ORDER_ID
+
+    if len(order_ids) == 1:
+        return _order_answer(order_ids[0], get_order_status.invoke({"order_id": order_ids[0]}))
+    # One query for all of them
+    return _orders_answer(get_order_statuses.invoke({"order_ids": order_ids}))
+
+
+async def ahandle_order(question: str, args: dict = None) -> str:
+    order_ids = _order_ids(question, args)
+    if not order_ids:
+        return NO_ORDER_ID
+
+    if len(order_ids) == 1:
+        return _order_answer(order_ids[0], await get_order_status.ainvoke({"order_id": order_ids[0]}))
+    return _orders_answer(await get_order_statuses.ainvoke({"order_ids": order_ids}))
+
+
+def _order_answer(order_id: int, data: dict) -> str:
     return f"Order #{order_id} details: {data}"
 
 
-def handle_revenue(question: str) -> str:
-    """Extract date range and fetch revenue summary."""
-    extract_prompt = f"""
-Extract the date range from this question.
-Return ONLY in this exact format: START_DATE,END_DATE
-Use YYYY-MM-DD format.
-If no specific dates mentioned, use last 30 days from today (2025-01-15).
+def _orders_answer(statuses: dict) -> str:
+    return "\n".join(_order_answer(order_id, data) for order_id, data in statuses.items())
 
-Question: {question}
 
-Example outputs:
-2025-01-01,2025-01-15
-2024-12-01,2024-12-31
-"""
-    dates = llm.invoke(extract_prompt).content.strip()
+def _parse_dates(dates: str) -> dict:
+    start_date, end_date = dates.split(",")
+    return {"start_date": start_date.strip(), "end_date": end_date.strip()}
 
+
+def _parse_revenue_params(params: str) -> dict:
+    ranges, bucket = [], None
+    for line in params.splitlines():
+        line = line.strip()
+        if line.upper().startswith("BUCKET="):
+            bucket = line.split("=", 1)[1].strip().lower()
+        elif line:
+            dates = _parse_dates(line)
+            ranges.append([dates["start_date"], dates["end_date"]])
+    return {"ranges": ranges, "bucket": bucket}
+
+
+def _revenue_args(args: dict):
+    """Ranges and bucket from detection, or None when they have to be extracted."""
+    if args and args.get("ranges"):
+        ranges = [[r["start_date"], r["end_date"]] for r in args["ranges"]]
+    elif _complete(args, "start_date", "end_date"):
+        ranges = [[args["start_date"], args["end_date"]]]
+    else:
+        return None
+    return {"ranges": ranges, "bucket": args.get("bucket")}
+
+
+def _format_revenue_series(series: dict) -> str:
+    lines = []
+    for r in series["ranges"]:
+        totals = ", ".join(f"{t['total_revenue']:.2f} {t['currency']} ({t['total_payments']} payments)" for t in r["totals"])
+        lines.append(f"{r['start_date']} to {r['end_date']}: {totals or 'no paid payments'}")
+        for b in r["buckets"]:
+            lines.append(f"  {b['period']}: {b['total_revenue']:.2f} {b['currency']} ({b['total_payments']} payments)")
+    heading = f"Revenue by {series['bucket']}" if series["bucket"] else "Revenue by period"
+    return f"{heading}:\n" + "\n".join(lines)
+
+
+def handle_revenue(question: str, args: dict = None) -> str:
+    """
+    Fetch revenue for one or more date ranges, optionally bucketed; the ranges
+    are only extracted here if detection did not provide them.
+    """
     try:
-        start_date, end_date = dates.split(",")
-        data = get_revenue_summary.invoke({
-            "start_date": start_date.strip(),
-            "end_date": end_date.strip()
-        })
-        return f"Revenue summary from {start_date} to {end_date}: {data}"
+        params = _revenue_args(args) or _parse_revenue_params(_extract("revenue", REVENUE_PROMPT, question))
+        ranges, bucket = params["ranges"], params["bucket"]
+        if not ranges:
+            raise ValueError("no date range found")
+
+        if len(ranges) == 1 and not bucket:
+            dates = {"start_date": ranges[0][0], "end_date": ranges[0][1]}
+            data = get_revenue_summary.invoke(dates)
+            return f"Revenue summary from {dates['start_date']} to {dates['end_date']}: {data}"
+        # Every range and bucket in one query
+        return _format_revenue_series(get_revenue_series.invoke(params))
     except Exception as e:
         return f"Error processing revenue query: {str(e)}"
 
 
-def handle_currency(question: str) -> str:
-    """Extract currency conversion parameters and use live rates."""
-    extract_prompt = f"""
-Extract currency conversion details from this question.
-Return ONLY in this exact format: AMOUNT,FROM_CURRENCY,TO_CURRENCY
+async def ahandle_revenue(question: str, args: dict = None) -> str:
+    try:
+        params = _revenue_args(args)
+        if params is None:
+            params = _parse_revenue_params(await _aextract("revenue", REVENUE_PROMPT, question))
+        ranges, bucket = params["ranges"], params["bucket"]
+        if not ranges:
+            raise ValueError("no date range found")
+
+        if len(ranges) == 1 and not bucket:
+            dates = {"start_date": ranges[0][0], "end_date": ranges[0][1]}
+            data = await get_revenue_summary.ainvoke(dates)
+            return f"Revenue summary from {dates['start_date']} to {dates['end_date']}: {data}"
+        return _format_revenue_series(await get_revenue_series.ainvoke(params))
+    except Exception as e:
+        return f"Error processing revenue query: {str(e)}"
 
-Question: {question}
 
-Example outputs:
-100,USD,BDT
-50,USD,EUR
-"""
-    params = llm.invoke(extract_prompt).content.strip()
+def _parse_currency_params(params: str) -> dict:
+    parts = params.split(",")
+    return {
+        "amount": float(parts[0].strip()),
+        "from_currency": parts[1].strip().upper(),
+        "to_currency": parts[2].strip().upper(),
+    }
+
 
+def _currency_args(args: dict) -> dict:
+    return {
+        "amount": float(args["amount"]),
+        "from_currency": args["from_currency"].upper(),
+        "to_currency": args["to_currency"].upper(),
+    }
+
+
+def handle_currency(question: str, args: dict = None) -> str:
+    """Convert with live rates, falling back to internal mock rates."""
     try:
-        parts = params.split(",")
-        amount = float(parts[0].strip())
-        from_curr = parts[1].strip().upper()
-        to_curr = parts[2].strip().upper()
+        if _complete(args, "amount", "from_currency", "to_currency"):
+            args = _currency_args(args)
+        else:
+            args = _parse_currency_params(_extract("currency", CURRENCY_PROMPT, question))
 
         # Try live rates first (external API)
-        data = convert_with_live_rate.invoke({
-            "amount": amount,
-            "from_currency": from_curr,
-            "to_currency": to_curr
-        })
+        data = convert_with_live_rate.invoke(args)
 
         # If live API failed, fallback to internal mock rates
         if "error" in data:
-            data = convert_currency.invoke({
-                "amount": amount,
-                "from_currency": from_curr,
-                "to_currency": to_curr
-            })
+            data = convert_currency.invoke(args)
             data["source"] = "internal (fallback)"
 
         return f"Currency conversion: {data}"
@@ -192,43 +724,80 @@ Example outputs:
         return f"Error processing currency conversion: {str(e)}"
 
 
-def handle_exchange_rate(question: str) -> str:
+async def ahandle_currency(question: str, args: dict = None) -> str:
+    try:
+        if _complete(args, "amount", "from_currency", "to_currency"):
+            args = _currency_args(args)
+        else:
+            args = _parse_currency_params(await _aextract("currency", CURRENCY_PROMPT, question))
+
+        data = await convert_with_live_rate.ainvoke(args)
+        if "error" in data:
+            data = await convert_currency.ainvoke(args)
+            data["source"] = "internal (fallback)"
+
+        return f"Currency conversion: {data}"
+    except Exception as e:
+        return f"Error processing currency conversion: {str(e)}"
+
+
+def _parse_exchange_params(params: str) -> dict:
+    parts = params.split(",")
+    return {
+        "from_currency": parts[0].strip().upper(),
+        "to_currency": parts[1].strip().upper(),
+    }
+
+
+def _exchange_args(args: dict) -> dict:
+    return {
+        "from_currency": args["from_currency"].upper(),
+        "to_currency": args["to_currency"].upper(),
+    }
+
+
+def _format_exchange_rate(args: dict, data: dict) -> str:
+    if "error" not in data:
+        return f"Current exchange rate: 1 {args['from_currency']} = {data['rate']} {args['to_currency']} (as of {data['date']})"
+    return f"Exchange rate lookup failed: {data['error']}"
+
+
+def handle_exchange_rate(question: str, args: dict = None) -> str:
     """Get current exchange rate between two currencies."""
-    extract_prompt = f"""
-Extract the two currencies from this exchange rate question.
-Return ONLY in this exact format: FROM_CURRENCY,TO_CURRENCY
+    try:
+        if _complete(args, "from_currency", "to_currency"):
+            args = _exchange_args(args)
+        else:
+            args = _parse_exchange_params(_extract("exchange", EXCHANGE_PROMPT, question))
 
-Question: {question}
+        data = get_live_exchange_rate.invoke(args)
+        return _format_exchange_rate(args, data)
+    except Exception as e:
+        return f"Error fetching exchange rate: {str(e)}"
 
-Example outputs:
-USD,EUR
-GBP,JPY
-"""
-    params = llm.invoke(extract_prompt).content.strip()
 
+async def ahandle_exchange_rate(question: str, args: dict = None) -> str:
     try:
-        parts = params.split(",")
-        from_curr = parts[0].strip().upper()
-        to_curr = parts[1].strip().upper()
-
-        from app.ai.tools.exchange_rate_tool import get_live_exchange_rate
-        data = get_live_exchange_rate.invoke({
-            "from_currency": from_curr,
-            "to_currency": to_curr
-        })
-
-        if "error" not in data:
-            return f"Current exchange rate: 1 {from_curr} = {data['rate']} {to_curr} (as of {data['date']})"
-        return f"Exchange rate lookup failed: {data['error']}"
+        if _complete(args, "from_currency", "to_currency"):
+            args = _exchange_args(args)
+        else:
+            args = _parse_exchange_params(await _aextract("exchange", EXCHANGE_PROMPT, question))
+
+        data = await get_live_exchange_rate.ainvoke(args)
+        return _format_exchange_rate(args, data)
     except Exception as e:
         return f"Error fetching exchange rate: {str(e)}"
 
 
-def handle_docs(question: str) -> str:
+def handle_docs(question: str, args: dict = None) -> str:
     """Query the knowledge base documents."""
     return ask_docs(question)
 
 
+async def ahandle_docs(question: str, args: dict = None) -> str:
+    return await aask_docs(question)
+
+
 if __name__ == "__main__":
     print("=== SINGLE INTENT: ORDER ===")
     print(route_question("What is the status of order 1?"))
@@ -1,11 +1,17 @@
-import requests
-from langchain.tools import tool
+from langchain_core.tools import StructuredTool
+from app import metrics
+from app.ai.tools.http_client import use_http_transport, internal_get, ainternal_get
+from app.services import currency as currency_service
 
-INTERNAL_API_BASE = "http://127.0.0.1:8000/internal"
 
+def _local_convert(amount: float, from_currency: str, to_currency: str) -> dict:
+    result = currency_service.convert(amount, from_currency, to_currency)
+    if not result:
+        return {"error": f"Rate not available for {from_currency.upper()} to {to_currency.upper()}"}
+    return result.model_dump(mode="json")
 
-@tool
-def convert_currency(amount: float, from_currency: str, to_currency: str) -> dict:
+
+def _convert_currency(amount: float, from_currency: str, to_currency: str) -> dict:
     """
     Convert an amount from one currency to another.
 
@@ -14,13 +20,23 @@ def convert_currency(amount: float, from_currency: str, to_currency: str) -> dic
         from_currency: Source currency code (e.g., USD)
         to_currency: Target currency code (e.g., BDT, EUR)
     """
-    response = requests.get(
-        f"{INTERNAL_API_BASE}/utils/convert-currency",
-        params={
-            "amount": amount,
-            "from_currency": from_currency,
-            "to_currency": to_currency
-        }
-    )
-    response.raise_for_status()
-    return response.json()
+    params = {"amount": amount, "from_currency": from_currency, "to_currency": to_currency}
+    if use_http_transport():
+        return internal_get("/utils/convert-currency", params)
+    return _local_convert(**params)
+
+
+async def _aconvert_currency(amount: float, from_currency: str, to_currency: str) -> dict:
+    params = {"amount": amount, "from_currency": from_currency, "to_currency": to_currency}
+    if use_http_transport():
+        return await ainternal_get("/utils/convert-currency", params)
+    # Pure in-memory lookup, nothing to await
+    return _local_convert(**params)
+
+
+convert_currency = StructuredTool.from_function(
+    func=_convert_currency,
+    coroutine=_aconvert_currency,
+    name="convert_currency",
+    callbacks=metrics.CALLBACKS,
+)
@@ -1,9 +1,31 @@
-import requests
-from langchain.tools import tool
+from langchain_core.tools import StructuredTool
+from app import metrics
+from app.ai.tools import rate_cache
+from app.ai.tools.rate_cache import RateUnavailable
 
 
-@tool
-def get_live_exchange_rate(from_currency: str, to_currency: str) -> dict:
+def _rate_result(quote) -> dict:
+    return {
+        "from": quote.from_currency,
+        "to": quote.to_currency,
+        "rate": quote.rate,
+        "date": quote.date,
+        "source": "frankfurter.app (cached, stale)" if quote.stale else "frankfurter.app",
+    }
+
+
+def _conversion_result(amount: float, quote) -> dict:
+    return {
+        "amount": amount,
+        "from": quote.from_currency,
+        "to": quote.to_currency,
+        "converted_amount": round(amount * quote.rate, 4),
+        "date": quote.date,
+        "source": "frankfurter.app (cached, stale)" if quote.stale else "frankfurter.app (live)",
+    }
+
+
+def _get_live_exchange_rate(from_currency: str, to_currency: str) -> dict:
     """
     Get live exchange rate from an external API.
     Uses the free frankfurter.app API for real-time rates.
@@ -13,28 +35,19 @@ def get_live_exchange_rate(from_currency: str, to_currency: str) -> dict:
         to_currency: Target currency code (e.g., BDT, EUR, JPY)
     """
     try:
-        # Frankfurter API - free, no API key required
-        url = "https://api.frankfurter.app/latest"
-        params = {"from": from_currency.upper(), "to": to_currency.upper()}
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-
-        data = response.json()
-        rate = data["rates"].get(to_currency.upper())
-
-        return {
-            "from": from_currency.upper(),
-            "to": to_currency.upper(),
-            "rate": rate,
-            "date": data.get("date"),
-            "source": "frankfurter.app",
-        }
-    except requests.RequestException as e:
-        return {"error": f"Failed to fetch exchange rate: {str(e)}"}
-
-
-@tool
-def convert_with_live_rate(amount: float, from_currency: str, to_currency: str) -> dict:
+        return _rate_result(rate_cache.get_rate(from_currency, to_currency))
+    except RateUnavailable as e:
+        return {"error": str(e)}
+
+
+async def _aget_live_exchange_rate(from_currency: str, to_currency: str) -> dict:
+    try:
+        return _rate_result(await rate_cache.aget_rate(from_currency, to_currency))
+    except RateUnavailable as e:
+        return {"error": str(e)}
+
+
+def _convert_with_live_rate(amount: float, from_currency: str, to_currency: str) -> dict:
     """
     Convert currency using live exchange rates from external API.
 
@@ -44,28 +57,31 @@ def convert_with_live_rate(amount: float, from_currency: str, to_currency: str)
         to_currency: Target currency code (e.g., EUR)
     """
     try:
-        url = "https://api.frankfurter.app/latest"
-        params = {
-            "amount": amount,
-            "from": from_currency.upper(),
-            "to": to_currency.upper(),
-        }
-        response = requests.get(url, params=params, timeout=10)
-        response.raise_for_status()
-
-        data = response.json()
-        converted = data["rates"].get(to_currency.upper())
-
-        return {
-            "amount": amount,
-            "from": from_currency.upper(),
-            "to": to_currency.upper(),
-            "converted_amount": converted,
-            "date": data.get("date"),
-            "source": "frankfurter.app (live)",
-        }
-    except requests.RequestException as e:
-        return {"error": f"Failed to convert currency: {str(e)}"}
+        return _conversion_result(amount, rate_cache.get_rate(from_currency, to_currency))
+    except RateUnavailable as e:
+        return {"error": str(e)}
+
+
+async def _aconvert_with_live_rate(amount: float, from_currency: str, to_currency: str) -> dict:
+    try:
+        return _conversion_result(amount, await rate_cache.aget_rate(from_currency, to_currency))
+    except RateUnavailable as e:
+        return {"error": str(e)}
+
+
+get_live_exchange_rate = StructuredTool.from_function(
+    func=_get_live_exchange_rate,
+    coroutine=_aget_live_exchange_rate,
+    name="get_live_exchange_rate",
+    callbacks=metrics.CALLBACKS,
+)
+
+convert_with_live_rate = StructuredTool.from_function(
+    func=_convert_with_live_rate,
+    coroutine=_aconvert_with_live_rate,
+    name="convert_with_live_rate",
+    callbacks=metrics.CALLBACKS,
+)
 
 
 if __name__ == "__main__":
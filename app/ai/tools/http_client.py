@@ -0,0 +1,45 @@
+import os
+import httpx
+import requests
+from app import metrics
+
+# How tools reach orders/revenue/currency data:
+#   local - call app.services in-process with our own DB session (default)
+#   http  - call the /internal API, for tools running in a separate process
+TOOL_TRANSPORT = os.getenv("TOOL_TRANSPORT", "local").lower()
+INTERNAL_API_BASE = os.getenv("INTERNAL_API_BASE", "http://127.0.0.1:8000/internal")
+
+_async_client = None
+
+
+def use_http_transport() -> bool:
+    return TOOL_TRANSPORT == "http"
+
+
+def get_async_client() -> httpx.AsyncClient:
+    """Shared AsyncClient so async tool calls reuse pooled keep-alive connections."""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(timeout=30)
+    return _async_client
+
+
+async def close_async_client():
+    global _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+
+
+def internal_get(path: str, params: dict = None):
+    with metrics.span("tool_http"):
+        response = requests.get(f"{INTERNAL_API_BASE}{path}", params=params)
+    response.raise_for_status()
+    return response.json()
+
+
+async def ainternal_get(path: str, params: dict = None):
+    with metrics.span("tool_http"):
+        response = await get_async_client().get(f"{INTERNAL_API_BASE}{path}", params=params)
+    response.raise_for_status()
+    return response.json()
@@ -1,14 +1,91 @@
-import requests
-from langchain.tools import tool
+import asyncio
+from langchain_core.tools import StructuredTool
+from app import metrics
+from app.ai.tools.http_client import use_http_transport, internal_get, ainternal_get
+from app.db import SessionLocal
+from app.services import orders as orders_service
+from app.services.order_loader import get_order_loader
 
-INTERNAL_API_BASE = "http://127.0.0.1:8000/internal"
+ORDER_NOT_FOUND = {"error": "Order not found"}
 
+# GET /orders takes at most this many ids per request
+ORDERS_PER_REQUEST = 1000
 
-@tool
-def get_order_status(order_id: int) -> dict:
+
+def _get_order_status(order_id: int) -> dict:
     """
     Get order status, amount, currency, and creation date using order ID.
     """
-    response = requests.get(f"{INTERNAL_API_BASE}/orders/{order_id}")
-    response.raise_for_status()
-    return response.json()
+    if use_http_transport():
+        return internal_get(f"/orders/{order_id}")
+
+    with SessionLocal() as db:
+        order = orders_service.get_order(db, order_id)
+    return order.model_dump(mode="json") if order else ORDER_NOT_FOUND
+
+
+async def _aget_order_status(order_id: int) -> dict:
+    if use_http_transport():
+        return await ainternal_get(f"/orders/{order_id}")
+
+    # Coalesced with concurrent lookups into one query
+    order = await get_order_loader().load(order_id)
+    return order.model_dump(mode="json") if order else ORDER_NOT_FOUND
+
+
+get_order_status = StructuredTool.from_function(
+    func=_get_order_status,
+    coroutine=_aget_order_status,
+    name="get_order_status",
+    callbacks=metrics.CALLBACKS,
+)
+
+
+def _by_id(order_ids: list[int], orders: dict) -> dict:
+    return {
+        order_id: orders[order_id].model_dump(mode="json") if orders.get(order_id) else ORDER_NOT_FOUND
+        for order_id in order_ids
+    }
+
+
+def _chunks(order_ids: list[int]) -> list[list[int]]:
+    return [order_ids[i:i + ORDERS_PER_REQUEST] for i in range(0, len(order_ids), ORDERS_PER_REQUEST)]
+
+
+def _from_listing(order_ids: list[int], found: list[dict]) -> dict:
+    by_id = {order["order_id"]: order for order in found}
+    return {order_id: by_id.get(order_id, ORDER_NOT_FOUND) for order_id in order_ids}
+
+
+def _get_order_statuses(order_ids: list[int]) -> dict:
+    """
+    Get status, amount, currency, and creation date for several orders at once.
+    """
+    order_ids = list(dict.fromkeys(order_ids))
+    if not order_ids:
+        return {}
+    if use_http_transport():
+        found = [order for ids in _chunks(order_ids) for order in internal_get("/orders", {"ids": ids})]
+        return _from_listing(order_ids, found)
+
+    with SessionLocal() as db:
+        return _by_id(order_ids, orders_service.get_orders(db, order_ids))
+
+
+async def aget_order_statuses(order_ids: list[int]) -> dict:
+    order_ids = list(dict.fromkeys(order_ids))
+    if not order_ids:
+        return {}
+    if use_http_transport():
+        pages = await asyncio.gather(*(ainternal_get("/orders", {"ids": ids}) for ids in _chunks(order_ids)))
+        return _from_listing(order_ids, [order for page in pages for order in page])
+
+    return _by_id(order_ids, await get_order_loader().load_many(order_ids))
+
+
+get_order_statuses = StructuredTool.from_function(
+    func=_get_order_statuses,
+    coroutine=aget_order_statuses,
+    name="get_order_statuses",
+    callbacks=metrics.CALLBACKS,
+)
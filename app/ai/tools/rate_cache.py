@@ -0,0 +1,290 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass
+from datetime import date, datetime, timezone
+
+import httpx
+import requests
+from sqlalchemy import text
+
+from app.ai.tools.http_client import get_async_client
+from app.db import SessionLocal, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+# Frankfurter API - free, no API key required. Rates are published once a
+# day, so one fetch per base currency serves every pair for hours.
+FRANKFURTER_URL = "https://api.frankfurter.app/latest"
+
+RATE_CACHE_TTL = int(os.getenv("RATE_CACHE_TTL", 6 * 60 * 60))
+# How old a snapshot may be and still be served when the upstream is down
+RATE_STALE_MAX = int(os.getenv("RATE_STALE_MAX", 7 * 24 * 60 * 60))
+# After an upstream failure, serve stale data for this long before retrying
+RATE_RETRY_BACKOFF = int(os.getenv("RATE_RETRY_BACKOFF", 60))
+RATE_REFRESH_INTERVAL = int(os.getenv("RATE_REFRESH_INTERVAL", 60 * 60))
+RATE_PREFETCH_BASES = [
+    b.strip().upper() for b in os.getenv("RATE_PREFETCH_BASES", "USD,EUR").split(",") if b.strip()
+]
+
+SELECT_RATES = text("""
+    SELECT target_currency, rate, rate_date, updated_at
+    FROM exchange_rates
+    WHERE base_currency = :base
+""")
+
+UPSERT_RATE = text("""
+    INSERT INTO exchange_rates (base_currency, target_currency, rate, rate_date, updated_at)
+    VALUES (:base, :target, :rate, :rate_date, :updated_at)
+    ON CONFLICT (base_currency, target_currency)
+    DO UPDATE SET rate = EXCLUDED.rate,
+                  rate_date = EXCLUDED.rate_date,
+                  updated_at = EXCLUDED.updated_at
+""")
+
+
+class RateUnavailable(Exception):
+    pass
+
+
+@dataclass
+class RateSnapshot:
+    """All published rates for one base currency."""
+    base: str
+    date: str
+    rates: dict
+    fetched_at: float
+
+    def age(self) -> float:
+        return time.time() - self.fetched_at
+
+
+@dataclass
+class RateQuote:
+    from_currency: str
+    to_currency: str
+    rate: float
+    date: str
+    stale: bool
+
+
+# In-memory layer, keyed by base currency
+_snapshots: dict[str, RateSnapshot] = {}
+_retry_at: dict[str, float] = {}
+
+# Single-flight: one upstream fetch per base, whatever the number of waiters
+_sync_locks: dict[str, threading.Lock] = {}
+_sync_locks_guard = threading.Lock()
+_inflight: dict[str, asyncio.Future] = {}
+
+
+def _fresh(snapshot) -> bool:
+    return snapshot is not None and snapshot.age() < RATE_CACHE_TTL
+
+
+def _usable(snapshot) -> bool:
+    return snapshot is not None and snapshot.age() < RATE_STALE_MAX
+
+
+def _newest(*snapshots):
+    candidates = [s for s in snapshots if s is not None]
+    return max(candidates, key=lambda s: s.fetched_at) if candidates else None
+
+
+def _snapshot_from_api(base: str, data: dict) -> RateSnapshot:
+    return RateSnapshot(base=base, date=data.get("date"), rates=data["rates"], fetched_at=time.time())
+
+
+def _snapshot_from_rows(base: str, rows):
+    if not rows:
+        return None
+    # A snapshot is as old as its oldest row
+    updated_at = min(row.updated_at for row in rows)
+    rate_dates = [row.rate_date for row in rows if row.rate_date]
+    return RateSnapshot(
+        base=base,
+        date=max(rate_dates).isoformat() if rate_dates else None,
+        rates={row.target_currency: float(row.rate) for row in rows},
+        fetched_at=updated_at.replace(tzinfo=timezone.utc).timestamp(),
+    )
+
+
+def _upsert_params(snapshot: RateSnapshot) -> list[dict]:
+    updated_at = datetime.fromtimestamp(snapshot.fetched_at, timezone.utc).replace(tzinfo=None)
+    rate_date = date.fromisoformat(snapshot.date) if snapshot.date else None
+    return [
+        {"base": snapshot.base, "target": target, "rate": rate, "rate_date": rate_date, "updated_at": updated_at}
+        for target, rate in snapshot.rates.items()
+    ]
+
+
+def _quote(snapshot: RateSnapshot, from_currency: str, to_currency: str) -> RateQuote:
+    rate = snapshot.rates.get(to_currency)
+    if rate is None:
+        raise RateUnavailable(f"Rate not available for {from_currency} to {to_currency}")
+    return RateQuote(from_currency, to_currency, rate, snapshot.date, stale=not _fresh(snapshot))
+
+
+# --- Sync path -------------------------------------------------------------
+
+def _load_from_db(base: str):
+    try:
+        with SessionLocal() as db:
+            return _snapshot_from_rows(base, db.execute(SELECT_RATES, {"base": base}).fetchall())
+    except Exception as exc:
+        logger.warning("Could not read cached rates for %s: %s", base, exc)
+        return None
+
+
+def _save_to_db(snapshot: RateSnapshot):
+    try:
+        with SessionLocal() as db:
+            db.execute(UPSERT_RATE, _upsert_params(snapshot))
+            db.commit()
+    except Exception as exc:
+        logger.warning("Could not persist rates for %s: %s", snapshot.base, exc)
+
+
+def _fetch(base: str) -> RateSnapshot:
+    response = requests.get(FRANKFURTER_URL, params={"from": base}, timeout=10)
+    response.raise_for_status()
+    return _snapshot_from_api(base, response.json())
+
+
+def _sync_lock(base: str) -> threading.Lock:
+    with _sync_locks_guard:
+        return _sync_locks.setdefault(base, threading.Lock())
+
+
+def get_snapshot(base: str, force: bool = False) -> RateSnapshot:
+    base = base.upper()
+    snapshot = _snapshots.get(base)
+    if _fresh(snapshot) and not force:
+        return snapshot
+
+    with _sync_lock(base):
+        # Another thread may have refreshed while we waited
+        snapshot = _snapshots.get(base)
+        if _fresh(snapshot) and not force:
+            return snapshot
+
+        stored = None if force else _load_from_db(base)
+        if _fresh(stored):
+            _snapshots[base] = stored
+            return stored
+
+        stale = _newest(snapshot, stored)
+        if _usable(stale) and time.time() < _retry_at.get(base, 0):
+            return stale
+
+        try:
+            fresh = _fetch(base)
+        except (requests.RequestException, KeyError, ValueError) as exc:
+            _retry_at[base] = time.time() + RATE_RETRY_BACKOFF
+            if _usable(stale):
+                logger.warning("Rate refresh for %s failed, serving stale rates: %s", base, exc)
+                _snapshots[base] = stale
+                return stale
+            raise RateUnavailable(f"Failed to fetch exchange rate: {str(exc)}") from exc
+
+        _snapshots[base] = fresh
+        _retry_at.pop(base, None)
+        _save_to_db(fresh)
+        return fresh
+
+
+def get_rate(from_currency: str, to_currency: str) -> RateQuote:
+    """Rate for a currency pair from the cache, refreshing it if needed."""
+    from_currency, to_currency = from_currency.upper(), to_currency.upper()
+    if from_currency == to_currency:
+        return RateQuote(from_currency, to_currency, 1.0, date.today().isoformat(), stale=False)
+    return _quote(get_snapshot(from_currency), from_currency, to_currency)
+
+
+# --- Async path ------------------------------------------------------------
+
+async def _aload_from_db(base: str):
+    try:
+        async with AsyncSessionLocal() as db:
+            result = await db.execute(SELECT_RATES, {"base": base})
+            return _snapshot_from_rows(base, result.fetchall())
+    except Exception as exc:
+        logger.warning("Could not read cached rates for %s: %s", base, exc)
+        return None
+
+
+async def _asave_to_db(snapshot: RateSnapshot):
+    try:
+        async with AsyncSessionLocal() as db:
+            await db.execute(UPSERT_RATE, _upsert_params(snapshot))
+            await db.commit()
+    except Exception as exc:
+        logger.warning("Could not persist rates for %s: %s", snapshot.base, exc)
+
+
+async def _afetch(base: str) -> RateSnapshot:
+    response = await get_async_client().get(FRANKFURTER_URL, params={"from": base}, timeout=10)
+    response.raise_for_status()
+    return _snapshot_from_api(base, response.json())
+
+
+async def _arefresh(base: str, force: bool) -> RateSnapshot:
+    snapshot = _snapshots.get(base)
+    stored = None if force else await _aload_from_db(base)
+    if _fresh(stored):
+        _snapshots[base] = stored
+        return stored
+
+    stale = _newest(snapshot, stored)
+    if _usable(stale) and time.time() < _retry_at.get(base, 0):
+        return stale
+
+    try:
+        fresh = await _afetch(base)
+    except (httpx.HTTPError, KeyError, ValueError) as exc:
+        _retry_at[base] = time.time() + RATE_RETRY_BACKOFF
+        if _usable(stale):
+            logger.warning("Rate refresh for %s failed, serving stale rates: %s", base, exc)
+            _snapshots[base] = stale
+            return stale
+        raise RateUnavailable(f"Failed to fetch exchange rate: {str(exc)}") from exc
+
+    _snapshots[base] = fresh
+    _retry_at.pop(base, None)
+    await _asave_to_db(fresh)
+    return fresh
+
+
+async def aget_snapshot(base: str, force: bool = False) -> RateSnapshot:
+    base = base.upper()
+    snapshot = _snapshots.get(base)
+    if _fresh(snapshot) and not force:
+        return snapshot
+
+    # Concurrent misses for the same base all await the first caller's fetch
+    future = _inflight.get(base)
+    if future is None:
+        future = asyncio.ensure_future(_arefresh(base, force))
+        _inflight[base] = future
+        future.add_done_callback(lambda _: _inflight.pop(base, None))
+    return await asyncio.shield(future)
+
+
+async def aget_rate(from_currency: str, to_currency: str) -> RateQuote:
+    from_currency, to_currency = from_currency.upper(), to_currency.upper()
+    if from_currency == to_currency:
+        return RateQuote(from_currency, to_currency, 1.0, date.today().isoformat(), stale=False)
+    return _quote(await aget_snapshot(from_currency), from_currency, to_currency)
+
+
+async def refresh_loop():
+    """Keep every known base currency warm so requests never wait on frankfurter."""
+    while True:
+        for base in sorted(set(RATE_PREFETCH_BASES) | set(_snapshots)):
+            try:
+                await aget_snapshot(base, force=True)
+            except Exception as exc:
+                logger.warning("Scheduled rate refresh for %s failed: %s", base, exc)
+        await asyncio.sleep(RATE_REFRESH_INTERVAL)
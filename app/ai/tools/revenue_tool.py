@@ -1,11 +1,12 @@
-import requests
-from langchain.tools import tool
+from typing import Optional
+from langchain_core.tools import StructuredTool
+from app import metrics
+from app.ai.tools.http_client import use_http_transport, internal_get, ainternal_get
+from app.db import SessionLocal, AsyncSessionLocal
+from app.services import revenue as revenue_service
 
-INTERNAL_API_BASE = "http://127.0.0.1:8000/internal"
 
-
-@tool
-def get_revenue_summary(start_date: str, end_date: str) -> list:
+def _get_revenue_summary(start_date: str, end_date: str) -> list:
     """
     Get revenue summary for a date range.
     Returns total payments and revenue grouped by currency.
@@ -14,9 +15,69 @@ def get_revenue_summary(start_date: str, end_date: str) -> list:
         start_date: Start date in YYYY-MM-DD format
         end_date: End date in YYYY-MM-DD format
     """
-    response = requests.get(
-        f"{INTERNAL_API_BASE}/revenue/summary",
-        params={"start_date": start_date, "end_date": end_date}
-    )
-    response.raise_for_status()
-    return response.json()
+    params = {"start_date": start_date, "end_date": end_date}
+    if use_http_transport():
+        return internal_get("/revenue/summary", params)
+
+    with SessionLocal() as db:
+        rows = revenue_service.get_revenue_summary(db, start_date, end_date)
+    return [row.model_dump(mode="json") for row in rows]
+
+
+async def _aget_revenue_summary(start_date: str, end_date: str) -> list:
+    params = {"start_date": start_date, "end_date": end_date}
+    if use_http_transport():
+        return await ainternal_get("/revenue/summary", params)
+
+    async with AsyncSessionLocal() as db:
+        rows = await revenue_service.aget_revenue_summary(db, start_date, end_date)
+    return [row.model_dump(mode="json") for row in rows]
+
+
+get_revenue_summary = StructuredTool.from_function(
+    func=_get_revenue_summary,
+    coroutine=_aget_revenue_summary,
+    name="get_revenue_summary",
+    callbacks=metrics.CALLBACKS,
+)
+
+
+def _series_params(ranges: list[list[str]], bucket: Optional[str]) -> dict:
+    params = {"range": [f"{start},{end}" for start, end in ranges]}
+    if bucket:
+        params["bucket"] = bucket
+    return params
+
+
+def _get_revenue_series(ranges: list[list[str]], bucket: Optional[str] = None) -> dict:
+    """
+    Get revenue for several date ranges at once, e.g. to compare months,
+    optionally split into day, week or month buckets.
+
+    Args:
+        ranges: [start_date, end_date] pairs in YYYY-MM-DD format
+        bucket: "day", "week" or "month" for a time series within each range
+    """
+    if use_http_transport():
+        return internal_get("/revenue/series", _series_params(ranges, bucket))
+
+    with SessionLocal() as db:
+        series = revenue_service.get_revenue_series(db, [tuple(r) for r in ranges], bucket)
+    return series.model_dump(mode="json")
+
+
+async def _aget_revenue_series(ranges: list[list[str]], bucket: Optional[str] = None) -> dict:
+    if use_http_transport():
+        return await ainternal_get("/revenue/series", _series_params(ranges, bucket))
+
+    async with AsyncSessionLocal() as db:
+        series = await revenue_service.aget_revenue_series(db, [tuple(r) for r in ranges], bucket)
+    return series.model_dump(mode="json")
+
+
+get_revenue_series = StructuredTool.from_function(
+    func=_get_revenue_series,
+    coroutine=_aget_revenue_series,
+    name="get_revenue_series",
+    callbacks=metrics.CALLBACKS,
+)
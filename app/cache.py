@@ -0,0 +1,453 @@
+import asyncio
+import json
+import logging
+import os
+import socket
+import sqlite3
+import ssl
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Optional
+from urllib.parse import unquote, urlparse
+
+logger = logging.getLogger(__name__)
+
+# Where caches that opt into the shared tier keep their entries:
+#   memory - in-process LRU (default; every worker keeps its own)
+#   sqlite - one file shared by every worker on the host
+#   redis  - any server speaking the Redis protocol, shared across hosts
+CACHE_BACKEND = os.getenv("CACHE_BACKEND", "memory").lower()
+CACHE_SQLITE_PATH = os.getenv(
+    "CACHE_SQLITE_PATH", os.path.join(os.path.dirname(__file__), "..", ".cache", "cache.sqlite3")
+)
+# Entries kept in the file, all namespaces together (oldest go first)
+CACHE_SQLITE_MAX_ENTRIES = int(os.getenv("CACHE_SQLITE_MAX_ENTRIES", "100000"))
+CACHE_REDIS_URL = os.getenv("CACHE_REDIS_URL", "redis://127.0.0.1:6379/0")
+# Seconds a shared backend may take before a lookup counts as a miss
+CACHE_TIMEOUT = float(os.getenv("CACHE_TIMEOUT", "0.25"))
+# After failing to connect, a Redis backend fails fast for this many seconds
+CACHE_RETRY_AFTER = float(os.getenv("CACHE_RETRY_AFTER", "1"))
+
+
+class CacheBackend(ABC):
+    """Key/value store under the Cache API; keys carry the namespace, values are bytes."""
+
+    name = "base"
+    # Whether calls may block on I/O, so async callers run them in a thread
+    blocking = True
+
+    @abstractmethod
+    def get(self, key: str) -> Optional[bytes]:
+        ...
+
+    @abstractmethod
+    def set(self, key: str, value: bytes, ttl: Optional[float]):
+        ...
+
+    @abstractmethod
+    def delete(self, key: str):
+        ...
+
+    @abstractmethod
+    def delete_prefix(self, prefix: str):
+        ...
+
+
+class MemoryBackend(CacheBackend):
+    """
+    LRU in this process. Values are kept as given, not serialized, so
+    callers get back the object they stored.
+    """
+
+    name = "memory"
+    blocking = False
+
+    def __init__(self, size: int = 1000):
+        self.size = size
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at is not None and expires_at <= time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, ttl: Optional[float]):
+        with self._lock:
+            self._entries[key] = (value, time.time() + ttl if ttl else None)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.size:
+                self._entries.popitem(last=False)
+
+    def delete(self, key: str):
+        with self._lock:
+            self._entries.pop(key, None)
+
+    def delete_prefix(self, prefix: str):
+        with self._lock:
+            for key in [k for k in self._entries if k.startswith(prefix)]:
+                del self._entries[key]
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class SQLiteBackend(CacheBackend):
+    """
+    One SQLite file in WAL mode, so every worker on the host reads and
+    writes the same entries; reads go through a memory map of the file.
+    """
+
+    name = "sqlite"
+    # Expired and surplus entries are purged on every Nth write
+    PURGE_EVERY = 200
+
+    def __init__(self, path: str = CACHE_SQLITE_PATH, max_entries: int = CACHE_SQLITE_MAX_ENTRIES):
+        self.path = os.path.abspath(path)
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._writes = 0
+        self._conn = None
+        self._pid = None
+
+    @property
+    def _db(self) -> sqlite3.Connection:
+        # Opened on first use, and again in a forked worker
+        if self._conn is None or self._pid != os.getpid():
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=CACHE_TIMEOUT, check_same_thread=False, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA mmap_size=268435456")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS cache ("
+                " key TEXT PRIMARY KEY, value BLOB NOT NULL, expires_at REAL, stored_at REAL NOT NULL)"
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS cache_stored_at ON cache (stored_at)")
+            self._conn, self._pid = conn, os.getpid()
+        return self._conn
+
+    def get(self, key: str) -> Optional[bytes]:
+        with self._lock:
+            row = self._db.execute("SELECT value, expires_at FROM cache WHERE key = ?", (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= time.time()):
+            return None
+        return row[0]
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]):
+        now = time.time()
+        with self._lock:
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache (key, value, expires_at, stored_at) VALUES (?, ?, ?, ?)",
+                (key, value, now + ttl if ttl else None, now),
+            )
+            self._writes += 1
+            if self._writes % self.PURGE_EVERY == 0:
+                self._purge(now)
+
+    def _purge(self, now: float):
+        self._db.execute("DELETE FROM cache WHERE expires_at <= ?", (now,))
+        self._db.execute(
+            "DELETE FROM cache WHERE key IN (SELECT key FROM cache ORDER BY stored_at DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,),
+        )
+
+    def delete(self, key: str):
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE key = ?", (key,))
+
+    def delete_prefix(self, prefix: str):
+        # A range rather than LIKE, which would need its wildcards escaped
+        with self._lock:
+            self._db.execute("DELETE FROM cache WHERE key >= ? AND key < ?", (prefix, prefix + "\U0010ffff"))
+
+
+class RedisError(Exception):
+    pass
+
+
+def _resp(*args) -> bytes:
+    parts = [f"*{len(args)}\r\n".encode()]
+    for arg in args:
+        data = arg if isinstance(arg, bytes) else str(arg).encode()
+        parts += [f"${len(data)}\r\n".encode(), data, b"\r\n"]
+    return b"".join(parts)
+
+
+class RedisBackend(CacheBackend):
+    """
+    Speaks the Redis protocol (RESP) over one socket, without a client
+    library, so Redis, Valkey or a local stand-in all work.
+    """
+
+    name = "redis"
+
+    def __init__(self, url: str = CACHE_REDIS_URL):
+        parsed = urlparse(url)
+        if parsed.scheme not in ("redis", "rediss"):
+            raise ValueError(f"Unsupported CACHE_REDIS_URL scheme: {parsed.scheme}")
+        self.host = parsed.hostname or "127.0.0.1"
+        self.port = parsed.port or 6379
+        self.tls = parsed.scheme == "rediss"
+        self.username = unquote(parsed.username) if parsed.username else None
+        self.password = unquote(parsed.password) if parsed.password else None
+        self.db = int(parsed.path.lstrip("/") or 0)
+        self._lock = threading.Lock()
+        self._sock = None
+        self._file = None
+        self._pid = None
+        self._retry_at = 0.0
+
+    def _connect(self):
+        if time.monotonic() < self._retry_at:
+            raise ConnectionError(f"Redis at {self.host}:{self.port} is unavailable")
+        try:
+            sock = socket.create_connection((self.host, self.port), timeout=CACHE_TIMEOUT)
+        except OSError:
+            # Do not make every lookup wait out the connect timeout again
+            self._retry_at = time.monotonic() + CACHE_RETRY_AFTER
+            raise
+        if self.tls:
+            sock = ssl.create_default_context().wrap_socket(sock, server_hostname=self.host)
+        self._sock, self._file, self._pid = sock, sock.makefile("rb"), os.getpid()
+        if self.password is not None:
+            self._send(*(["AUTH", self.username] if self.username else ["AUTH"]), self.password)
+        if self.db:
+            self._send("SELECT", self.db)
+
+    def _close(self):
+        if self._sock is not None:
+            try:
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = self._file = None
+
+    def _read(self):
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError("Redis connection closed")
+        kind, body = line[:1], line[1:-2]
+        if kind == b"+":
+            return body.decode()
+        if kind == b"-":
+            raise RedisError(body.decode())
+        if kind == b":":
+            return int(body)
+        if kind == b"$":
+            size = int(body)
+            if size < 0:
+                return None
+            data = self._file.read(size + 2)
+            return data[:-2]
+        if kind == b"*":
+            size = int(body)
+            return None if size < 0 else [self._read() for _ in range(size)]
+        raise RedisError(f"Unexpected reply: {line!r}")
+
+    def _send(self, *args):
+        self._sock.sendall(_resp(*args))
+        return self._read()
+
+    def command(self, *args):
+        with self._lock:
+            # Every command we send is idempotent, so one retry on a fresh connection is safe
+            for attempt in range(2):
+                try:
+                    # A forked worker must not share its parent's socket
+                    if self._sock is None or self._pid != os.getpid():
+                        self._connect()
+                    return self._send(*args)
+                except (OSError, ConnectionError):
+                    self._close()
+                    if attempt:
+                        raise
+
+    def get(self, key: str) -> Optional[bytes]:
+        return self.command("GET", key)
+
+    def set(self, key: str, value: bytes, ttl: Optional[float]):
+        if ttl:
+            self.command("SET", key, value, "PX", max(1, int(ttl * 1000)))
+        else:
+            self.command("SET", key, value)
+
+    def delete(self, key: str):
+        self.command("DEL", key)
+
+    def delete_prefix(self, prefix: str):
+        pattern = "".join("\\" + c if c in "*?[]\\" else c for c in prefix) + "*"
+        cursor = "0"
+        while True:
+            cursor, keys = self.command("SCAN", cursor, "MATCH", pattern, "COUNT", 500)
+            cursor = cursor.decode()
+            if keys:
+                self.command("DEL", *keys)
+            if cursor == "0":
+                return
+
+
+class Cache:
+    """
+    One namespace on a backend: get / set with a TTL / delete / invalidate.
+    Values must be JSON-serializable, as that is how they are stored outside
+    the process (never pickle: any client of a shared backend could write
+    one). A shared backend that fails or times out counts as a miss.
+    """
+
+    def __init__(self, namespace: str, backend: CacheBackend, ttl: Optional[float] = None):
+        self.namespace = namespace
+        self.backend = backend
+        self.ttl = ttl
+        self._prefix = f"{namespace}:"
+        self._stats = {"hits": 0, "misses": 0, "errors": 0}
+        self._stats_lock = threading.Lock()
+
+    @property
+    def serialized(self) -> bool:
+        return not isinstance(self.backend, MemoryBackend)
+
+    def _count(self, event: str):
+        with self._stats_lock:
+            self._stats[event] += 1
+
+    def _failed(self, action: str, exc: Exception):
+        self._count("errors")
+        logger.warning("Cache %s on %s failed: %s", action, self.backend.name, exc)
+
+    async def _offload(self, method, *args):
+        if not self.backend.blocking:
+            return method(*args)
+        return await asyncio.to_thread(method, *args)
+
+    def get(self, key: str, default=None) -> Any:
+        try:
+            value = self.backend.get(self._prefix + key)
+            if value is not None and self.serialized:
+                value = json.loads(value)
+        except Exception as exc:
+            self._failed("get", exc)
+            value = None
+        self._count("hits" if value is not None else "misses")
+        return default if value is None else value
+
+    def set(self, key: str, value, ttl: Optional[float] = None):
+        """Store `value` for `ttl` seconds (the cache's default when None; 0 means no expiry)."""
+        ttl = self.ttl if ttl is None else ttl
+        try:
+            data = json.dumps(value, separators=(",", ":")).encode() if self.serialized else value
+            self.backend.set(self._prefix + key, data, ttl or None)
+        except Exception as exc:
+            self._failed("set", exc)
+
+    def delete(self, key: str):
+        try:
+            self.backend.delete(self._prefix + key)
+        except Exception as exc:
+            self._failed("delete", exc)
+
+    def invalidate(self):
+        """Drop every entry in this namespace, for every worker sharing the backend."""
+        try:
+            self.backend.delete_prefix(self._prefix)
+        except Exception as exc:
+            self._failed("invalidate", exc)
+
+    async def aget(self, key: str, default=None) -> Any:
+        """Async version of get; a shared backend is called from a worker thread."""
+        return await self._offload(self.get, key, default)
+
+    async def aset(self, key: str, value, ttl: Optional[float] = None):
+        await self._offload(self.set, key, value, ttl)
+
+    async def adelete(self, key: str):
+        await self._offload(self.delete, key)
+
+    async def ainvalidate(self):
+        await self._offload(self.invalidate)
+
+    def stats(self) -> dict:
+        hits, misses = self._stats["hits"], self._stats["misses"]
+        total = hits + misses
+        stats = {
+            "backend": self.backend.name,
+            **self._stats,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+        }
+        if isinstance(self.backend, MemoryBackend):
+            stats["entries"] = len(self.backend)
+        return stats
+
+
+_shared = {}
+_shared_lock = threading.Lock()
+
+
+def get_backend(name: str = None) -> CacheBackend:
+    """The process-wide sqlite or redis backend, opened on first use."""
+    name = (name or CACHE_BACKEND).lower()
+    with _shared_lock:
+        backend = _shared.get(name)
+        if backend is None:
+            if name == "sqlite":
+                backend = SQLiteBackend()
+            elif name == "redis":
+                backend = RedisBackend()
+            else:
+                raise ValueError(f"Unknown CACHE_BACKEND: {name}")
+            _shared[name] = backend
+    return backend
+
+
+def get_cache(namespace: str, ttl: Optional[float] = None, size: int = 1000) -> Cache:
+    """A cache on CACHE_BACKEND; with the default "memory" it is a private LRU of `size` entries."""
+    if CACHE_BACKEND == "memory":
+        return Cache(namespace, MemoryBackend(size), ttl)
+    return Cache(namespace, get_backend(), ttl)
+
+
+def shared_cache(namespace: str, ttl: Optional[float] = None) -> Optional[Cache]:
+    """
+    A second tier behind a cache that keeps its own in-process layer: the
+    shared backend, or None when CACHE_BACKEND is "memory".
+    """
+    if CACHE_BACKEND == "memory":
+        return None
+    return Cache(namespace, get_backend(), ttl)
+
+
+def _check(backend: str):
+    """Round-trip a value, a TTL and an invalidation through `backend`."""
+    cache = Cache("cache-check", get_backend(backend), ttl=1)
+    cache.invalidate()
+    cache.set("value", {"answer": 42})
+    cache.set("other", [1, 2])
+    if cache.get("value") != {"answer": 42}:
+        raise SystemExit(f"❌ {backend}: stored value not read back ({cache.stats()})")
+    cache.invalidate()
+    if cache.get("other") is not None:
+        raise SystemExit(f"❌ {backend}: invalidate left entries behind")
+    cache.set("short", "lived", ttl=0.2)
+    time.sleep(0.3)
+    if cache.get("short") is not None:
+        raise SystemExit(f"❌ {backend}: entry outlived its TTL")
+    print(f"✅ {backend} works: {cache.stats()}")
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check a shared cache backend (CACHE_SQLITE_PATH / CACHE_REDIS_URL)")
+    parser.add_argument("backend", nargs="?", choices=["sqlite", "redis"], default=None,
+                        help="defaults to CACHE_BACKEND")
+    args = parser.parse_args()
+    _check(args.backend or (CACHE_BACKEND if CACHE_BACKEND != "memory" else "sqlite"))
@@ -1,5 +1,7 @@
 import os
-from sqlalchemy import create_engine
+import threading
+from sqlalchemy import create_engine, make_url
+from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import sessionmaker
 from dotenv import load_dotenv
 
@@ -7,8 +9,68 @@ load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL")
 
-engine = create_engine(DATABASE_URL)
-SessionLocal = sessionmaker(bind=engine)
+# Engines are created on first use, so importing the app neither loads the
+# drivers nor fails when DATABASE_URL is missing (see /ready)
+_lock = threading.Lock()
+_engine = None
+_session_factory = None
+_async_engine = None
+_async_session_factory = None
+
+
+def _database_url() -> str:
+    if not DATABASE_URL:
+        raise RuntimeError("DATABASE_URL is not set")
+    return DATABASE_URL
+
+
+def _async_database_url(url: str):
+    """Point DATABASE_URL at asyncpg, translating libpq-only query options."""
+    url = make_url(url).set(drivername="postgresql+asyncpg")
+    query = dict(url.query)
+    # asyncpg spells sslmode as ssl and does not know channel_binding
+    sslmode = query.pop("sslmode", None)
+    query.pop("channel_binding", None)
+    if sslmode:
+        query["ssl"] = sslmode
+    return url.set(query=query)
+
+
+def get_engine():
+    global _engine, _session_factory
+    with _lock:
+        if _engine is None:
+            _engine = create_engine(_database_url())
+            _session_factory = sessionmaker(bind=_engine)
+    return _engine
+
+
+def get_async_engine():
+    global _async_engine, _async_session_factory
+    with _lock:
+        if _async_engine is None:
+            _async_engine = create_async_engine(_async_database_url(_database_url()))
+            _async_session_factory = async_sessionmaker(bind=_async_engine, expire_on_commit=False)
+    return _async_engine
+
+
+def SessionLocal():
+    """A new Session, like calling a sessionmaker; the engine is created on first use."""
+    get_engine()
+    return _session_factory()
+
+
+def AsyncSessionLocal():
+    get_async_engine()
+    return _async_session_factory()
+
+
+async def dispose():
+    """Close pooled connections of whichever engines were created."""
+    if _engine is not None:
+        _engine.dispose()
+    if _async_engine is not None:
+        await _async_engine.dispose()
 
 
 def get_db():
@@ -17,3 +79,8 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
@@ -0,0 +1,122 @@
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+
+from app.knowledge.config import INDEX_DIR
+
+BM25_FILE = os.path.join(INDEX_DIR, "bm25.json")
+
+# Standard Okapi BM25 parameters
+K1 = 1.5
+B = 0.75
+
+STOPWORDS = {
+    "a", "about", "an", "and", "are", "as", "at", "be", "by", "can", "do", "does",
+    "for", "from", "how", "i", "if", "in", "is", "it", "me", "my", "of", "on", "or",
+    "our", "the", "this", "to", "we", "what", "when", "where", "which", "who", "why",
+    "will", "with", "you", "your",
+}
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text: str) -> list[str]:
+    # Numbers stay: "30 days" should match "30 days"
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def build(chunks: list[tuple[str, dict]]) -> dict:
+    """Inverted index over (chunk_id, metadata) pairs, ready to save as JSON."""
+    postings = {}
+    lengths = []
+    for doc, (_, metadata) in enumerate(chunks):
+        counts = Counter(tokenize(metadata["text"]))
+        lengths.append(sum(counts.values()))
+        for term, tf in counts.items():
+            postings.setdefault(term, []).append([doc, tf])
+    return {
+        "ids": [chunk_id for chunk_id, _ in chunks],
+        "metadata": [metadata for _, metadata in chunks],
+        "lengths": lengths,
+        "postings": postings,
+    }
+
+
+def save(index: dict, path: str = None):
+    path = path or BM25_FILE
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(index, f)
+    os.replace(tmp, path)
+
+
+class BM25Index:
+    def __init__(self, data: dict):
+        self.ids = data["ids"]
+        self.metadata = data["metadata"]
+        self.lengths = data["lengths"]
+        self.postings = data["postings"]
+        n = len(self.ids)
+        self.avgdl = (sum(self.lengths) / n) if n else 0.0
+        self.idf = {
+            term: math.log(1 + (n - len(docs) + 0.5) / (len(docs) + 0.5))
+            for term, docs in self.postings.items()
+        }
+        self._unseen_idf = math.log(1 + (n + 0.5) / 0.5)
+
+    def search(self, query: str, top_k: int) -> list[dict]:
+        """
+        Best chunks first. "score" is raw BM25; "coverage" scales it so that
+        1.0 means every query term appears once in an average-length chunk,
+        which makes it comparable across queries.
+        """
+        terms = [t for t in set(tokenize(query)) if t in self.postings]
+        if not terms:
+            return []
+
+        scores = Counter()
+        for term in terms:
+            idf = self.idf[term]
+            for doc, tf in self.postings[term]:
+                norm = K1 * (1 - B + B * self.lengths[doc] / self.avgdl)
+                scores[doc] += idf * tf * (K1 + 1) / (tf + norm)
+
+        # Each query term once in an average-length chunk; terms the corpus
+        # never uses count at full weight, so they pull coverage down
+        best_possible = sum(self.idf.get(t, self._unseen_idf) for t in set(tokenize(query)))
+        return [
+            {
+                "id": self.ids[doc],
+                "score": score,
+                "coverage": score / best_possible if best_possible else 0.0,
+                "metadata": self.metadata[doc],
+            }
+            for doc, score in scores.most_common(top_k)
+        ]
+
+
+_lock = threading.Lock()
+_loaded = {"mtime": None, "index": None}
+
+
+def get_index():
+    """The on-disk index, reloaded when ingest rewrites it. None if never built."""
+    try:
+        mtime = os.stat(BM25_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return None
+    with _lock:
+        if _loaded["mtime"] != mtime:
+            with open(BM25_FILE) as f:
+                _loaded["index"] = BM25Index(json.load(f))
+            _loaded["mtime"] = mtime
+        return _loaded["index"]
+
+
+def search(query: str, top_k: int) -> list[dict]:
+    index = get_index()
+    return index.search(query, top_k) if index else []
@@ -0,0 +1,25 @@
+import os
+import time
+
+# Local artifacts of the ingestion pipeline (version stamp, manifests, indexes)
+INDEX_DIR = os.path.abspath(os.getenv(
+    "KNOWLEDGE_INDEX_DIR",
+    os.path.join(os.path.dirname(__file__), "..", "..", ".index"),
+))
+
+# Touched after every ingest so long-running processes can tell that the
+# knowledge base changed underneath them
+VERSION_FILE = os.path.join(INDEX_DIR, "version")
+
+
+def bump_knowledge_version():
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    with open(VERSION_FILE, "w") as f:
+        f.write(str(time.time_ns()))
+
+
+def knowledge_version() -> int:
+    try:
+        return os.stat(VERSION_FILE).st_mtime_ns
+    except FileNotFoundError:
+        return 0
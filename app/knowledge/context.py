@@ -0,0 +1,122 @@
+import os
+import re
+from typing import Optional
+
+# Context sent with a DOCS question, in tokens (estimated at CHARS_PER_TOKEN)
+DOCS_CONTEXT_TOKENS = int(os.getenv("DOCS_CONTEXT_TOKENS", "400"))
+CHARS_PER_TOKEN = 4
+# A match is worth answering from when its vector similarity or its BM25
+# coverage reaches these; when none is, the LLM is not called at all.
+# Similarity depends on the embedding model: unrelated text still scores
+# around 0.7 with text-embedding-ada-002, but under 0.2 with -3-small
+DOCS_MIN_SIMILARITY = float(os.getenv("DOCS_MIN_SIMILARITY", "0.7"))
+DOCS_MIN_COVERAGE = float(os.getenv("DOCS_MIN_COVERAGE", "0.2"))
+
+# Ingest splits with a 50 character overlap; shorter shared text is coincidence
+MIN_OVERLAP = 8
+MAX_OVERLAP = 200
+# Below this, a passage that does not fit is dropped rather than cut
+MIN_PASSAGE_TOKENS = 40
+
+_SENTENCE_END = re.compile(r"[.!?](?=\s)")
+
+
+def estimate_tokens(text: str) -> int:
+    return (len(text) + CHARS_PER_TOKEN - 1) // CHARS_PER_TOKEN
+
+
+def relevant(match: dict) -> bool:
+    """Vector matches carry "similarity", BM25 hits "coverage"; fused matches may carry both."""
+    similarity, coverage = match.get("similarity"), match.get("coverage")
+    return (similarity is not None and similarity >= DOCS_MIN_SIMILARITY) or (
+        coverage is not None and coverage >= DOCS_MIN_COVERAGE
+    )
+
+
+def _overlap(before: str, after: str) -> int:
+    """Length of the longest end of `before` that `after` starts with."""
+    for size in range(min(len(before), len(after), MAX_OVERLAP), MIN_OVERLAP - 1, -1):
+        if before.endswith(after[:size]):
+            return size
+    return 0
+
+
+def passages(matches: list[dict]) -> list[str]:
+    """
+    Chunk texts, best match first, with neighbouring chunks of one file
+    merged in file order (their shared overlap kept once) and text already
+    included elsewhere dropped.
+
+    Chunks are told apart by their text, not their position: a store
+    ingested before positions were kept up to date may still have two
+    chunks of an edited file at the same one.
+    """
+    best = {}  # text -> (best rank, metadata)
+    for rank, m in enumerate(matches):
+        best.setdefault(m["metadata"]["text"], (rank, m["metadata"]))
+
+    runs = []  # [best rank, text]
+    previous = None  # (source, position) of the chunk that ended runs[-1]
+    located = sorted(
+        (metadata["source"], metadata["chunk"], rank, text)
+        for text, (rank, metadata) in best.items()
+        if metadata.get("source") is not None and metadata.get("chunk") is not None
+    )
+    for source, position, rank, text in located:
+        if runs and previous == (source, position - 1):
+            run = runs[-1]
+            overlap = _overlap(run[1], text)
+            run[1] += text[overlap:] if overlap else "\n" + text
+            run[0] = min(run[0], rank)
+        else:
+            runs.append([rank, text])
+        previous = (source, position)
+    # Chunks indexed without their position (before ingest recorded it)
+    runs += [
+        [rank, text]
+        for text, (rank, metadata) in best.items()
+        if metadata.get("source") is None or metadata.get("chunk") is None
+    ]
+
+    kept = []
+    for _, text in sorted(runs, key=lambda run: run[0]):
+        if not any(text in other for other in kept):
+            kept.append(text)
+    return kept
+
+
+def _truncate(text: str, tokens: int) -> str:
+    """At most `tokens` of `text`, cut after a sentence (or else a word) where possible."""
+    limit = tokens * CHARS_PER_TOKEN
+    if len(text) <= limit:
+        return text
+    head = text[:limit]
+    ends = [m.end() for m in _SENTENCE_END.finditer(head)]
+    if ends:
+        return head[:ends[-1]]
+    return head.rsplit(None, 1)[0] if " " in head else head
+
+
+def assemble(matches: list[dict], budget: int = None) -> Optional[str]:
+    """
+    Context for the DOCS prompt from ranked matches: relevant ones only,
+    de-duplicated, best first, filled up to `budget` tokens. None when no
+    match is relevant, i.e. the answer would be "I don't know" anyway.
+    """
+    budget = DOCS_CONTEXT_TOKENS if budget is None else budget
+    texts = passages([m for m in matches if relevant(m)])
+    if not texts:
+        return None
+
+    parts, used = [], 0
+    for text in texts:
+        cost = estimate_tokens(text)
+        if used + cost > budget:
+            remaining = budget - used
+            # The best passage is always sent, cut if need be
+            if remaining >= MIN_PASSAGE_TOKENS or not parts:
+                parts.append(_truncate(text, remaining))
+            break
+        parts.append(text)
+        used += cost + 1  # the blank line between passages
+    return "\n\n".join(part for part in parts if part) or None
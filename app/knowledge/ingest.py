@@ -1,40 +1,310 @@
+import argparse
+import hashlib
+import json
 import os
+import time
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
 from dotenv import load_dotenv
 from langchain_community.document_loaders import TextLoader
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_openai import OpenAIEmbeddings
-from pinecone import Pinecone
+from app.knowledge import bm25
+from app.knowledge.config import INDEX_DIR, bump_knowledge_version
+from app.knowledge.vector_store import VECTOR_STORE, get_vector_store
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
 
 load_dotenv()
 
-PINECONE_API_KEY = os.getenv("PINECONE_API_KEY")
-INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
+DOCS_PATH = "knowledge_base"
+CHUNK_SIZE = 500
+CHUNK_OVERLAP = 50
+
+# Texts per embed_documents call, and how many calls run at once
+EMBED_BATCH_SIZE = int(os.getenv("INGEST_EMBED_BATCH_SIZE", "64"))
+EMBED_CONCURRENCY = int(os.getenv("INGEST_EMBED_CONCURRENCY", "4"))
+# Pinecone caps upserts at 1000 vectors and 2 MB per request
+UPSERT_BATCH_SIZE = int(os.getenv("INGEST_UPSERT_BATCH_SIZE", "100"))
+UPSERT_MAX_BYTES = int(os.getenv("INGEST_UPSERT_MAX_BYTES", str(2 * 1024 * 1024)))
+DELETE_BATCH_SIZE = 1000
+
+
+def manifest_file(backend: str) -> str:
+    """What is already in a store: per file, its content hash and chunk IDs."""
+    return os.path.join(INDEX_DIR, f"manifest-{backend}.json")
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def _sha256(data: bytes) -> str:
+    return hashlib.sha256(data).hexdigest()
+
+
+def chunk_id(filename: str, text: str, seen: set) -> str:
+    """
+    Stable ID from the file and the chunk's content. Unchanged chunks keep
+    their ID when other files, or other parts of the same file, change.
+    """
+    base = _sha256(f"{filename}\0{text}".encode())[:24]
+    # Identical chunks in one file still need distinct IDs
+    candidate, n = base, 1
+    while candidate in seen:
+        candidate = f"{base}-{n}"
+        n += 1
+    seen.add(candidate)
+    return candidate
+
+
+def _settings() -> dict:
+    return {"chunk_size": CHUNK_SIZE, "chunk_overlap": CHUNK_OVERLAP}
+
+
+def load_manifest(backend: str) -> dict:
+    empty = {"settings": _settings(), "files": {}, "pending": []}
+    try:
+        with open(manifest_file(backend)) as f:
+            manifest = json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return empty
+    # Different chunking produces different chunks; start from scratch
+    if manifest.get("settings") != _settings():
+        empty["pending"] = [i for entry in manifest.get("files", {}).values() for i in entry["chunks"]]
+        return empty
+    return manifest
+
+
+def save_manifest(backend: str, manifest: dict):
+    os.makedirs(INDEX_DIR, exist_ok=True)
+    path = manifest_file(backend)
+    tmp = f"{path}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp, path)
+
+
+def _splitter():
+    return RecursiveCharacterTextSplitter(chunk_size=CHUNK_SIZE, chunk_overlap=CHUNK_OVERLAP)
+
+
+def split_file(splitter, path: str, filename: str) -> list[tuple]:
+    seen = set()
+    chunks = []
+    for position, chunk in enumerate(splitter.split_documents(TextLoader(path).load())):
+        chunk.metadata = {"text": chunk.page_content, "source": filename, "chunk": position}
+        chunks.append((chunk_id(filename, chunk.page_content, seen), chunk))
+    return chunks
+
+
+def plan_files(docs_path: str, manifest: dict, full: bool = False):
+    """
+    Split only files whose content hash changed. Yields
+    (filename, file_hash, [(chunk_id, chunk), ...]) for each of them.
+    """
+    splitter = _splitter()
+    for filename in sorted(os.listdir(docs_path)):
+        if not filename.endswith(".txt"):
+            continue
+        path = os.path.join(docs_path, filename)
+        with open(path, "rb") as f:
+            file_hash = _sha256(f.read())
+
+        entry = manifest["files"].get(filename)
+        if entry and entry["sha256"] == file_hash and not full:
+            continue
+
+        yield filename, file_hash, split_file(splitter, path, filename)
+
+
+def build_lexical_index(docs_path: str = DOCS_PATH):
+    """
+    Rebuild the BM25 index from every chunk. Splitting is local and cheap,
+    and chunk IDs match the vector store's, so hits from both can be fused.
+    """
+    splitter = _splitter()
+    chunks = []
+    for filename in sorted(os.listdir(docs_path)):
+        if filename.endswith(".txt"):
+            path = os.path.join(docs_path, filename)
+            chunks += [(cid, chunk.metadata) for cid, chunk in split_file(splitter, path, filename)]
+    bm25.save(bm25.build(chunks))
+    return len(chunks)
+
+
+def _approx_size(vector: tuple) -> int:
+    # Rough JSON size: ~20 bytes per float plus the metadata text
+    _, values, metadata = vector
+    return 20 * len(values) + len(metadata["text"]) + 128
+
+
+def _upsert_batches(vectors):
+    """Group vectors into requests under both the count and byte limits."""
+    batch, size = [], 0
+    for vector in vectors:
+        vector_size = _approx_size(vector)
+        if batch and (len(batch) >= UPSERT_BATCH_SIZE or size + vector_size > UPSERT_MAX_BYTES):
+            yield batch
+            batch, size = [], 0
+        batch.append(vector)
+        size += vector_size
+    if batch:
+        yield batch
+
+
+def _embedded(chunk_batches, embeddings, pool: ThreadPoolExecutor, concurrency: int):
+    """
+    Embed batches with at most `concurrency` calls in flight, yielding
+    (id, vector, metadata) in corpus order.
+    """
+    pending = []
+    for batch in chunk_batches:
+        texts = [chunk.page_content for _, chunk in batch]
+        pending.append((batch, pool.submit(embeddings.embed_documents, texts)))
+        if len(pending) >= concurrency:
+            yield from _vectors(*pending.pop(0))
+    for batch, future in pending:
+        yield from _vectors(batch, future)
+
+
+def _vectors(batch, future):
+    for (chunk_id, chunk), vector in zip(batch, future.result()):
+        yield chunk_id, vector, chunk.metadata
+
+
+def _peak_memory_mb():
+    if resource is None:
+        return None
+    # ru_maxrss is KiB on Linux
+    return round(resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024, 1)
+
+
+def ingest(
+    docs_path: str = DOCS_PATH,
+    batch_size: int = EMBED_BATCH_SIZE,
+    concurrency: int = EMBED_CONCURRENCY,
+    full: bool = False,
+    backend: str = VECTOR_STORE,
+) -> dict:
+    """
+    Bring the vector store, and the BM25 index next to it, in line with
+    knowledge_base/.
+
+    Only chunks that are not indexed yet are embedded and upserted, in
+    batches; chunks an edit moved within their file get their stored
+    position updated, and chunks of edited or deleted files are removed
+    afterwards.
+    The manifest is saved after every upsert, so a failed run resumes
+    without re-embedding what it already stored.
+    """
+    embeddings = OpenAIEmbeddings()
+    store = get_vector_store(backend)
+
+    manifest = load_manifest(backend)
+    started = time.perf_counter()
+    indexed = {i for entry in manifest["files"].values() for i in entry["chunks"]}
+    # Upserted by a run that failed before its file was committed
+    uploaded = set(manifest["pending"])
+    known = set() if full else indexed | uploaded
+
+    # Files whose new chunks are not all upserted yet: filename -> (hash, ids, waiting)
+    waiting_files = {}
+
+    def commit_ready_files():
+        for filename, (file_hash, ids, waiting) in list(waiting_files.items()):
+            if not waiting:
+                manifest["files"][filename] = {"sha256": file_hash, "chunks": ids}
+                del waiting_files[filename]
+
+    moved = 0
+
+    def todo():
+        nonlocal moved
+        for filename, file_hash, chunks in plan_files(docs_path, manifest, full):
+            new = [(cid, chunk) for cid, chunk in chunks if cid not in known]
+            # Kept chunks whose position changed, before the file counts as done
+            before = manifest["files"].get(filename, {}).get("chunks", [])
+            was_at = {cid: position for position, cid in enumerate(before)}
+            shifted = [
+                (cid, chunk.metadata) for position, (cid, chunk) in enumerate(chunks)
+                if cid in known and was_at.get(cid) != position
+            ]
+            for items in batched(shifted, UPSERT_BATCH_SIZE):
+                store.update_metadata(items)
+            moved += len(shifted)
+            waiting_files[filename] = (file_hash, [cid for cid, _ in chunks], {cid for cid, _ in new})
+            commit_ready_files()
+            yield from new
+
+    upserted = 0
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        vectors = _embedded(batched(todo(), batch_size), embeddings, pool, concurrency)
+        for batch in _upsert_batches(vectors):
+            store.upsert(batch)
+            upserted += len(batch)
+            ids = {cid for cid, _, _ in batch}
+            uploaded |= ids
+            for _, _, waiting in waiting_files.values():
+                waiting -= ids
+            commit_ready_files()
+            manifest["pending"] = sorted(uploaded)
+            save_manifest(backend, manifest)
+    commit_ready_files()
 
-# 1. Load documents
-docs = []
-docs_path = "knowledge_base"
+    # Drop files that no longer exist, then every ID nothing refers to
+    current = {f for f in os.listdir(docs_path) if f.endswith(".txt")}
+    for filename in set(manifest["files"]) - current:
+        del manifest["files"][filename]
+    live = {i for entry in manifest["files"].values() for i in entry["chunks"]}
+    stale = sorted((indexed | uploaded) - live)
+    for ids in batched(stale, DELETE_BATCH_SIZE):
+        store.delete(ids)
 
-for file in os.listdir(docs_path):
-    if file.endswith(".txt"):
-        loader = TextLoader(os.path.join(docs_path, file))
-        docs.extend(loader.load())
+    manifest["pending"] = []
+    save_manifest(backend, manifest)
+    if upserted or stale or moved or full or not os.path.exists(bm25.BM25_FILE):
+        build_lexical_index(docs_path)
+    if upserted or stale or moved:
+        # Running servers drop cached DOCS answers when they see the new version
+        bump_knowledge_version()
 
-# 2. Split documents
-splitter = RecursiveCharacterTextSplitter(chunk_size=500, chunk_overlap=50)
-chunks = splitter.split_documents(docs)
+    elapsed = time.perf_counter() - started
+    return {
+        "upserted": upserted,
+        "deleted": len(stale),
+        "moved": moved,
+        "unchanged": len(live) - upserted,
+        "seconds": round(elapsed, 2),
+        "chunks_per_second": round(upserted / elapsed, 1) if elapsed else None,
+        "peak_memory_mb": _peak_memory_mb(),
+    }
 
-# 3. Create embeddings
-embeddings = OpenAIEmbeddings()
 
-# 4. Store in Pinecone
-pc = Pinecone(api_key=PINECONE_API_KEY)
-index = pc.Index(INDEX_NAME)
+def main():
+    parser = argparse.ArgumentParser(description="Sync knowledge_base/*.txt into the vector store")
+    parser.add_argument("--docs-path", default=DOCS_PATH)
+    parser.add_argument("--batch-size", type=int, default=EMBED_BATCH_SIZE, help="texts per embedding call")
+    parser.add_argument("--concurrency", type=int, default=EMBED_CONCURRENCY, help="embedding calls in flight")
+    parser.add_argument("--full", action="store_true", help="re-embed every chunk, ignoring the manifest")
+    parser.add_argument("--store", default=VECTOR_STORE, choices=["pinecone", "local"], help="vector store backend")
+    args = parser.parse_args()
 
-vectors = []
-for i, chunk in enumerate(chunks):
-    vector = embeddings.embed_query(chunk.page_content)
-    vectors.append((f"doc-{i}", vector, {"text": chunk.page_content}))
+    stats = ingest(args.docs_path, args.batch_size, args.concurrency, args.full, args.store)
+    print(
+        f"✅ Ingested {stats['upserted']} chunks into {args.store} "
+        f"({stats['unchanged']} unchanged, {stats['moved']} moved, {stats['deleted']} deleted)"
+    )
+    print(
+        f"   {stats['seconds']}s, {stats['chunks_per_second']} chunks/s, "
+        f"peak memory {stats['peak_memory_mb']} MB"
+    )
 
-index.upsert(vectors)
 
-print(f"✅ Ingested {len(vectors)} chunks into Pinecone")
+if __name__ == "__main__":
+    main()
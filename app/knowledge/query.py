@@ -1,35 +1,58 @@
+import asyncio
+import hashlib
 import os
+import threading
+import time
+from collections import OrderedDict
 from dotenv import load_dotenv
-from pinecone import Pinecone
-from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain_openai import OpenAIEmbeddings
+from app import cache, metrics
+from app.ai import llm_gateway
+from app.knowledge import bm25, context
+from app.knowledge.vector_store import get_vector_store
 
 load_dotenv()
 
-INDEX_NAME = os.getenv("PINECONE_INDEX_NAME")
+# 1. Vector store (Pinecone or local, see VECTOR_STORE), opened on first query,
+#    fused with the BM25 keyword index built by ingest
+TOP_K = 3
+# "hybrid" (BM25 + vectors) or "vector" (dense retrieval only)
+DOCS_RETRIEVAL = os.getenv("DOCS_RETRIEVAL", "hybrid").lower()
+# Hits taken from each retriever before fusion, and the RRF damping constant
+FUSION_CANDIDATES = int(os.getenv("DOCS_FUSION_CANDIDATES", "10"))
+RRF_K = 60
+# Answer from BM25 alone, without an embedding call, when its best chunk
+# covers the question this well and beats the runner-up by this factor
+LEXICAL_MIN_COVERAGE = float(os.getenv("DOCS_LEXICAL_MIN_COVERAGE", "0.8"))
+LEXICAL_MARGIN = float(os.getenv("DOCS_LEXICAL_MARGIN", "1.5"))
 
-# 1. Initialize Pinecone
-pc = Pinecone()
-index = pc.Index(INDEX_NAME)
+# 2. Embeddings, created on first use (tests and benchmarks may assign their own)
+embeddings = None
 
-# 2. Embeddings
-embeddings = OpenAIEmbeddings()
 
-# 3. LLM
-llm = ChatOpenAI(model="gpt-4o-mini", temperature=0, max_tokens=100)
+def get_embeddings():
+    global embeddings
+    if embeddings is None:
+        embeddings = OpenAIEmbeddings()
+    return embeddings
 
 
-def ask(question: str):
-    # Embed question
-    query_vector = embeddings.embed_query(question)
+# 3. LLM
+# stream_usage: streamed answers report their token counts too
+llm = llm_gateway.LLM(max_tokens=100, stream_usage=True)
 
-    # Search Pinecone
-    results = index.query(vector=query_vector, top_k=3, include_metadata=True)
+# Recent question embeddings, so the answer cache and retrieval share one API call
+EMBEDDING_MEMO_SIZE = int(os.getenv("EMBEDDING_MEMO_SIZE", "1024"))
+_embedding_memo = OrderedDict()
+_embedding_memo_lock = threading.Lock()
+# ...and across workers, when CACHE_BACKEND is shared
+_shared_embeddings = cache.shared_cache("embeddings", ttl=int(os.getenv("EMBEDDING_CACHE_TTL", "86400")))
 
-    # Combine context
-    context = "\n\n".join(match["metadata"]["text"] for match in results["matches"])
 
-    # Ask LLM
-    prompt = f"""
+# Answer to a DOCS question no retrieved chunk is relevant to, without asking the LLM
+FALLBACK_ANSWER = "I don't know."
+
+PROMPT = """
 Answer the question using ONLY the context below.
 If the answer is not in the context, say "I don't know".
 
@@ -40,9 +63,205 @@ Question:
 {question}
 """
 
-    response = llm.invoke(prompt)
+
+def _shared_key(question: str) -> str:
+    model = getattr(get_embeddings(), "model", "")
+    return f"{model}|{hashlib.sha256(question.encode()).hexdigest()}"
+
+
+def _local_get(question: str):
+    with _embedding_memo_lock:
+        vector = _embedding_memo.get(question)
+        if vector is not None:
+            _embedding_memo.move_to_end(question)
+        return vector
+
+
+def _local_put(question: str, vector):
+    with _embedding_memo_lock:
+        _embedding_memo[question] = vector
+        _embedding_memo.move_to_end(question)
+        while len(_embedding_memo) > EMBEDDING_MEMO_SIZE:
+            _embedding_memo.popitem(last=False)
+
+
+def _memo_get(question: str):
+    vector = _local_get(question)
+    if vector is None and _shared_embeddings is not None:
+        vector = _shared_embeddings.get(_shared_key(question))
+        if vector is not None:
+            _local_put(question, vector)
+    return vector
+
+
+async def _amemo_get(question: str):
+    vector = _local_get(question)
+    if vector is None and _shared_embeddings is not None:
+        vector = await _shared_embeddings.aget(_shared_key(question))
+        if vector is not None:
+            _local_put(question, vector)
+    return vector
+
+
+def _memo_put(question: str, vector):
+    _local_put(question, vector)
+    if _shared_embeddings is not None:
+        _shared_embeddings.set(_shared_key(question), list(vector))
+
+
+async def _amemo_put(question: str, vector):
+    _local_put(question, vector)
+    if _shared_embeddings is not None:
+        await _shared_embeddings.aset(_shared_key(question), list(vector))
+
+
+def embed_question(question: str) -> list[float]:
+    vector = _memo_get(question)
+    if vector is None:
+        with metrics.span("embed_query"):
+            vector = get_embeddings().embed_query(question)
+        _memo_put(question, vector)
+    return vector
+
+
+async def aembed_question(question: str) -> list[float]:
+    vector = await _amemo_get(question)
+    if vector is None:
+        with metrics.span("embed_query"):
+            vector = await get_embeddings().aembed_query(question)
+        await _amemo_put(question, vector)
+    return vector
+
+
+async def aembed_questions(questions: list[str]):
+    """Embed every question not memoized yet in one embed_documents call."""
+    questions = list(dict.fromkeys(questions))
+    memoized = await asyncio.gather(*(_amemo_get(q) for q in questions))
+    missing = [q for q, vector in zip(questions, memoized) if vector is None]
+    if missing:
+        with metrics.span("embed_batch"):
+            vectors = await get_embeddings().aembed_documents(missing)
+        await asyncio.gather(*(_amemo_put(q, vector) for q, vector in zip(missing, vectors)))
+
+
+def _lexical(question: str) -> list[dict]:
+    if DOCS_RETRIEVAL != "hybrid":
+        return []
+    with metrics.span("bm25"):
+        return bm25.search(question, FUSION_CANDIDATES)
+
+
+def _decisive(hits: list[dict]) -> bool:
+    if not hits or hits[0]["coverage"] < LEXICAL_MIN_COVERAGE:
+        return False
+    return len(hits) == 1 or hits[0]["score"] >= LEXICAL_MARGIN * hits[1]["score"]
+
+
+def lexical_matches(question: str):
+    """BM25 hits if they alone settle the question, else None."""
+    hits = _lexical(question)
+    return hits[:TOP_K] if _decisive(hits) else None
+
+
+def needs_embedding(question: str) -> bool:
+    return lexical_matches(question) is None
+
+
+def fuse(*rankings: list[dict]) -> list[dict]:
+    """
+    Reciprocal rank fusion: sum of 1 / (RRF_K + rank) over the rankings.
+    Each match keeps the best "similarity" and "coverage" it had in any of them.
+    """
+    fused = {}
+    for ranking in rankings:
+        for rank, match in enumerate(ranking, start=1):
+            entry = fused.setdefault(match["id"], {"id": match["id"], "score": 0.0, "metadata": match["metadata"]})
+            entry["score"] += 1 / (RRF_K + rank)
+            for signal in ("similarity", "coverage"):
+                if match.get(signal) is not None:
+                    entry[signal] = max(entry.get(signal, match[signal]), match[signal])
+    return sorted(fused.values(), key=lambda m: m["score"], reverse=True)
+
+
+def _with_similarity(matches: list[dict]) -> list[dict]:
+    # A vector store's score is cosine similarity; fusion replaces "score"
+    for match in matches:
+        match["similarity"] = match["score"]
+    return matches
+
+
+def retrieve(question: str) -> list[dict]:
+    hits = _lexical(question)
+    if _decisive(hits):
+        return hits[:TOP_K]
+    query_vector = embed_question(question)
+    with metrics.span("vector_query"):
+        matches = _with_similarity(get_vector_store().query(query_vector, FUSION_CANDIDATES if hits else TOP_K))
+    return fuse(matches, hits)[:TOP_K] if hits else matches
+
+
+async def aretrieve(question: str) -> list[dict]:
+    hits = _lexical(question)
+    if _decisive(hits):
+        return hits[:TOP_K]
+    query_vector = await aembed_question(question)
+    with metrics.span("vector_query"):
+        matches = _with_similarity(await get_vector_store().aquery(query_vector, FUSION_CANDIDATES if hits else TOP_K))
+    return fuse(matches, hits)[:TOP_K] if hits else matches
+
+
+def _build_prompt(question: str, matches: list[dict]):
+    """The DOCS prompt, or None when no match is relevant enough to answer from."""
+    # Deduplicated, best first, within the token budget
+    text = context.assemble(matches)
+    if text is None:
+        metrics.DOCS_NO_MATCH.inc()
+        return None
+    return PROMPT.format(context=text, question=question)
+
+
+def ask(question: str):
+    # Keyword + vector search
+    matches = retrieve(question)
+    prompt = _build_prompt(question, matches)
+    if prompt is None:
+        return FALLBACK_ANSWER
+
+    # Ask LLM
+    with metrics.span("completion"):
+        response = llm.invoke(prompt, purpose="docs")
     return response.content
 
 
+async def aask(question: str):
+    matches = await aretrieve(question)
+    prompt = _build_prompt(question, matches)
+    if prompt is None:
+        return FALLBACK_ANSWER
+
+    with metrics.span("completion"):
+        response = await llm.ainvoke(prompt, purpose="docs")
+    return response.content
+
+
+async def astream(question: str):
+    """aask, yielding the answer text as the LLM generates it."""
+    matches = await aretrieve(question)
+    prompt = _build_prompt(question, matches)
+    if prompt is None:
+        yield FALLBACK_ANSWER
+        return
+
+    # Timed by hand: a span cannot stay open across yields
+    start, first_token = time.perf_counter(), None
+    async for chunk in llm.astream(prompt, purpose="docs"):
+        if chunk.content:
+            if first_token is None:
+                first_token = time.perf_counter() - start
+                metrics.observe("completion_first_token", first_token)
+            yield chunk.content
+    metrics.observe("completion", time.perf_counter() - start)
+
+
 if __name__ == "__main__":
     print(ask("How long does shipping take?"))
@@ -0,0 +1,226 @@
+import asyncio
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from functools import lru_cache
+
+import numpy as np
+
+from app.knowledge.config import INDEX_DIR
+
+# pinecone (hosted index) or local (memory-mapped NumPy matrix under INDEX_DIR)
+VECTOR_STORE = os.getenv("VECTOR_STORE", "pinecone").lower()
+LOCAL_STORE_DIR = os.path.join(INDEX_DIR, "local_store")
+
+
+class VectorStore(ABC):
+    """Minimal interface the RAG pipeline needs from a vector index."""
+
+    name = "base"
+
+    @abstractmethod
+    def upsert(self, vectors: list[tuple]):
+        """Insert or replace (id, values, metadata) tuples."""
+
+    @abstractmethod
+    def update_metadata(self, items: list[tuple]):
+        """Replace the metadata of stored (id, metadata) pairs, keeping their vectors."""
+
+    @abstractmethod
+    def delete(self, ids: list[str]):
+        ...
+
+    @abstractmethod
+    def query(self, vector: list[float], top_k: int) -> list[dict]:
+        """Best matches first, as {"id", "score", "metadata"} dicts."""
+
+    async def aquery(self, vector: list[float], top_k: int) -> list[dict]:
+        # Blocking clients stay off the event loop
+        return await asyncio.to_thread(self.query, vector, top_k)
+
+    def ping(self):
+        """Raise if the index cannot be reached; also opens its connections (see /ready)."""
+
+
+class PineconeStore(VectorStore):
+    name = "pinecone"
+
+    def __init__(self, index_name: str = None, api_key: str = None):
+        from pinecone import Pinecone
+
+        self.index = Pinecone(api_key=api_key or os.getenv("PINECONE_API_KEY")).Index(
+            index_name or os.getenv("PINECONE_INDEX_NAME")
+        )
+
+    def upsert(self, vectors: list[tuple]):
+        self.index.upsert(vectors)
+
+    def update_metadata(self, items: list[tuple]):
+        # Pinecone updates one vector per request
+        for chunk_id, metadata in items:
+            self.index.update(id=chunk_id, set_metadata=metadata)
+
+    def ping(self):
+        self.index.describe_index_stats()
+
+    def delete(self, ids: list[str]):
+        self.index.delete(ids=ids)
+
+    def query(self, vector: list[float], top_k: int) -> list[dict]:
+        results = self.index.query(vector=vector, top_k=top_k, include_metadata=True)
+        return [
+            {"id": match["id"], "score": match["score"], "metadata": match["metadata"]}
+            for match in results["matches"]
+        ]
+
+
+class LocalStore(VectorStore):
+    """
+    Cosine-similarity index kept on disk as a normalized float32 matrix
+    (vectors-*.npy, memory-mapped) with ids and metadata in a JSON sidecar.
+    Meant for corpora of up to a few hundred thousand chunks.
+    """
+
+    name = "local"
+
+    def __init__(self, path: str = LOCAL_STORE_DIR):
+        self.path = path
+        self.meta_file = os.path.join(path, "meta.json")
+        # Serializes writers; readers never take it
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()
+        self._loaded_mtime = None
+        # (matrix, ids, metadata), replaced as a whole and never mutated, so
+        # a reader that takes it once sees all three from the same write
+        self._state = (None, (), ())
+
+    def _load(self) -> tuple:
+        """The current state, (re)opening the files first if another process rewrote them."""
+        try:
+            mtime = os.stat(self.meta_file).st_mtime_ns
+        except FileNotFoundError:
+            return self._state
+        if mtime != self._loaded_mtime:
+            with self._load_lock:
+                if mtime != self._loaded_mtime:
+                    with open(self.meta_file) as f:
+                        meta = json.load(f)
+                    matrix = np.load(os.path.join(self.path, meta["vectors"]), mmap_mode="r")
+                    self._state = (matrix, tuple(meta["ids"]), tuple(meta["metadata"]))
+                    self._loaded_mtime = mtime
+        return self._state
+
+    def _save(self, matrix: np.ndarray, ids: list, metadata: list):
+        os.makedirs(self.path, exist_ok=True)
+        # A new file per write: a mapped file cannot be replaced on Windows,
+        # and readers holding the old map keep a consistent view
+        vectors_name = f"vectors-{time.time_ns()}.npy"
+        np.save(os.path.join(self.path, vectors_name), matrix.astype(np.float32))
+        tmp_meta = f"{self.meta_file}.tmp"
+        with open(tmp_meta, "w") as f:
+            json.dump({"vectors": vectors_name, "ids": ids, "metadata": metadata}, f)
+        os.replace(tmp_meta, self.meta_file)
+        self._loaded_mtime = None
+        self._load()
+
+        for name in os.listdir(self.path):
+            if name.startswith("vectors-") and name != vectors_name:
+                try:
+                    os.remove(os.path.join(self.path, name))
+                except OSError:
+                    pass  # still mapped by another process; removed next time
+
+    def _snapshot(self):
+        matrix, ids, metadata = self._load()
+        if matrix is None:
+            return None, [], []
+        return np.array(matrix), list(ids), list(metadata)
+
+    def upsert(self, vectors: list[tuple]):
+        if not vectors:
+            return
+        with self._lock:
+            matrix, ids, metadata = self._snapshot()
+            positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+
+            new_rows = []
+            for chunk_id, values, meta in vectors:
+                row = _normalize(values)
+                if chunk_id in positions:
+                    matrix[positions[chunk_id]] = row
+                    metadata[positions[chunk_id]] = meta
+                else:
+                    positions[chunk_id] = len(ids)
+                    ids.append(chunk_id)
+                    metadata.append(meta)
+                    new_rows.append(row)
+
+            if new_rows:
+                added = np.stack(new_rows)
+                matrix = added if matrix is None else np.vstack([matrix, added])
+            self._save(matrix, ids, metadata)
+
+    def update_metadata(self, items: list[tuple]):
+        if not items:
+            return
+        with self._lock:
+            matrix, ids, metadata = self._snapshot()
+            positions = {chunk_id: i for i, chunk_id in enumerate(ids)}
+            for chunk_id, meta in items:
+                if chunk_id in positions:
+                    metadata[positions[chunk_id]] = meta
+            if matrix is not None:
+                self._save(matrix, ids, metadata)
+
+    def delete(self, ids: list[str]):
+        with self._lock:
+            matrix, current, metadata = self._snapshot()
+            if matrix is None:
+                return
+            drop = set(ids)
+            keep = [i for i, chunk_id in enumerate(current) if chunk_id not in drop]
+            self._save(
+                matrix[keep] if keep else np.zeros((0, matrix.shape[1]), dtype=np.float32),
+                [current[i] for i in keep],
+                [metadata[i] for i in keep],
+            )
+
+    def query(self, vector: list[float], top_k: int) -> list[dict]:
+        matrix, ids, metadata = self._load()
+        if matrix is None or not len(ids):
+            return []
+
+        scores = matrix @ _normalize(vector)
+        k = min(top_k, len(ids))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [
+            {"id": ids[i], "score": float(scores[i]), "metadata": metadata[i]}
+            for i in top
+        ]
+
+    async def aquery(self, vector: list[float], top_k: int) -> list[dict]:
+        # In-process and sub-millisecond; a thread hop would cost more
+        return self.query(vector, top_k)
+
+    def ping(self):
+        # Maps the matrix, so the first query does not have to
+        self._load()
+
+
+def _normalize(values) -> np.ndarray:
+    vector = np.asarray(values, dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    return vector / norm if norm else vector
+
+
+@lru_cache(maxsize=None)
+def get_vector_store(backend: str = None) -> VectorStore:
+    backend = (backend or VECTOR_STORE).lower()
+    if backend == "local":
+        return LocalStore()
+    if backend == "pinecone":
+        return PineconeStore()
+    raise ValueError(f"Unknown VECTOR_STORE: {backend}")
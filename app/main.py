@@ -1,12 +1,20 @@
 import asyncio
 import logging
 import os
+import time
 
 import httpx
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import JSONResponse
 from contextlib import asynccontextmanager
+from prometheus_client import CONTENT_TYPE_LATEST, generate_latest
+from app import db, metrics, readiness
 from app.routers import orders, revenue, utils, agent, data
+from app.ai.tools.http_client import close_async_client
+from app.ai.tools import rate_cache
+from app.services import order_cache, revenue_rollup
+from app.services.revenue import REVENUE_USE_ROLLUP
 
 logger = logging.getLogger(__name__)
 
@@ -34,8 +42,22 @@ async def keep_alive():
 @asynccontextmanager
 async def lifespan(app: FastAPI):
     task = asyncio.create_task(keep_alive())
+    rates_task = asyncio.create_task(rate_cache.refresh_loop())
+    rollup_task = asyncio.create_task(revenue_rollup.refresh_loop()) if REVENUE_USE_ROLLUP else None
+    order_cache_task = asyncio.create_task(order_cache.listen_loop()) if order_cache.ORDER_CACHE_ENABLED else None
+    warm_up_task = asyncio.create_task(readiness.warm_up()) if readiness.WARMUP else None
+    readiness.mark_started()
     yield
+    if warm_up_task:
+        warm_up_task.cancel()
     task.cancel()
+    rates_task.cancel()
+    if rollup_task:
+        rollup_task.cancel()
+    if order_cache_task:
+        order_cache_task.cancel()
+    await close_async_client()
+    await db.dispose()
 
 
 app = FastAPI(
@@ -54,7 +76,23 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Internal APIs (used by AI tools)
+
+@app.middleware("http")
+async def record_timings(request: Request, call_next):
+    """Per-request latency histogram, plus a Server-Timing header listing the stages that ran."""
+    with metrics.collect_timings() as timings:
+        start = time.perf_counter()
+        response = await call_next(request)
+    route = metrics.route_label(request)
+    metrics.HTTP_SECONDS.labels(request.method, route, response.status_code).observe(time.perf_counter() - start)
+    # Streamed responses send their headers before the stages finish
+    timings.append(("total", time.perf_counter() - start))
+    response.headers["Server-Timing"] = metrics.server_timing(timings)
+    readiness.mark_request(request, time.perf_counter() - start)
+    return response
+
+
+# Internal APIs (same services the AI tools call in-process; HTTP with TOOL_TRANSPORT=http)
 app.include_router(orders.router, prefix="/internal", tags=["Internal"])
 app.include_router(revenue.router, prefix="/internal", tags=["Internal"])
 app.include_router(utils.router, prefix="/internal", tags=["Internal"])
@@ -66,6 +104,22 @@ app.include_router(agent.router, prefix="/agent", tags=["Agent"])
 app.include_router(data.router, prefix="/data", tags=["Data"])
 
 
+@app.get("/metrics", include_in_schema=False)
+def prometheus_metrics():
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+@app.get(
+    "/ready",
+    tags=["Health"],
+    summary="Readiness",
+    description="Checks each dependency (database, vector store, OpenAI client); 503 until they all pass and warm-up is done.",
+)
+async def ready():
+    status = await readiness.readiness()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+
 @app.get("/", tags=["Health"])
 def root():
     return {
@@ -75,5 +129,6 @@ def root():
             "ask": "/agent/ask",
             "sources": "/agent/sources",
             "docs": "/docs",
+            "ready": "/ready",
         },
     }
@@ -0,0 +1,136 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Optional
+from langchain_core.callbacks import BaseCallbackHandler
+from prometheus_client import Counter, Gauge, Histogram
+
+# Stages: detect_intents, extract.<intent>, intent.<INTENT>, embed_query,
+# bm25, vector_query, completion, tool.<name>, tool_http, ...
+STAGE_SECONDS = Histogram(
+    "agent_stage_seconds",
+    "Time spent in one stage of answering a question",
+    ["stage"],
+    buckets=(0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30),
+)
+STAGE_ERRORS = Counter("agent_stage_errors_total", "Stages that raised", ["stage"])
+LLM_TOKENS = Counter("agent_llm_tokens_total", "LLM tokens used, by the stage that made the call", ["stage", "type"])
+LLM_CALLS = Counter("agent_llm_calls_total", "LLM calls, by the stage that made them", ["stage"])
+# event: calls (attempts sent), hits, coalesced, retries, errors
+LLM_GATEWAY = Counter("agent_llm_gateway_total", "LLM gateway events, by purpose", ["purpose", "event"])
+DOCS_NO_MATCH = Counter("agent_docs_no_match_total", "DOCS questions answered with the fallback, as no chunk was relevant")
+INTENTS = Counter("agent_intents_total", "Answered intents", ["intent", "cached"])
+HTTP_SECONDS = Histogram("agent_http_request_seconds", "HTTP request latency", ["method", "route", "status"])
+# phase: startup (lifespan reached), warm_up, first_request
+STARTUP_SECONDS = Gauge("agent_startup_seconds", "Seconds from process start until each startup phase finished", ["phase"])
+
+# The stage running now (labels LLM token counts) and, while serving an
+# HTTP request, the (stage, seconds) pairs behind its Server-Timing header
+_stage: ContextVar[str] = ContextVar("stage", default="other")
+_timings: ContextVar[Optional[list]] = ContextVar("stage_timings", default=None)
+
+
+def observe(stage: str, seconds: float):
+    STAGE_SECONDS.labels(stage).observe(seconds)
+    timings = _timings.get()
+    if timings is not None:
+        timings.append((stage, seconds))
+
+
+@contextmanager
+def span(stage: str):
+    """Time the block as `stage`; works in sync and async code."""
+    token = _stage.set(stage)
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        _stage.reset(token)
+        observe(stage, time.perf_counter() - start)
+
+
+def count_intent(intent: str, cached: bool):
+    INTENTS.labels(intent, "true" if cached else "false").inc()
+
+
+def route_label(request) -> str:
+    """Request path with path parameters put back as {name}, so /orders/7 and /orders/8 share a series."""
+    if request.scope.get("route") is None:
+        return "unmatched"
+    path = request.url.path
+    for name, value in request.path_params.items():
+        path = path.replace(f"/{value}", f"/{{{name}}}", 1)
+    return path
+
+
+@contextmanager
+def collect_timings():
+    """Collect the stage timings of the block (one request); see server_timing()."""
+    timings = []
+    token = _timings.set(timings)
+    try:
+        yield timings
+    finally:
+        # An in-process loopback request must not take over its caller's list
+        _timings.reset(token)
+
+
+def server_timing(timings: list) -> str:
+    """Server-Timing header value: total duration and count per stage."""
+    totals = {}
+    for stage, seconds in timings:
+        total, count = totals.get(stage, (0.0, 0))
+        totals[stage] = (total + seconds, count + 1)
+    return ", ".join(
+        f'{stage};dur={total * 1000:.1f}' + (f';desc="x{count}"' if count > 1 else "")
+        for stage, (total, count) in totals.items()
+    )
+
+
+class LangChainMetrics(BaseCallbackHandler):
+    """Token counts for every LLM call and timings for every tool call."""
+
+    # Called in the caller's context, so the current stage is visible
+    run_inline = True
+
+    def __init__(self):
+        self._tools = {}
+
+    def on_llm_end(self, response, **kwargs):
+        stage = _stage.get()
+        LLM_CALLS.labels(stage).inc()
+        prompt = completion = 0
+        for generations in response.generations:
+            for generation in generations:
+                usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+                if usage:
+                    prompt += usage.get("input_tokens", 0)
+                    completion += usage.get("output_tokens", 0)
+        if not prompt and not completion:
+            usage = (response.llm_output or {}).get("token_usage") or {}
+            prompt, completion = usage.get("prompt_tokens", 0), usage.get("completion_tokens", 0)
+        LLM_TOKENS.labels(stage, "prompt").inc(prompt)
+        LLM_TOKENS.labels(stage, "completion").inc(completion)
+
+    def on_tool_start(self, serialized, input_str, *, run_id, **kwargs):
+        self._tools[run_id] = ((serialized or {}).get("name", "tool"), time.perf_counter())
+
+    def _tool_done(self, run_id, failed: bool):
+        name, start = self._tools.pop(run_id, (None, None))
+        if name is not None:
+            if failed:
+                STAGE_ERRORS.labels(f"tool.{name}").inc()
+            observe(f"tool.{name}", time.perf_counter() - start)
+
+    def on_tool_end(self, output, *, run_id, **kwargs):
+        self._tool_done(run_id, failed=False)
+
+    def on_tool_error(self, error, *, run_id, **kwargs):
+        self._tool_done(run_id, failed=True)
+
+
+# Pass as callbacks= to LLMs and tools
+CALLBACKS = [LangChainMetrics()]
@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+import time
+from contextlib import ExitStack
+from sqlalchemy import text
+from app import db, metrics
+
+logger = logging.getLogger(__name__)
+
+# Open DB pool connections and API keep-alive sessions at startup, in the
+# background; /ready answers 503 until that is done
+WARMUP = os.getenv("WARMUP", "true").lower() in ("1", "true", "yes")
+WARMUP_DB_CONNECTIONS = int(os.getenv("WARMUP_DB_CONNECTIONS", "2"))
+WARMUP_TIMEOUT = float(os.getenv("WARMUP_TIMEOUT", "20"))
+# Per-dependency deadline for a /ready probe
+READY_TIMEOUT = float(os.getenv("READY_TIMEOUT", "3"))
+
+# Health checks and scrapes do not count as the first request
+PROBE_PATHS = {"/", "/ready", "/metrics"}
+
+_imported = time.monotonic()
+_state = {"warm_up": "skipped", "first_request": False}
+_warm_up: dict[str, dict] = {}
+
+
+def process_uptime() -> float:
+    """Seconds since the process started (since this module was imported where /proc is missing)."""
+    try:
+        with open("/proc/self/stat") as f:
+            # Field 22, after the parenthesized command name: start time in clock ticks since boot
+            start_ticks = int(f.read().rsplit(")", 1)[1].split()[19])
+        return time.clock_gettime(time.CLOCK_BOOTTIME) - start_ticks / os.sysconf("SC_CLK_TCK")
+    except (OSError, ValueError, IndexError, AttributeError):
+        return time.monotonic() - _imported
+
+
+def mark_started():
+    uptime = process_uptime()
+    metrics.STARTUP_SECONDS.labels("startup").set(uptime)
+    logger.info("Started %.0f ms after process start", uptime * 1000)
+
+
+def mark_request(request, seconds: float):
+    """Log how long after process start the first real request was served, and how long it took."""
+    if _state["first_request"] or request.url.path in PROBE_PATHS:
+        return
+    _state["first_request"] = True
+    uptime = process_uptime()
+    metrics.STARTUP_SECONDS.labels("first_request").set(uptime)
+    logger.info(
+        "First request (%s %s) served %.0f ms after process start in %.0f ms",
+        request.method, request.url.path, uptime * 1000, seconds * 1000,
+    )
+
+
+def _llms():
+    from app.ai import router
+    from app.knowledge import query
+
+    return [router.llm.model, query.llm.model], query.get_embeddings()
+
+
+async def _check_database():
+    async with db.get_async_engine().connect() as conn:
+        await conn.execute(text("SELECT 1"))
+
+
+async def _check_vector_store():
+    from app.knowledge.vector_store import get_vector_store
+
+    await asyncio.to_thread(lambda: get_vector_store().ping())
+
+
+async def _check_openai():
+    # Clients build (the API key is set); no API call on every probe
+    await asyncio.to_thread(_llms)
+
+
+CHECKS = {
+    "database": _check_database,
+    "vector_store": _check_vector_store,
+    "openai": _check_openai,
+}
+
+
+async def _warm_database():
+    def sync_pool():
+        with ExitStack() as stack:
+            for _ in range(WARMUP_DB_CONNECTIONS):
+                stack.enter_context(db.get_engine().connect())
+
+    async def connect():
+        async with db.get_async_engine().connect() as conn:
+            await conn.execute(text("SELECT 1"))
+
+    # Held at the same time, so each one is a separate pooled connection
+    await asyncio.gather(asyncio.to_thread(sync_pool), *(connect() for _ in range(WARMUP_DB_CONNECTIONS)))
+
+
+async def _warm_openai():
+    models, embeddings = await asyncio.to_thread(_llms)
+    clients = [getattr(model, "root_async_client", None) for model in models]
+    clients.append(getattr(getattr(embeddings, "async_client", None), "_client", None))
+    # Clients with the same settings share an HTTP pool; a free request opens its keep-alive connection
+    pools = {id(client._client): client for client in clients if client is not None}
+    await asyncio.gather(*(client.models.list() for client in pools.values()))
+
+
+WARMERS = {
+    "database": _warm_database,
+    "vector_store": _check_vector_store,
+    "openai": _warm_openai,
+}
+
+
+async def _timed(check, timeout: float) -> dict:
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(check(), timeout)
+        error = None
+    except Exception as exc:
+        error = f"{type(exc).__name__}: {exc}" if str(exc) else type(exc).__name__
+    return {"ready": error is None, "ms": round((time.perf_counter() - start) * 1000, 1), "error": error}
+
+
+async def warm_up():
+    """Run every warmer in parallel; failures are logged and left for /ready to report."""
+    _state["warm_up"] = "running"
+    start = time.perf_counter()
+    results = await asyncio.gather(*(_timed(warmer, WARMUP_TIMEOUT) for warmer in WARMERS.values()))
+    _warm_up.update(zip(WARMERS, results))
+    _state["warm_up"] = "done"
+    metrics.STARTUP_SECONDS.labels("warm_up").set(process_uptime())
+    for name, result in _warm_up.items():
+        if not result["ready"]:
+            logger.warning("Warm-up of %s failed: %s", name, result["error"])
+    logger.info(
+        "Warm-up done in %.0f ms (%s)", (time.perf_counter() - start) * 1000,
+        ", ".join(f"{name} {result['ms']:.0f} ms" for name, result in _warm_up.items()),
+    )
+
+
+async def readiness() -> dict:
+    results = await asyncio.gather(*(_timed(check, READY_TIMEOUT) for check in CHECKS.values()))
+    dependencies = dict(zip(CHECKS, results))
+    return {
+        "ready": _state["warm_up"] != "running" and all(result["ready"] for result in results),
+        "warm_up": _state["warm_up"],
+        "warm_up_ms": {name: result["ms"] for name, result in _warm_up.items()},
+        "dependencies": dependencies,
+        "uptime_seconds": round(process_uptime(), 3),
+    }
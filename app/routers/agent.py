@@ -1,9 +1,16 @@
+import json
+import os
 from fastapi import APIRouter
-from pydantic import BaseModel
-from app.ai.router import route_question, DATA_SOURCES
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, Field
+from typing import Optional
+from app.ai.router import aanswer_question, aanswer_batch, astream_answer, DATA_SOURCES
+from app.ai import answer_cache, intent_classifier, llm_gateway
 
 router = APIRouter()
 
+BATCH_MAX_QUESTIONS = int(os.getenv("BATCH_MAX_QUESTIONS", "1000"))
+
 
 class AskRequest(BaseModel):
     question: str
@@ -13,6 +20,7 @@ class AskResponse(BaseModel):
     question: str
     answer: str
     available_sources: dict
+    cached: bool = False
 
 
 @router.post(
@@ -21,7 +29,7 @@ class AskResponse(BaseModel):
     summary="Ask the Multi-Source Knowledge Agent",
     description="Routes your question to the appropriate data source (database, documents, or external APIs) and returns an answer.",
 )
-def ask_agent(request: AskRequest):
+async def ask_agent(request: AskRequest):
     """
     Main endpoint for the Multi-Source Knowledge Agent.
 
@@ -32,15 +40,84 @@ def ask_agent(request: AskRequest):
     - EXCHANGE: "What is the exchange rate from USD to JPY?"
     - DOCS: "What is the refund policy?"
     """
-    answer = route_question(request.question)
+    result = await aanswer_question(request.question)
 
     return {
         "question": request.question,
-        "answer": answer,
-        "available_sources": DATA_SOURCES
+        "answer": result.answer,
+        "available_sources": DATA_SOURCES,
+        "cached": result.cached,
     }
 
 
+class BatchAskRequest(BaseModel):
+    questions: list[str] = Field(min_length=1, max_length=BATCH_MAX_QUESTIONS)
+
+
+class BatchAskItem(BaseModel):
+    question: str
+    answer: Optional[str] = None
+    cached: bool = False
+    error: Optional[str] = None
+
+
+class BatchAskResponse(BaseModel):
+    results: list[BatchAskItem]
+    available_sources: dict
+
+
+@router.post(
+    "/ask/batch",
+    response_model=BatchAskResponse,
+    summary="Ask many questions at once",
+    description=(
+        "Answers a list of questions in input order. Shared work is done once across the batch: "
+        "intent detection is batched, repeated questions are deduplicated, document questions are "
+        "embedded together and order lookups share one query. Failures are reported per item."
+    ),
+)
+async def ask_agent_batch(request: BatchAskRequest):
+    results = await aanswer_batch(request.questions)
+    return {
+        "results": [vars(result) for result in results],
+        "available_sources": DATA_SOURCES,
+    }
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@router.post(
+    "/ask/stream",
+    summary="Ask the agent, streaming the answer",
+    description=(
+        "Same as /ask, as server-sent events: `intents` once detected, `token` for DOCS answer text "
+        "as it is generated, `section` for each intent as soon as it finishes, and `done` with the "
+        "/ask response body."
+    ),
+    response_class=StreamingResponse,
+)
+async def ask_agent_stream(request: AskRequest):
+    async def events():
+        async for event, data in astream_answer(request.question):
+            if event == "done":
+                data = AskResponse(
+                    question=request.question,
+                    answer=data.answer,
+                    available_sources=DATA_SOURCES,
+                    cached=data.cached,
+                ).model_dump()
+            yield _sse(event, data)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @router.get(
     "/sources",
     summary="List available data sources",
@@ -52,3 +129,40 @@ def list_sources():
         "sources": DATA_SOURCES,
         "total": len(DATA_SOURCES)
     }
+
+
+@router.get(
+    "/intent-stats",
+    summary="Intent detection fast-path statistics",
+    description="How many questions were classified by local rules versus the LLM since startup.",
+)
+def intent_stats():
+    return intent_classifier.stats()
+
+
+@router.get(
+    "/cache",
+    summary="Answer cache statistics",
+    description="Hit ratio, entry counts and TTLs of the per-intent answer cache.",
+)
+def cache_stats():
+    return answer_cache.stats()
+
+
+@router.post(
+    "/cache/invalidate",
+    summary="Invalidate cached answers",
+    description="Drop cached answers for one intent (e.g. DOCS), or for every intent when none is given.",
+)
+def invalidate_cache(intent: Optional[str] = None):
+    answer_cache.invalidate(intent.upper() if intent else None)
+    return answer_cache.stats()
+
+
+@router.get(
+    "/llm",
+    summary="LLM gateway statistics",
+    description="Calls, retries, prompt cache hits and coalesced prompts of the LLM gateway, with its limits.",
+)
+def llm_stats():
+    return llm_gateway.stats()
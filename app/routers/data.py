@@ -1,55 +1,98 @@
-from fastapi import APIRouter, Depends
+from fastapi import APIRouter, Depends, HTTPException, Query, Request, Response
+from fastapi.responses import StreamingResponse
 from sqlalchemy.orm import Session
-from sqlalchemy import text
-from app.db import get_db
+from app.db import SessionLocal, get_db
+from app.services import knowledge_files
+from app.services import listing as listing_service
 from pydantic import BaseModel
 from datetime import datetime
-from typing import Optional
+from decimal import Decimal
+from email.utils import formatdate, parsedate_to_datetime
+from typing import Literal, Optional
+import json
 import os
 
 router = APIRouter()
 
-KNOWLEDGE_BASE_DIR = os.path.join(
-    os.path.dirname(__file__), "..", "..", "knowledge_base"
+MAX_PAGE_SIZE = 1000
+# Rows fetched per round trip when streaming NDJSON
+EXPORT_BATCH_SIZE = int(os.getenv("EXPORT_BATCH_SIZE", "1000"))
+
+ORDERS = listing_service.Listing(
+    table="orders",
+    fields={
+        "order_id": "id",
+        "status": "status",
+        "total_amount": "total_amount",
+        "currency": "currency",
+        "user_id": "user_id",
+        "created_at": "created_at",
+    },
+    filter_columns={"status", "currency"},
+)
+
+PAYMENTS = listing_service.Listing(
+    table="payments",
+    fields={
+        "id": "id",
+        "order_id": "order_id",
+        "provider": "provider",
+        "payment_method": "payment_method",
+        "payment_status": "payment_status",
+        "amount": "amount",
+        "currency": "currency",
+        "paid_at": "paid_at",
+        "created_at": "created_at",
+    },
+    filter_columns={"payment_status", "currency"},
 )
 
 
+# Fields are optional so a projection (?fields=) can leave them out
 class OrderItem(BaseModel):
-    order_id: int
-    status: str
-    total_amount: float
-    currency: str
-    user_id: int
-    created_at: datetime
+    order_id: Optional[int] = None
+    status: Optional[str] = None
+    total_amount: Optional[float] = None
+    currency: Optional[str] = None
+    user_id: Optional[int] = None
+    created_at: Optional[datetime] = None
 
 
 class OrdersResponse(BaseModel):
     orders: list[OrderItem]
-    total: int
+    # Every matching order, as before pagination, on the first page only;
+    # `count` is this page's
+    total: Optional[int] = None
+    count: int
+    next_cursor: Optional[str] = None
 
 
 class PaymentItem(BaseModel):
-    id: int
-    order_id: int
-    provider: str
-    payment_method: Optional[str]
-    payment_status: str
-    amount: float
-    currency: str
-    paid_at: Optional[datetime]
-    created_at: datetime
+    id: Optional[int] = None
+    order_id: Optional[int] = None
+    provider: Optional[str] = None
+    payment_method: Optional[str] = None
+    payment_status: Optional[str] = None
+    amount: Optional[float] = None
+    currency: Optional[str] = None
+    paid_at: Optional[datetime] = None
+    created_at: Optional[datetime] = None
 
 
 class PaymentsResponse(BaseModel):
     payments: list[PaymentItem]
-    total: int
+    total: Optional[int] = None
+    count: int
+    next_cursor: Optional[str] = None
 
 
 class KnowledgeFile(BaseModel):
     filename: str
     title: str
-    content: str
     size_bytes: int
+    sha256: str
+    # Left out when listing with include_content=false
+    content: Optional[str] = None
 
 
 class KnowledgeFilesResponse(BaseModel):
@@ -57,96 +100,153 @@ class KnowledgeFilesResponse(BaseModel):
     total: int
 
 
+def _item(row, columns: dict[str, str]) -> dict:
+    item = {}
+    for name, column in columns.items():
+        value = getattr(row, column)
+        item[name] = float(value) if isinstance(value, Decimal) else value
+    return item
+
+
+def _list(listing, item_model, key: str, fields, limit, cursor, format, db, filters, created_from, created_to):
+    try:
+        columns = listing.columns(fields)
+        criteria = {"filters": filters, "created_from": created_from, "created_to": created_to, "cursor": cursor}
+
+        if format == "ndjson":
+            listing.queries(columns, **criteria)  # reject a bad cursor before streaming starts
+            return StreamingResponse(
+                _ndjson(listing, item_model, columns, criteria),
+                media_type="application/x-ndjson",
+            )
+
+        rows, next_cursor = listing_service.fetch_page(db, listing, columns, limit, **criteria)
+    except listing_service.InvalidListing as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    items = [item_model(**_item(row, columns)) for row in rows]
+    page = {key: items, "count": len(items), "next_cursor": next_cursor}
+    # Counting scans every matching row, so only the first page pays for it
+    if cursor is None:
+        page["total"] = listing_service.count_rows(db, listing, filters, created_from, created_to)
+    return page
+
+
+def _ndjson(listing, item_model, columns: dict[str, str], criteria: dict):
+    # Its own session: the request's get_db session is closed once the response starts
+    with SessionLocal() as db:
+        for rows in listing_service.stream_rows(db, listing, columns, EXPORT_BATCH_SIZE, **criteria):
+            yield "".join(
+                item_model(**_item(row, columns)).model_dump_json(exclude_unset=True) + "\n"
+                for row in rows
+            )
+
+
+PAGINATION_HELP = (
+    "Newest first, `limit` rows per page (100 by default; this endpoint used to return every row at once); "
+    "`total` counts every matching row (first page only, i.e. without `cursor`) and `count` the rows on this page. "
+    "Pass `next_cursor` back as `cursor` for the next page. "
+    "`fields` picks columns (comma-separated). `format=ndjson` streams every matching row, "
+    "one JSON object per line, in constant memory."
+)
+
+
 @router.get(
     "/orders",
     response_model=OrdersResponse,
-    summary="Get all orders",
-    description="Fetch all orders from the database to show users what order data is available",
+    response_model_exclude_unset=True,
+    summary="Get orders",
+    description="Fetch orders from the database to show users what order data is available. " + PAGINATION_HELP,
 )
-def get_all_orders(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT id, user_id, status, total_amount, currency, created_at
-        FROM orders
-        ORDER BY created_at DESC
-    """)
-    results = db.execute(query).fetchall()
-
-    orders = [
-        OrderItem(
-            order_id=row.id,
-            user_id=row.user_id,
-            status=row.status,
-            total_amount=float(row.total_amount),
-            currency=row.currency,
-            created_at=row.created_at,
-        )
-        for row in results
-    ]
-
-    return OrdersResponse(orders=orders, total=len(orders))
+def get_all_orders(
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = None,
+    currency: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    format: Literal["json", "ndjson"] = "json",
+    db: Session = Depends(get_db),
+):
+    filters = {"status": status, "currency": currency.upper() if currency else None}
+    return _list(ORDERS, OrderItem, "orders", fields, limit, cursor, format, db, filters, created_from, created_to)
 
 
 @router.get(
     "/payments",
     response_model=PaymentsResponse,
-    summary="Get all payments",
-    description="Fetch all payments from the database to show users what payment/revenue data is available",
+    response_model_exclude_unset=True,
+    summary="Get payments",
+    description="Fetch payments from the database to show users what payment/revenue data is available. " + PAGINATION_HELP,
 )
-def get_all_payments(db: Session = Depends(get_db)):
-    query = text("""
-        SELECT id, order_id, provider, payment_method, payment_status, amount, currency, paid_at, created_at
-        FROM payments
-        ORDER BY created_at DESC
-    """)
-    results = db.execute(query).fetchall()
-
-    payments = [
-        PaymentItem(
-            id=row.id,
-            order_id=row.order_id,
-            provider=row.provider,
-            payment_method=row.payment_method,
-            payment_status=row.payment_status,
-            amount=float(row.amount),
-            currency=row.currency,
-            paid_at=row.paid_at,
-            created_at=row.created_at,
-        )
-        for row in results
-    ]
-
-    return PaymentsResponse(payments=payments, total=len(payments))
+def get_all_payments(
+    limit: int = Query(100, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    status: Optional[str] = Query(None, description="payment_status: paid, failed or refunded"),
+    currency: Optional[str] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    fields: Optional[str] = Query(None, description="Comma-separated fields to return"),
+    format: Literal["json", "ndjson"] = "json",
+    db: Session = Depends(get_db),
+):
+    filters = {"payment_status": status, "currency": currency.upper() if currency else None}
+    return _list(PAYMENTS, PaymentItem, "payments", fields, limit, cursor, format, db, filters, created_from, created_to)
+
+
+def _not_modified(request: Request, etag: str, last_modified: float) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        return etag in [tag.strip() for tag in if_none_match.split(",")] or if_none_match.strip() == "*"
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since:
+        try:
+            # HTTP dates have one-second resolution
+            return int(last_modified) <= parsedate_to_datetime(if_modified_since).timestamp()
+        except (TypeError, ValueError):
+            return False
+    return False
+
+
+def _conditional(request: Request, etag: str, last_modified: float, body) -> Response:
+    """200 with validators, or an empty 304 when the client's copy is current."""
+    headers = {
+        "ETag": etag,
+        "Last-Modified": formatdate(last_modified, usegmt=True),
+        # Clients may keep a copy but must revalidate it
+        "Cache-Control": "no-cache",
+    }
+    if _not_modified(request, etag, last_modified):
+        return Response(status_code=304, headers=headers)
+    return Response(content=body(), media_type="application/json", headers=headers)
 
 
 @router.get(
     "/knowledge-files",
     response_model=KnowledgeFilesResponse,
     summary="Get all knowledge base files",
-    description="List all knowledge base documents that are ingested into Pinecone for RAG queries",
+    description=(
+        "List all knowledge base documents that are ingested for RAG queries. "
+        "include_content=false returns metadata only. Send If-None-Match with the ETag "
+        "(or If-Modified-Since) to get 304 Not Modified while nothing changed."
+    ),
+)
+def get_knowledge_files(request: Request, include_content: bool = True):
+    snapshot = knowledge_files.get_snapshot()
+    # The two variants have different bodies, so they need different ETags
+    etag = f'"{snapshot.etag}"' if include_content else f'"{snapshot.etag}-meta"'
+    return _conditional(request, etag, snapshot.last_modified, lambda: snapshot.body(include_content))
+
+
+@router.get(
+    "/knowledge-files/{filename}",
+    response_model=KnowledgeFile,
+    summary="Get one knowledge base file",
+    description="Fetch a single document with its content. Supports the same conditional requests as the listing.",
 )
-def get_knowledge_files():
-    files = []
-    knowledge_dir = os.path.abspath(KNOWLEDGE_BASE_DIR)
-
-    if os.path.exists(knowledge_dir):
-        for filename in os.listdir(knowledge_dir):
-            filepath = os.path.join(knowledge_dir, filename)
-            if os.path.isfile(filepath) and filename.endswith(".txt"):
-                with open(filepath, "r", encoding="utf-8") as f:
-                    content = f.read()
-
-                title = filename.replace("_", " ").replace(".txt", "").title()
-
-                files.append(
-                    KnowledgeFile(
-                        filename=filename,
-                        title=title,
-                        content=content,
-                        size_bytes=os.path.getsize(filepath),
-                    )
-                )
-
-    # Sort by filename
-    files.sort(key=lambda x: x.filename)
-
-    return KnowledgeFilesResponse(files=files, total=len(files))
+def get_knowledge_file(filename: str, request: Request):
+    doc = knowledge_files.get_file(filename)
+    if doc is None:
+        raise HTTPException(status_code=404, detail=f"Knowledge file not found: {filename}")
+    return _conditional(request, f'"{doc.sha256[:32]}"', doc.mtime, lambda: json.dumps(doc.to_dict()).encode())
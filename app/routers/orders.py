@@ -1,8 +1,8 @@
-from fastapi import APIRouter, Depends
-from sqlalchemy.orm import Session
-from app.db import get_db
-from sqlalchemy import text
+from fastapi import APIRouter, Query
+from typing import List
 from app.schemas.internal import OrderStatusResponse
+from app.services import order_cache
+from app.services.order_loader import get_order_loader
 
 router = APIRouter()
 
@@ -13,22 +13,31 @@ router = APIRouter()
     summary="Get order status by order ID",
     description="Internal tool: Fetch order status, amount, currency, and creation date",
 )
-def get_order(order_id: int, db: Session = Depends(get_db)):
-    query = text("""
-        SELECT id, status, total_amount, currency, created_at
-        FROM orders
-        WHERE id = :order_id
-    """)
-    result = db.execute(query, {"order_id": order_id}).fetchone()
-
-    if not result:
+async def get_order(order_id: int):
+    # Concurrent requests share one query
+    order = await get_order_loader().load(order_id)
+
+    if not order:
         return {"error": "Order not found"}
 
-    row = dict(result._mapping)
-    return {
-        "order_id": row["id"],
-        "status": row["status"],
-        "total_amount": float(row["total_amount"]),
-        "currency": row["currency"],
-        "created_at": row["created_at"],
-    }
+    return order
+
+
+@router.get(
+    "/orders",
+    response_model=List[OrderStatusResponse],
+    summary="Get several orders by ID",
+    description="Internal tool: Fetch several orders in one query (repeat ids). Unknown IDs are left out.",
+)
+async def get_orders(ids: List[int] = Query(..., max_length=1000)):
+    orders = await get_order_loader().load_many(ids)
+    return [order for order in orders.values() if order is not None]
+
+
+@router.get(
+    "/order-cache",
+    summary="Order cache statistics",
+    description="Hit ratio, entries and invalidations of the order cache. Inactive while its LISTEN connection is down.",
+)
+def get_order_cache_stats():
+    return order_cache.stats()
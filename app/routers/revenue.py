@@ -1,10 +1,10 @@
-from fastapi import APIRouter
-from sqlalchemy.orm import Session
+from fastapi import APIRouter, HTTPException, Query
+from sqlalchemy.ext.asyncio import AsyncSession
 from fastapi import Depends
-from sqlalchemy import text
-from app.db import get_db
-from app.schemas.internal import RevenueSummaryResponse
-from typing import List
+from app.db import get_async_db
+from app.schemas.internal import RevenueSeriesResponse, RevenueSummaryResponse
+from app.services import revenue as revenue_service
+from typing import List, Literal, Optional
 
 router = APIRouter()
 
@@ -15,17 +15,28 @@ router = APIRouter()
     summary="Get revenue summary for date range",
     description="Internal tool: Used by admin AI to calculate revenue",
 )
-def revenue_summary(start_date: str, end_date: str, db: Session = Depends(get_db)):
-    query = text("""
-        SELECT
-            COUNT(*) AS total_payments,
-            COALESCE(SUM(amount), 0) AS total_revenue,
-            currency
-        FROM payments
-        WHERE payment_status = 'paid'
-          AND created_at BETWEEN :start AND :end
-        GROUP BY currency
-    """)
-    rows = db.execute(query, {"start": start_date, "end": end_date}).fetchall()
+async def revenue_summary(start_date: str, end_date: str, db: AsyncSession = Depends(get_async_db)):
+    return await revenue_service.aget_revenue_summary(db, start_date, end_date)
 
-    return [dict(row._mapping) for row in rows]
+
+@router.get(
+    "/revenue/series",
+    response_model=RevenueSeriesResponse,
+    summary="Get revenue for several date ranges or per period",
+    description=(
+        "Internal tool: revenue per currency for each `range` (START_DATE,END_DATE; repeat the "
+        "parameter to compare periods), optionally split into day/week/month buckets. One SQL query."
+    ),
+)
+async def revenue_series(
+    range: List[str] = Query(..., description="START_DATE,END_DATE in YYYY-MM-DD"),
+    bucket: Optional[Literal["day", "week", "month"]] = None,
+    db: AsyncSession = Depends(get_async_db),
+):
+    try:
+        ranges = [tuple(part.strip() for part in value.split(",")) for value in range]
+        if any(len(r) != 2 for r in ranges):
+            raise ValueError("each range must be START_DATE,END_DATE")
+        return await revenue_service.aget_revenue_series(db, ranges, bucket)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
@@ -0,0 +1,38 @@
+from pydantic import BaseModel, Field
+from typing import Literal, Optional
+
+
+class DateRange(BaseModel):
+    start_date: str = Field(description="YYYY-MM-DD")
+    end_date: str = Field(description="YYYY-MM-DD")
+
+
+class DetectedIntent(BaseModel):
+    """One intent in a question, with the arguments its handler needs."""
+
+    intent: Literal["ORDER", "REVENUE", "CURRENCY", "EXCHANGE", "DOCS"]
+    sub_question: str = Field(description="The part of the question this intent answers")
+    order_id: Optional[int] = Field(None, description="ORDER: the order ID")
+    order_ids: Optional[list[int]] = Field(None, description="ORDER: every order ID, when several are asked about")
+    start_date: Optional[str] = Field(None, description="REVENUE: range start, YYYY-MM-DD")
+    end_date: Optional[str] = Field(None, description="REVENUE: range end, YYYY-MM-DD")
+    ranges: Optional[list[DateRange]] = Field(None, description="REVENUE: one range per period being compared")
+    bucket: Optional[Literal["day", "week", "month"]] = Field(
+        None, description="REVENUE: split the range into daily/weekly/monthly figures"
+    )
+    amount: Optional[float] = Field(None, description="CURRENCY: amount to convert")
+    from_currency: Optional[str] = Field(None, description="CURRENCY/EXCHANGE: source ISO code")
+    to_currency: Optional[str] = Field(None, description="CURRENCY/EXCHANGE: target ISO code")
+
+
+class IntentPlan(BaseModel):
+    intents: list[DetectedIntent]
+
+
+class QuestionPlan(BaseModel):
+    index: int = Field(description="Number of the question in the list")
+    intents: list[DetectedIntent]
+
+
+class BatchIntentPlan(BaseModel):
+    plans: list[QuestionPlan]
@@ -1,5 +1,6 @@
 from pydantic import BaseModel
-from datetime import datetime
+from datetime import date, datetime
+from typing import Optional
 
 
 class OrderStatusResponse(BaseModel):
@@ -16,6 +17,25 @@ class RevenueSummaryResponse(BaseModel):
     currency: str
 
 
+class RevenueBucket(BaseModel):
+    period: date
+    currency: str
+    total_payments: int
+    total_revenue: float
+
+
+class RevenueRange(BaseModel):
+    start_date: str
+    end_date: str
+    totals: list[RevenueSummaryResponse]
+    buckets: list[RevenueBucket] = []
+
+
+class RevenueSeriesResponse(BaseModel):
+    bucket: Optional[str] = None
+    ranges: list[RevenueRange]
+
+
 class CurrencyConversionResponse(BaseModel):
     amount: float
     from_currency: str
@@ -0,0 +1,26 @@
+from typing import Optional
+from app.schemas.internal import CurrencyConversionResponse
+
+MOCK_RATES = {
+    ("USD", "BDT"): 120.5,
+    ("USD", "EUR"): 0.92,
+}
+
+
+def convert(amount: float, from_currency: str, to_currency: str) -> Optional[CurrencyConversionResponse]:
+    """Convert with the internal mock rates, or None if the pair is unknown."""
+    # Normalize to uppercase
+    from_curr = from_currency.upper()
+    to_curr = to_currency.upper()
+
+    rate = MOCK_RATES.get((from_curr, to_curr))
+    if not rate:
+        return None
+
+    return CurrencyConversionResponse(
+        amount=amount,
+        from_currency=from_curr,
+        to_currency=to_curr,
+        converted_amount=amount * rate,
+        rate=rate,
+    )
@@ -0,0 +1,108 @@
+import hashlib
+import json
+import os
+import threading
+from dataclasses import dataclass, field
+from typing import Optional
+
+KNOWLEDGE_BASE_DIR = os.path.abspath(
+    os.path.join(os.path.dirname(__file__), "..", "..", "knowledge_base")
+)
+
+
+@dataclass(frozen=True)
+class KnowledgeDoc:
+    filename: str
+    title: str
+    content: str
+    size_bytes: int
+    sha256: str
+    mtime: float
+
+    def to_dict(self, include_content: bool = True) -> dict:
+        data = {"filename": self.filename, "title": self.title, "size_bytes": self.size_bytes, "sha256": self.sha256}
+        if include_content:
+            data["content"] = self.content
+        return data
+
+
+@dataclass
+class Snapshot:
+    """knowledge_base/ as of one scan, with validators and pre-rendered bodies."""
+
+    docs: dict[str, KnowledgeDoc]
+    etag: str
+    last_modified: float
+    _bodies: dict = field(default_factory=dict)
+
+    def body(self, include_content: bool) -> bytes:
+        # Rendered once per snapshot; every later 200 reuses the bytes
+        if include_content not in self._bodies:
+            files = [doc.to_dict(include_content) for doc in self.docs.values()]
+            self._bodies[include_content] = json.dumps({"files": files, "total": len(files)}).encode()
+        return self._bodies[include_content]
+
+
+_lock = threading.Lock()
+_state = {"signature": None, "snapshot": None}
+
+
+def _title(filename: str) -> str:
+    return filename.replace("_", " ").replace(".txt", "").title()
+
+
+def _scan(directory: str) -> tuple:
+    """(directory mtime, (filename, mtime_ns, size) per .txt file): cheap stat calls only."""
+    try:
+        dir_mtime = os.stat(directory).st_mtime_ns
+        entries = sorted(
+            (entry.name, entry.stat().st_mtime_ns, entry.stat().st_size)
+            for entry in os.scandir(directory)
+            if entry.is_file() and entry.name.endswith(".txt")
+        )
+    except FileNotFoundError:
+        return None, ()
+    return dir_mtime, tuple(entries)
+
+
+def _read(directory: str, filename: str, mtime_ns: int) -> KnowledgeDoc:
+    path = os.path.join(directory, filename)
+    with open(path, "rb") as f:
+        raw = f.read()
+    return KnowledgeDoc(
+        filename=filename,
+        title=_title(filename),
+        content=raw.decode("utf-8"),
+        size_bytes=len(raw),
+        sha256=hashlib.sha256(raw).hexdigest(),
+        mtime=mtime_ns / 1e9,
+    )
+
+
+def get_snapshot(directory: str = KNOWLEDGE_BASE_DIR) -> Snapshot:
+    """
+    The current snapshot. Only stats the directory when nothing changed;
+    files whose mtime or size moved are re-read, the rest are reused.
+    """
+    signature = _scan(directory)
+    with _lock:
+        snapshot = _state["snapshot"]
+        if snapshot is not None and _state["signature"] == signature:
+            return snapshot
+
+        previous = {(doc.filename, doc.mtime, doc.size_bytes): doc for doc in snapshot.docs.values()} if snapshot else {}
+        dir_mtime, entries = signature
+        docs = {}
+        for filename, mtime_ns, size in entries:
+            doc = previous.get((filename, mtime_ns / 1e9, size))
+            docs[filename] = doc or _read(directory, filename, mtime_ns)
+
+        digest = hashlib.sha256("".join(f"{d.filename}\0{d.sha256}\n" for d in docs.values()).encode())
+        mtimes = [doc.mtime for doc in docs.values()] + ([dir_mtime / 1e9] if dir_mtime else [])
+        snapshot = Snapshot(docs=docs, etag=digest.hexdigest()[:32], last_modified=max(mtimes, default=0.0))
+        _state["signature"], _state["snapshot"] = signature, snapshot
+        return snapshot
+
+
+def get_file(filename: str, directory: str = KNOWLEDGE_BASE_DIR) -> Optional[KnowledgeDoc]:
+    return get_snapshot(directory).docs.get(filename)
@@ -0,0 +1,154 @@
+import base64
+import json
+from dataclasses import dataclass
+from datetime import datetime
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+
+# Newest first; ties on created_at are broken by id so every row has one
+# position. Rows without created_at come last.
+ORDER_BY = "ORDER BY created_at DESC NULLS LAST, id DESC"
+
+
+class InvalidListing(ValueError):
+    pass
+
+
+@dataclass
+class Listing:
+    """A SELECT over one table, filtered and positioned by a keyset cursor."""
+
+    table: str
+    # API field name -> column, in output order
+    fields: dict[str, str]
+    # Columns the caller may filter on with equality
+    filter_columns: set[str]
+
+    def columns(self, requested: Optional[str]) -> dict[str, str]:
+        """Projection from a comma-separated field list (all fields when empty)."""
+        if not requested:
+            return dict(self.fields)
+        names = [name.strip() for name in requested.split(",") if name.strip()]
+        unknown = [name for name in names if name not in self.fields]
+        if unknown:
+            raise InvalidListing(f"Unknown fields: {', '.join(unknown)}. Available: {', '.join(self.fields)}")
+        return {name: self.fields[name] for name in self.fields if name in names}
+
+    def _where(self, filters: dict, created_from: Optional[datetime], created_to: Optional[datetime]):
+        where, params = [], {}
+        for column, value in filters.items():
+            if value is not None:
+                if column not in self.filter_columns:
+                    raise InvalidListing(f"Cannot filter on {column}")
+                where.append(f"{column} = :{column}")
+                params[column] = value
+        if created_from:
+            where.append("created_at >= :created_from")
+            params["created_from"] = created_from
+        if created_to:
+            where.append("created_at < :created_to")
+            params["created_to"] = created_to
+        return where, params
+
+    def _select(self, columns: dict[str, str], where: list[str], order_by: str, limit: Optional[int]) -> str:
+        # The cursor needs created_at and id even when they are not projected
+        selected = dict.fromkeys([*columns.values(), "created_at", "id"])
+        sql = f"SELECT {', '.join(selected)} FROM {self.table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += f" {order_by}"
+        if limit:
+            sql += " LIMIT :limit"
+        return sql
+
+    def queries(
+        self,
+        columns: dict[str, str],
+        filters: dict,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+        cursor: Optional[str] = None,
+        limit: Optional[int] = None,
+    ) -> list[tuple]:
+        """
+        (statement, params) pairs to run in order until `limit` rows are read.
+
+        After a cursor, rows with a created_at come from a plain row
+        comparison, which the (created_at, id) index serves, and the rows
+        without one from a second query: an OR of the two would make
+        Postgres scan the table.
+        """
+        where, params = self._where(filters, created_from, created_to)
+        if limit:
+            params["limit"] = limit
+        if not cursor:
+            return [(text(self._select(columns, where, ORDER_BY, limit)), params)]
+
+        after_created_at, after_id = decode_cursor(cursor)
+        params["after_id"] = after_id
+        nulls = (
+            text(self._select(columns, [*where, "created_at IS NULL", "id < :after_id"], "ORDER BY id DESC", limit)),
+            params,
+        )
+        if after_created_at is None:
+            return [nulls]
+        dated = self._select(columns, [*where, "(created_at, id) < (:after_created_at, :after_id)"], ORDER_BY, limit)
+        parts = [(text(dated), {**params, "after_created_at": after_created_at})]
+        # A created_at range already rules out rows without one
+        if not (created_from or created_to):
+            parts.append((text(self._select(columns, [*where, "created_at IS NULL"], "ORDER BY id DESC", limit)), params))
+        return parts
+
+    def count_query(
+        self,
+        filters: dict,
+        created_from: Optional[datetime] = None,
+        created_to: Optional[datetime] = None,
+    ):
+        """Rows matching the filters, on every page together."""
+        where, params = self._where(filters, created_from, created_to)
+        sql = f"SELECT COUNT(*) FROM {self.table}"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        return text(sql), params
+
+
+def encode_cursor(row) -> str:
+    created_at = row.created_at.isoformat() if row.created_at else None
+    raw = json.dumps([created_at, row.id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> tuple[Optional[datetime], int]:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        created_at, row_id = json.loads(raw)
+        return (datetime.fromisoformat(created_at) if created_at else None), int(row_id)
+    except (ValueError, TypeError):
+        raise InvalidListing("Invalid cursor")
+
+
+def fetch_page(db: Session, listing: Listing, columns: dict[str, str], limit: int, **criteria):
+    """One page of rows plus the cursor for the next one (None on the last page)."""
+    rows = []
+    for sql, params in listing.queries(columns, limit=limit + 1, **criteria):
+        rows += db.execute(sql, {**params, "limit": limit + 1 - len(rows)}).fetchall()
+        if len(rows) > limit:
+            break
+    next_cursor = encode_cursor(rows[limit - 1]) if len(rows) > limit else None
+    return rows[:limit], next_cursor
+
+
+def count_rows(db: Session, listing: Listing, filters: dict, created_from=None, created_to=None) -> int:
+    return db.execute(*listing.count_query(filters, created_from, created_to)).scalar()
+
+
+def stream_rows(db: Session, listing: Listing, columns: dict[str, str], batch_size: int, **criteria):
+    """
+    Every matching row through a server-side cursor, batch_size rows per
+    round trip, so memory stays flat however large the table is.
+    """
+    for sql, params in listing.queries(columns, **criteria):
+        result = db.execute(sql.execution_options(stream_results=True, yield_per=batch_size), params)
+        yield from result.partitions()
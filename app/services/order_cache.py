@@ -0,0 +1,176 @@
+import asyncio
+import logging
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+from sqlalchemy import text
+from app.db import get_async_engine
+from app.schemas.internal import OrderStatusResponse
+
+logger = logging.getLogger(__name__)
+
+# Channel the orders trigger (order_notify.sql) publishes changed IDs on
+ORDER_CHANNEL = "order_changed"
+ORDER_CACHE_ENABLED = os.getenv("ORDER_CACHE", "true").lower() in ("1", "true", "yes")
+ORDER_CACHE_SIZE = int(os.getenv("ORDER_CACHE_SIZE", "10000"))
+# Upper bound on an entry's age, in case a notification is ever missed
+ORDER_CACHE_TTL = int(os.getenv("ORDER_CACHE_TTL", 10 * 60))
+# How often the listener checks its connection is still alive
+LISTENER_HEALTH_INTERVAL = 10
+LISTENER_RETRY_BACKOFF = 5
+
+# Cached rows are only served while the listener is connected: without it
+# an UPDATE could go unnoticed. Every invalidation bumps seq, so a fetch
+# that started before an invalidation cannot store the row it read.
+_lock = threading.Lock()
+_entries: OrderedDict = OrderedDict()
+_invalidated: OrderedDict = OrderedDict()
+_state = {"active": False, "seq": 0, "active_since": 0}
+_stats = {"hits": 0, "misses": 0, "bypassed": 0, "invalidations": 0}
+
+
+def token() -> int:
+    """Take before reading orders from the database; pass to put()."""
+    with _lock:
+        return _state["seq"]
+
+
+def get(order_id: int) -> Optional[OrderStatusResponse]:
+    with _lock:
+        if not _state["active"]:
+            _stats["bypassed"] += 1
+            return None
+        entry = _entries.get(order_id)
+        if entry is None or entry[1] <= time.monotonic():
+            _entries.pop(order_id, None)
+            _stats["misses"] += 1
+            return None
+        _entries.move_to_end(order_id)
+        _stats["hits"] += 1
+        return entry[0]
+
+
+def put(orders: dict[int, OrderStatusResponse], read_token: int):
+    """Store rows read after read_token was taken, skipping any changed since."""
+    with _lock:
+        if not _state["active"] or read_token < _state["active_since"]:
+            return
+        expires_at = time.monotonic() + ORDER_CACHE_TTL
+        for order_id, order in orders.items():
+            if order is None or _invalidated.get(order_id, -1) > read_token:
+                continue
+            _entries[order_id] = (order, expires_at)
+            _entries.move_to_end(order_id)
+        while len(_entries) > ORDER_CACHE_SIZE:
+            _entries.popitem(last=False)
+
+
+def invalidate(order_id: int):
+    with _lock:
+        _state["seq"] += 1
+        _entries.pop(order_id, None)
+        _invalidated[order_id] = _state["seq"]
+        _invalidated.move_to_end(order_id)
+        while len(_invalidated) > ORDER_CACHE_SIZE:
+            _invalidated.popitem(last=False)
+        _stats["invalidations"] += 1
+
+
+def _set_active(active: bool):
+    with _lock:
+        _state["seq"] += 1
+        _state["active"] = active
+        _state["active_since"] = _state["seq"]
+        _entries.clear()
+        _invalidated.clear()
+
+
+def stats() -> dict:
+    with _lock:
+        hits, misses = _stats["hits"], _stats["misses"]
+        total = hits + misses
+        return {
+            **_stats,
+            "hit_ratio": round(hits / total, 4) if total else 0.0,
+            "entries": len(_entries),
+            "active": _state["active"],
+            "ttl": ORDER_CACHE_TTL,
+        }
+
+
+def _on_notify(connection, pid, channel, payload):
+    try:
+        invalidate(int(payload))
+    except ValueError:
+        logger.warning("Ignoring %s notification with payload %r", channel, payload)
+
+
+async def listen_loop():
+    """
+    Hold a LISTEN connection for the process lifetime. The cache is enabled
+    (empty) once listening and disabled the moment the connection drops,
+    then the loop reconnects.
+    """
+    while True:
+        try:
+            async with get_async_engine().connect() as conn:
+                raw = await conn.get_raw_connection()
+                listener = raw.driver_connection
+                listener.add_termination_listener(lambda _: _set_active(False))
+                await listener.add_listener(ORDER_CHANNEL, _on_notify)
+                _set_active(True)
+                logger.info("Order cache listening on %s", ORDER_CHANNEL)
+                try:
+                    while True:
+                        await asyncio.sleep(LISTENER_HEALTH_INTERVAL)
+                        await listener.execute("SELECT 1")
+                finally:
+                    _set_active(False)
+                    if not listener.is_closed():
+                        await listener.remove_listener(ORDER_CHANNEL, _on_notify)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            logger.warning("Order cache listener disconnected: %s", exc)
+        await asyncio.sleep(LISTENER_RETRY_BACKOFF)
+
+
+async def _check(order_id: int):
+    """Cache one order, touch it in the database, and confirm the eviction."""
+    from app.services.order_loader import get_order_loader
+
+    listener = asyncio.create_task(listen_loop())
+    for _ in range(50):
+        if stats()["active"]:
+            break
+        await asyncio.sleep(0.1)
+    else:
+        raise SystemExit("❌ Listener did not connect")
+
+    loader = get_order_loader()
+    if await loader.load(order_id) is None:
+        raise SystemExit(f"❌ Order {order_id} not found")
+    await loader.load(order_id)
+    print(f"Cached order {order_id}: {stats()}")
+
+    async with get_async_engine().begin() as conn:
+        await conn.execute(text("UPDATE orders SET status = status WHERE id = :id"), {"id": order_id})
+    for _ in range(50):
+        if get(order_id) is None:
+            print(f"✅ Evicted after UPDATE: {stats()}")
+            break
+        await asyncio.sleep(0.1)
+    else:
+        print("❌ No notification received; is order_notify.sql installed?")
+    listener.cancel()
+    await get_async_engine().dispose()
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Check the order cache's LISTEN/NOTIFY invalidation against DATABASE_URL")
+    parser.add_argument("order_id", type=int, help="an existing order ID")
+    asyncio.run(_check(parser.parse_args().order_id))
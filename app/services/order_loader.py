@@ -0,0 +1,92 @@
+import asyncio
+import os
+import weakref
+from typing import Optional
+from app.db import AsyncSessionLocal
+from app.schemas.internal import OrderStatusResponse
+from app.services import order_cache, orders as orders_service
+
+# How long the first lookup waits for others to join its query, and the
+# most IDs one query may carry. A window of 0 still coalesces lookups made
+# in the same event loop tick.
+ORDER_BATCH_WINDOW = float(os.getenv("ORDER_BATCH_WINDOW_MS", "2")) / 1000
+ORDER_BATCH_MAX = int(os.getenv("ORDER_BATCH_MAX", "500"))
+
+
+class OrderLoader:
+    """
+    DataLoader-style batcher: order lookups from concurrent requests that
+    arrive within ORDER_BATCH_WINDOW share one WHERE id = ANY(:ids) query,
+    and requests for the same ID share its result.
+    """
+
+    def __init__(self, window: float = ORDER_BATCH_WINDOW, max_batch: int = ORDER_BATCH_MAX):
+        self.window = window
+        self.max_batch = max_batch
+        self._pending: dict[int, asyncio.Future] = {}
+        self._timer = None
+        self._tasks = set()
+        self.stats = {"lookups": 0, "queries": 0}
+
+    def _future(self, order_id: int) -> asyncio.Future:
+        future = self._pending.get(order_id)
+        if future is None:
+            loop = asyncio.get_running_loop()
+            future = self._pending[order_id] = loop.create_future()
+            if len(self._pending) >= self.max_batch:
+                self._dispatch()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._dispatch)
+        self.stats["lookups"] += 1
+        return future
+
+    def _dispatch(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.get_running_loop().create_task(self._fetch(batch))
+            # The loop only keeps weak references to tasks
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _fetch(self, batch: dict[int, asyncio.Future]):
+        self.stats["queries"] += 1
+        read_token = order_cache.token()
+        try:
+            async with AsyncSessionLocal() as db:
+                orders = await orders_service.aget_orders(db, list(batch))
+        except Exception as exc:
+            for future in batch.values():
+                if not future.done():
+                    future.set_exception(exc)
+            return
+        order_cache.put(orders, read_token)
+        for order_id, future in batch.items():
+            if not future.done():
+                future.set_result(orders.get(order_id))
+
+    async def load(self, order_id: int) -> Optional[OrderStatusResponse]:
+        cached = order_cache.get(order_id)
+        if cached is not None:
+            return cached
+        # shield: one caller giving up must not cancel the others' result
+        return await asyncio.shield(self._future(order_id))
+
+    async def load_many(self, order_ids: list[int]) -> dict[int, Optional[OrderStatusResponse]]:
+        order_ids = list(dict.fromkeys(order_ids))
+        results = await asyncio.gather(*(self.load(order_id) for order_id in order_ids))
+        return dict(zip(order_ids, results))
+
+
+# Futures belong to one event loop, so each loop gets its own loader
+_loaders = weakref.WeakKeyDictionary()
+
+
+def get_order_loader() -> OrderLoader:
+    loop = asyncio.get_running_loop()
+    loader = _loaders.get(loop)
+    if loader is None:
+        loader = _loaders[loop] = OrderLoader()
+    return loader
@@ -0,0 +1,52 @@
+from typing import Optional
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.internal import OrderStatusResponse
+
+ORDER_QUERY = text("""
+    SELECT id, status, total_amount, currency, created_at
+    FROM orders
+    WHERE id = :order_id
+""")
+
+ORDERS_QUERY = text("""
+    SELECT id, status, total_amount, currency, created_at
+    FROM orders
+    WHERE id = ANY(:order_ids)
+""")
+
+
+def _to_order(result) -> Optional[OrderStatusResponse]:
+    if not result:
+        return None
+
+    row = dict(result._mapping)
+    return OrderStatusResponse(
+        order_id=row["id"],
+        status=row["status"],
+        total_amount=float(row["total_amount"]),
+        currency=row["currency"],
+        created_at=row["created_at"],
+    )
+
+
+def get_order(db: Session, order_id: int) -> Optional[OrderStatusResponse]:
+    """Fetch one order by ID, or None if it does not exist."""
+    return _to_order(db.execute(ORDER_QUERY, {"order_id": order_id}).fetchone())
+
+
+async def aget_order(db: AsyncSession, order_id: int) -> Optional[OrderStatusResponse]:
+    result = await db.execute(ORDER_QUERY, {"order_id": order_id})
+    return _to_order(result.fetchone())
+
+
+def get_orders(db: Session, order_ids: list[int]) -> dict[int, OrderStatusResponse]:
+    """Fetch several orders in one query, keyed by ID. Missing IDs are left out."""
+    rows = db.execute(ORDERS_QUERY, {"order_ids": list(order_ids)}).fetchall()
+    return {order.order_id: order for order in map(_to_order, rows)}
+
+
+async def aget_orders(db: AsyncSession, order_ids: list[int]) -> dict[int, OrderStatusResponse]:
+    result = await db.execute(ORDERS_QUERY, {"order_ids": list(order_ids)})
+    return {order.order_id: order for order in map(_to_order, result.fetchall())}
@@ -0,0 +1,205 @@
+import os
+from datetime import datetime, timedelta
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.schemas.internal import RevenueBucket, RevenueRange, RevenueSeriesResponse, RevenueSummaryResponse
+
+REVENUE_SUMMARY_QUERY = text("""
+    SELECT
+        COUNT(*) AS total_payments,
+        COALESCE(SUM(amount), 0) AS total_revenue,
+        currency
+    FROM payments
+    WHERE payment_status = 'paid'
+      AND created_at BETWEEN :start AND :end
+    GROUP BY currency
+""")
+
+
+# Read complete days from revenue_daily (see revenue_rollup.py) instead of
+# scanning payments. Off by default: it needs the tables and trigger from
+# revenue_rollup.sql. Once they exist, results stay exact before the first
+# backfill, just not faster.
+REVENUE_USE_ROLLUP = os.getenv("REVENUE_USE_ROLLUP", "false").lower() in ("1", "true", "yes")
+
+# Same result as REVENUE_SUMMARY_QUERY. Days inside the range and below the
+# rollup watermark come from revenue_daily; the partial days at either end
+# and everything from the watermark on (today) come from payments. Changes
+# to rolled-up days are marked by the revenue_rollup.sql trigger, so they
+# are only stale until the next refresh (REVENUE_ROLLUP_INTERVAL).
+ROLLUP_SUMMARY_QUERY = text("""
+    WITH rolled AS (
+        SELECT GREATEST(
+            CAST(:full_from AS DATE),
+            LEAST(CAST(:full_to AS DATE), COALESCE((SELECT rolled_until FROM revenue_rollup_state), CAST(:full_from AS DATE)))
+        ) AS rolled_to
+    ),
+    parts AS (
+        SELECT currency, total_payments AS payments, total_revenue AS revenue
+        FROM revenue_daily, rolled
+        WHERE day >= CAST(:full_from AS DATE) AND day < rolled.rolled_to
+        UNION ALL
+        SELECT currency, 1, amount
+        FROM payments, rolled
+        WHERE payment_status = 'paid'
+          AND created_at BETWEEN :start AND :end
+          AND (created_at < CAST(:full_from AS DATE) OR created_at >= rolled.rolled_to)
+    )
+    SELECT
+        SUM(payments) AS total_payments,
+        COALESCE(SUM(revenue), 0) AS total_revenue,
+        currency
+    FROM parts
+    GROUP BY currency
+""")
+
+
+def _params(start_date: str, end_date: str) -> dict:
+    # asyncpg binds timestamps strictly, so parse the YYYY-MM-DD strings here
+    return {
+        "start": datetime.fromisoformat(start_date),
+        "end": datetime.fromisoformat(end_date),
+    }
+
+
+def _rollup_params(start_date: str, end_date: str) -> dict:
+    params = _params(start_date, end_date)
+    start, end = params["start"], params["end"]
+    # Whole days inside [start, end]: from the first midnight at or after
+    # start, up to (excluding) the day end falls on
+    full_from = start.date() if start.time() == datetime.min.time() else start.date() + timedelta(days=1)
+    full_to = max(end.date(), full_from)
+    return {**params, "full_from": full_from, "full_to": full_to}
+
+
+def _summary_query(start_date: str, end_date: str):
+    if REVENUE_USE_ROLLUP:
+        return ROLLUP_SUMMARY_QUERY, _rollup_params(start_date, end_date)
+    return REVENUE_SUMMARY_QUERY, _params(start_date, end_date)
+
+
+# Several ranges and/or per-period buckets in one round trip. Each range
+# is split like ROLLUP_SUMMARY_QUERY; GROUPING SETS yields the per-range
+# totals and the per-bucket rows from a single pass over the parts.
+SERIES_QUERY = """
+    WITH ranges AS (
+        SELECT *
+        FROM unnest(
+            CAST(:starts AS TIMESTAMP[]), CAST(:ends AS TIMESTAMP[]),
+            CAST(:full_froms AS DATE[]), CAST(:full_tos AS DATE[])
+        ) WITH ORDINALITY AS r(range_start, range_end, full_from, full_to, range_index)
+    ),
+    {parts},
+    bucketed AS (
+        SELECT range_index, currency, payments, revenue, date_trunc(CAST(:bucket AS TEXT), at) AS bucket
+        FROM parts
+    )
+    SELECT
+        range_index,
+        bucket,
+        GROUPING(bucket) AS is_total,
+        currency,
+        SUM(payments) AS total_payments,
+        COALESCE(SUM(revenue), 0) AS total_revenue
+    FROM bucketed
+    GROUP BY GROUPING SETS ((range_index, currency), (range_index, bucket, currency))
+    ORDER BY range_index, bucket, currency
+"""
+
+SERIES_RAW_PARTS = """
+    parts AS (
+        SELECT r.range_index, p.created_at AS at, p.currency, 1 AS payments, p.amount AS revenue
+        FROM ranges r
+        JOIN payments p
+          ON p.payment_status = 'paid'
+         AND p.created_at BETWEEN r.range_start AND r.range_end
+    )
+"""
+
+SERIES_ROLLUP_PARTS = """
+    rolled AS (
+        SELECT r.*, GREATEST(
+            r.full_from,
+            LEAST(r.full_to, COALESCE((SELECT rolled_until FROM revenue_rollup_state), r.full_from))
+        ) AS rolled_to
+        FROM ranges r
+    ),
+    parts AS (
+        SELECT r.range_index, CAST(d.day AS TIMESTAMP) AS at, d.currency,
+               d.total_payments AS payments, d.total_revenue AS revenue
+        FROM rolled r
+        JOIN revenue_daily d ON d.day >= r.full_from AND d.day < r.rolled_to
+        UNION ALL
+        SELECT r.range_index, p.created_at, p.currency, 1, p.amount
+        FROM rolled r
+        JOIN payments p
+          ON p.payment_status = 'paid'
+         AND p.created_at BETWEEN r.range_start AND r.range_end
+         AND (p.created_at < r.full_from OR p.created_at >= r.rolled_to)
+    )
+"""
+
+SERIES_RAW_QUERY = text(SERIES_QUERY.format(parts=SERIES_RAW_PARTS))
+SERIES_ROLLUP_QUERY = text(SERIES_QUERY.format(parts=SERIES_ROLLUP_PARTS))
+
+BUCKETS = ("day", "week", "month")
+
+
+def _series_query(ranges: list[tuple[str, str]], bucket: str = None):
+    if bucket is not None and bucket not in BUCKETS:
+        raise ValueError(f"bucket must be one of {', '.join(BUCKETS)}")
+    split = [_rollup_params(start_date, end_date) for start_date, end_date in ranges]
+    params = {
+        "starts": [p["start"] for p in split],
+        "ends": [p["end"] for p in split],
+        "full_froms": [p["full_from"] for p in split],
+        "full_tos": [p["full_to"] for p in split],
+        "bucket": bucket,
+    }
+    return (SERIES_ROLLUP_QUERY if REVENUE_USE_ROLLUP else SERIES_RAW_QUERY), params
+
+
+def _to_series(ranges: list[tuple[str, str]], bucket: str, rows) -> RevenueSeriesResponse:
+    series = [RevenueRange(start_date=start, end_date=end, totals=[]) for start, end in ranges]
+    for row in rows:
+        target = series[row.range_index - 1]
+        if row.is_total:
+            target.totals.append(RevenueSummaryResponse(
+                total_payments=row.total_payments, total_revenue=row.total_revenue, currency=row.currency,
+            ))
+        elif bucket:
+            target.buckets.append(RevenueBucket(
+                period=row.bucket.date(), currency=row.currency,
+                total_payments=row.total_payments, total_revenue=row.total_revenue,
+            ))
+    return RevenueSeriesResponse(bucket=bucket, ranges=series)
+
+
+def get_revenue_series(db: Session, ranges: list[tuple[str, str]], bucket: str = None) -> RevenueSeriesResponse:
+    """
+    Paid revenue per currency for each (start_date, end_date) range, and
+    optionally per day/week/month bucket inside each range, in one query.
+    """
+    rows = db.execute(*_series_query(ranges, bucket)).fetchall()
+    return _to_series(ranges, bucket, rows)
+
+
+async def aget_revenue_series(db: AsyncSession, ranges: list[tuple[str, str]], bucket: str = None) -> RevenueSeriesResponse:
+    result = await db.execute(*_series_query(ranges, bucket))
+    return _to_series(ranges, bucket, result.fetchall())
+
+
+def _to_summary(rows) -> list[RevenueSummaryResponse]:
+    return [RevenueSummaryResponse(**row._mapping) for row in rows]
+
+
+def get_revenue_summary(db: Session, start_date: str, end_date: str) -> list[RevenueSummaryResponse]:
+    """Paid payment count and revenue per currency between two dates."""
+    rows = db.execute(*_summary_query(start_date, end_date)).fetchall()
+    return _to_summary(rows)
+
+
+async def aget_revenue_summary(db: AsyncSession, start_date: str, end_date: str) -> list[RevenueSummaryResponse]:
+    result = await db.execute(*_summary_query(start_date, end_date))
+    return _to_summary(result.fetchall())
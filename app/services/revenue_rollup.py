@@ -0,0 +1,159 @@
+import argparse
+import asyncio
+import logging
+import os
+from datetime import date, timedelta
+from sqlalchemy import text
+from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
+from app.db import SessionLocal, AsyncSessionLocal
+
+logger = logging.getLogger(__name__)
+
+ROLLUP_REFRESH_INTERVAL = int(os.getenv("REVENUE_ROLLUP_INTERVAL", 15 * 60))
+# Days per transaction when backfilling a long history
+BACKFILL_CHUNK_DAYS = 31
+
+REFRESH_BOUNDS = text("""
+    SELECT
+        (SELECT rolled_until FROM revenue_rollup_state) AS rolled_until,
+        (SELECT CAST(MIN(created_at) AS DATE) FROM payments WHERE payment_status = 'paid') AS first_day,
+        CURRENT_DATE AS today
+""")
+
+# Rolled-up days that changed since, as marked by the trigger in
+# revenue_rollup.sql; days from the watermark on are recomputed anyway
+DIRTY_DAYS = text("""
+    SELECT day FROM revenue_dirty_days
+    WHERE day < :before
+    ORDER BY day
+""")
+
+# In the same transaction as the recomputation, so a failed refresh leaves
+# the days marked
+CLEAR_DIRTY_DAYS = text("""
+    DELETE FROM revenue_dirty_days
+    WHERE day >= :from_day AND day < :to_day
+""")
+
+DELETE_DAYS = text("""
+    DELETE FROM revenue_daily
+    WHERE day >= :from_day AND day < :to_day
+""")
+
+INSERT_DAYS = text("""
+    INSERT INTO revenue_daily (day, currency, total_payments, total_revenue)
+    SELECT CAST(created_at AS DATE), currency, COUNT(*), SUM(amount)
+    FROM payments
+    WHERE payment_status = 'paid'
+      AND created_at >= :from_day AND created_at < :to_day
+    GROUP BY CAST(created_at AS DATE), currency
+""")
+
+# Days before rolled_until are complete. Only move forward: re-rolling
+# old days must not shrink the complete range.
+ADVANCE_WATERMARK = text("""
+    INSERT INTO revenue_rollup_state (id, rolled_until)
+    VALUES (TRUE, :to_day)
+    ON CONFLICT (id) DO UPDATE
+    SET rolled_until = GREATEST(revenue_rollup_state.rolled_until, EXCLUDED.rolled_until)
+""")
+
+
+def _chunks(from_day: date, to_day: date):
+    while from_day < to_day:
+        end = min(from_day + timedelta(days=BACKFILL_CHUNK_DAYS), to_day)
+        yield from_day, end
+        from_day = end
+
+
+def _from_day(bounds, since: date, full: bool) -> date:
+    if bounds.rolled_until is None or full:
+        # Nothing rolled up yet: the watermark means "complete from the first payment"
+        return bounds.first_day or bounds.today
+    # Starting above the watermark would leave a gap under it
+    return min(since or bounds.rolled_until, bounds.rolled_until)
+
+
+def _ranges(dirty_days: list[date], from_day: date, today: date) -> list[tuple[date, date]]:
+    """Runs of consecutive dirty days below from_day, then from_day up to today in chunks."""
+    runs = []
+    for day in dirty_days:
+        if runs and runs[-1][1] == day:
+            runs[-1][1] = day + timedelta(days=1)
+        else:
+            runs.append([day, day + timedelta(days=1)])
+    return [tuple(run) for run in runs] + list(_chunks(from_day, today))
+
+
+def _result(from_day: date, today: date, dirty_days: list[date]) -> dict:
+    return {
+        "from_day": from_day.isoformat(),
+        "to_day": today.isoformat(),
+        "days": (today - from_day).days,
+        "dirty_days": len(dirty_days),
+    }
+
+
+def refresh(db: Session, since: date = None, full: bool = False) -> dict:
+    """
+    Recompute revenue_daily for the days whose payments changed since they
+    were rolled up, and for every complete day from `since` (default: the
+    watermark; `full` starts at the first payment) up to yesterday, one
+    committed chunk at a time, advancing the watermark as it goes. Today is
+    left to the raw rows.
+    """
+    bounds = db.execute(REFRESH_BOUNDS).one()
+    from_day = _from_day(bounds, since, full)
+    dirty_days = db.execute(DIRTY_DAYS, {"before": from_day}).scalars().all()
+    for chunk_from, chunk_to in _ranges(dirty_days, from_day, bounds.today):
+        params = {"from_day": chunk_from, "to_day": chunk_to}
+        db.execute(CLEAR_DIRTY_DAYS, params)
+        db.execute(DELETE_DAYS, params)
+        db.execute(INSERT_DAYS, params)
+        db.execute(ADVANCE_WATERMARK, params)
+        db.commit()
+    return _result(from_day, bounds.today, dirty_days)
+
+
+async def arefresh(db: AsyncSession, since: date = None, full: bool = False) -> dict:
+    bounds = (await db.execute(REFRESH_BOUNDS)).one()
+    from_day = _from_day(bounds, since, full)
+    dirty_days = (await db.execute(DIRTY_DAYS, {"before": from_day})).scalars().all()
+    for chunk_from, chunk_to in _ranges(dirty_days, from_day, bounds.today):
+        params = {"from_day": chunk_from, "to_day": chunk_to}
+        await db.execute(CLEAR_DIRTY_DAYS, params)
+        await db.execute(DELETE_DAYS, params)
+        await db.execute(INSERT_DAYS, params)
+        await db.execute(ADVANCE_WATERMARK, params)
+        await db.commit()
+    return _result(from_day, bounds.today, dirty_days)
+
+
+async def refresh_loop():
+    """Roll up each day once it is over, so summaries only scan today's raw rows."""
+    while True:
+        try:
+            async with AsyncSessionLocal() as db:
+                await arefresh(db)
+        except Exception as exc:
+            logger.warning("Revenue rollup refresh failed: %s", exc)
+        await asyncio.sleep(ROLLUP_REFRESH_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Refresh the revenue_daily rollup from payments")
+    parser.add_argument("--backfill", action="store_true", help="recompute every day since the first payment")
+    parser.add_argument("--since", type=date.fromisoformat, help="recompute from this day (YYYY-MM-DD)")
+    args = parser.parse_args()
+
+    with SessionLocal() as db:
+        stats = refresh(db, since=args.since, full=args.backfill)
+    print(
+        f"✅ Rolled up {stats['days']} days ({stats['from_day']} to {stats['to_day']}, exclusive) "
+        f"and {stats['dirty_days']} changed earlier days"
+    )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,378 @@
+"""
+Deterministic local stand-ins for OpenAI, Pinecone and frankfurter.app.
+Each one sleeps for a latency drawn from a seeded log-normal distribution,
+so a run has realistic tails without touching the network.
+"""
+import asyncio
+import hashlib
+import json
+import math
+import random
+import fnmatch
+import re
+import socket
+import socketserver
+import threading
+import time
+from collections import Counter
+from typing import Any
+
+import httpx
+import numpy as np
+from langchain_core.embeddings import Embeddings
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.runnables import RunnableLambda
+
+from app.knowledge import bm25
+
+# kind -> (median ms, p99 ms)
+DEFAULT_LATENCY = {
+    "detect": (650, 2200),
+    "extract": (380, 1300),
+    "completion": (750, 2600),
+    "embed": (90, 350),
+    "vector": (45, 180),
+    "rates": (120, 600),
+    "db": (2, 12),
+}
+
+# Every fake call, by kind
+CALLS = Counter()
+
+
+class Latency:
+    """Seeded log-normal delays per kind of call; scale=0 turns them off."""
+
+    def __init__(self, profile: dict = None, seed: int = 0, scale: float = 1.0):
+        self.profile = {**DEFAULT_LATENCY, **(profile or {})}
+        self.scale = scale
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    def sample(self, kind: str) -> float:
+        CALLS[kind] += 1
+        median, p99 = self.profile[kind]
+        if not self.scale or not median:
+            return 0.0
+        # p99 = median * exp(2.326 * sigma)
+        sigma = math.log(max(p99, median) / median) / 2.326
+        with self._lock:
+            ms = median * math.exp(self._rng.gauss(0, sigma))
+        return ms * self.scale / 1000
+
+    def sleep(self, kind: str):
+        time.sleep(self.sample(kind))
+
+    async def asleep(self, kind: str):
+        await asyncio.sleep(self.sample(kind))
+
+
+def parse_latency(specs: list[str]) -> dict:
+    """["completion=900:3000", "embed=50"] -> {kind: (median, p99)}."""
+    profile = {}
+    for spec in specs or []:
+        kind, _, values = spec.partition("=")
+        if kind not in DEFAULT_LATENCY or not values:
+            raise ValueError(f"Bad latency {spec!r}; expected KIND=MEDIAN[:P99] with KIND in {', '.join(DEFAULT_LATENCY)}")
+        median, _, p99 = values.partition(":")
+        profile[kind] = (float(median), float(p99 or median))
+    return profile
+
+
+def _tokens(text: str) -> int:
+    return max(1, len(text) // 4)
+
+
+_CODE = re.compile(r"\b[A-Z]{3}\b")
+_AMOUNT = re.compile(r"\d+(?:\.\d+)?")
+
+
+class FakeChatModel(BaseChatModel):
+    """
+    Answers the app's prompts by recognizing them: intent detection returns
+    the plan the workload gives for the question (DOCS otherwise), the
+    extraction prompts take the workload's arguments or parse the question,
+    and RAG answers echo the first sentence of the context.
+    """
+
+    latency: Any
+    plans: dict = {}
+    # Deterministic, so the LLM gateway may cache and coalesce its replies
+    temperature: float = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "fake-chat"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model": "fake-chat", "temperature": self.temperature}
+
+    def _reply(self, prompt: str) -> tuple[str, str]:
+        if "identify ALL intents" in prompt:
+            if "Questions:\n" in prompt:
+                listing = prompt.split("Questions:\n", 1)[1].split("\n\nExamples:", 1)[0]
+                questions = re.findall(r"^(\d+)\. (.*)$", listing, re.MULTILINE)
+                plans = [{"index": int(n), "intents": self._plan(q)} for n, q in questions]
+                return "detect", json.dumps({"plans": plans})
+            question = re.search(r"^Question: (.*)$", prompt, re.MULTILINE).group(1)
+            return "detect", json.dumps({"intents": self._plan(question)})
+
+        question = (re.search(r"^Question: (.*)$", prompt, re.MULTILINE) or [None, ""])[1]
+        if prompt.lstrip().startswith("Extract the date range"):
+            return "extract", self._revenue_lines(question)
+        if prompt.lstrip().startswith("Extract currency conversion"):
+            codes = _CODE.findall(question) + ["USD", "EUR"]
+            amount = (_AMOUNT.findall(question) or ["100"])[0]
+            return "extract", f"{amount},{codes[0]},{codes[1]}"
+        if prompt.lstrip().startswith("Extract the two currencies"):
+            codes = _CODE.findall(question) + ["USD", "EUR"]
+            return "extract", f"{codes[0]},{codes[1]}"
+        if "Context:" in prompt:
+            context = prompt.split("Context:", 1)[1].strip()
+            return "completion", (re.split(r"(?<=[.!?])\s", context, maxsplit=1)[0] or "I don't know")[:300]
+        return "completion", "I don't know"
+
+    def _plan(self, question: str) -> list[dict]:
+        return self.plans.get(question.strip()) or [{"intent": "DOCS", "sub_question": question}]
+
+    def _revenue_lines(self, question: str) -> str:
+        """The workload's REVENUE arguments for this (sub-)question, in REVENUE_PROMPT's format."""
+        for key, intents in self.plans.items():
+            for intent in intents or []:
+                if intent["intent"] == "REVENUE" and question.strip() in (key, intent["sub_question"]):
+                    ranges = intent.get("ranges") or [intent]
+                    lines = [f"{r['start_date']},{r['end_date']}" for r in ranges]
+                    return "\n".join(lines + ([f"BUCKET={intent['bucket']}"] if intent.get("bucket") else []))
+        return "2025-01-01,2025-01-15"
+
+    def _result(self, prompt: str, text: str) -> ChatResult:
+        usage = {"input_tokens": _tokens(prompt), "output_tokens": _tokens(text)}
+        usage["total_tokens"] = usage["input_tokens"] + usage["output_tokens"]
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=text, usage_metadata=usage))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = messages[-1].content
+        kind, text = self._reply(prompt)
+        self.latency.sleep(kind)
+        return self._result(prompt, text)
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs) -> ChatResult:
+        prompt = messages[-1].content
+        kind, text = self._reply(prompt)
+        await self.latency.asleep(kind)
+        return self._result(prompt, text)
+
+    def with_structured_output(self, schema, **kwargs):
+        # Through the model itself, so callbacks see the call and its tokens
+        return RunnableLambda(
+            lambda prompt: schema.model_validate_json(self.invoke(prompt).content),
+            afunc=lambda prompt: self._astructured(schema, prompt),
+        )
+
+    async def _astructured(self, schema, prompt):
+        return schema.model_validate_json((await self.ainvoke(prompt)).content)
+
+
+def fake_vector(text: str, dim: int = 256) -> list[float]:
+    """Hashed bag of words: texts sharing terms point the same way."""
+    vector = np.zeros(dim, dtype=np.float32)
+    for token in bm25.tokenize(text) or ["<empty>"]:
+        digest = hashlib.md5(token.encode()).digest()
+        vector[int.from_bytes(digest[:4], "little") % dim] += 1.0 if digest[4] & 1 else -1.0
+    norm = np.linalg.norm(vector)
+    return (vector / norm if norm else vector).tolist()
+
+
+class FakeEmbeddings(Embeddings):
+    def __init__(self, latency: Latency):
+        self.latency = latency
+
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        self.latency.sleep("embed")
+        return [fake_vector(text) for text in texts]
+
+    def embed_query(self, text: str) -> list[float]:
+        self.latency.sleep("embed")
+        return fake_vector(text)
+
+    async def aembed_documents(self, texts: list[str]) -> list[list[float]]:
+        await self.latency.asleep("embed")
+        return [fake_vector(text) for text in texts]
+
+    async def aembed_query(self, text: str) -> list[float]:
+        await self.latency.asleep("embed")
+        return fake_vector(text)
+
+
+class FakeIndex:
+    """In-memory stand-in for a pinecone.Index."""
+
+    def __init__(self, latency: Latency):
+        self.latency = latency
+        self.vectors = {}
+
+    def upsert(self, vectors):
+        for vector_id, values, metadata in vectors:
+            self.vectors[vector_id] = (np.asarray(values, dtype=np.float32), metadata)
+
+    def update(self, id, set_metadata):
+        if id in self.vectors:
+            values, metadata = self.vectors[id]
+            self.vectors[id] = (values, {**metadata, **set_metadata})
+
+    def delete(self, ids):
+        for vector_id in ids:
+            self.vectors.pop(vector_id, None)
+
+    def describe_index_stats(self):
+        return {"total_vector_count": len(self.vectors)}
+
+    def query(self, vector, top_k, include_metadata=True):
+        self.latency.sleep("vector")
+        query = np.asarray(vector, dtype=np.float32)
+        scored = sorted(
+            ((float(values @ query), vector_id, metadata) for vector_id, (values, metadata) in self.vectors.items()),
+            key=lambda item: item[0], reverse=True,
+        )[:top_k]
+        return {"matches": [{"id": i, "score": s, "metadata": m} for s, i, m in scored]}
+
+
+def fake_pinecone(index: FakeIndex):
+    """A pinecone.Pinecone replacement whose every index is `index`."""
+
+    class FakePinecone:
+        def __init__(self, *args, **kwargs):
+            pass
+
+        def Index(self, *args, **kwargs):
+            return index
+
+    return FakePinecone
+
+
+# Units of each currency per USD
+USD_RATES = {
+    "USD": 1.0, "EUR": 0.92, "GBP": 0.79, "JPY": 151.2, "BDT": 109.7, "CAD": 1.36,
+    "AUD": 1.52, "INR": 83.3, "CHF": 0.9, "CNY": 7.23, "SEK": 10.6, "MXN": 17.1,
+}
+
+
+class BenchTransport(httpx.AsyncBaseTransport):
+    """
+    frankfurter.app answered locally from USD_RATES; every other request
+    (the /internal API with TOOL_TRANSPORT=http) goes to the app in-process.
+    """
+
+    def __init__(self, app, latency: Latency):
+        self.latency = latency
+        self.app = httpx.ASGITransport(app=app)
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        if request.url.host != "api.frankfurter.app":
+            return await self.app.handle_async_request(request)
+        await self.latency.asleep("rates")
+        base = request.url.params.get("from", "EUR").upper()
+        if base not in USD_RATES:
+            return httpx.Response(404, json={"message": "not found"})
+        rates = {code: round(rate / USD_RATES[base], 6) for code, rate in USD_RATES.items() if code != base}
+        return httpx.Response(200, json={"amount": 1.0, "base": base, "date": "2025-01-15", "rates": rates})
+
+
+class FakeRedis(socketserver.ThreadingTCPServer):
+    """
+    Local stand-in for a Redis server: the commands app.cache sends (GET,
+    SET with PX, DEL, SCAN, AUTH, SELECT, PING), one keyspace, in memory.
+
+        with FakeRedis() as server:
+            os.environ["CACHE_REDIS_URL"] = server.url
+    """
+
+    daemon_threads = True
+    allow_reuse_address = True
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0):
+        self.data = {}  # key -> (value, expires_at or None)
+        self.lock = threading.Lock()
+        # Seconds to wait before each reply, to play a slow server
+        self.delay = 0.0
+        self.connections = set()
+        super().__init__((host, port), _RespHandler)
+        self.url = f"redis://{host}:{self.server_address[1]}/0"
+        threading.Thread(target=self.serve_forever, daemon=True).start()
+
+    def __exit__(self, *exc):
+        self.shutdown()
+        super().__exit__(*exc)
+
+    def drop_connections(self):
+        """Close every client connection, as a server restart would."""
+        with self.lock:
+            for connection in self.connections:
+                try:
+                    connection.shutdown(socket.SHUT_RDWR)
+                except OSError:
+                    pass
+            self.connections.clear()
+
+    def live(self, key: bytes):
+        entry = self.data.get(key)
+        if entry and entry[1] is not None and entry[1] <= time.time():
+            del self.data[key]
+            return None
+        return entry
+
+    def execute(self, command: str, args: list[bytes]):
+        with self.lock:
+            if command in ("PING", "AUTH", "SELECT", "FLUSHDB"):
+                if command == "FLUSHDB":
+                    self.data.clear()
+                return "+OK" if command != "PING" else "+PONG"
+            if command == "GET":
+                entry = self.live(args[0])
+                return entry[0] if entry else None
+            if command == "SET":
+                ttl = int(args[3]) / 1000 if len(args) > 3 and args[2].upper() == b"PX" else None
+                self.data[args[0]] = (args[1], time.time() + ttl if ttl else None)
+                return "+OK"
+            if command == "DEL":
+                return sum(self.data.pop(key, None) is not None for key in args)
+            if command == "SCAN":
+                pattern = args[args.index(b"MATCH") + 1].decode() if b"MATCH" in args else "*"
+                # fnmatch has no backslash escapes; the prefixes app.cache sends need none
+                keys = [k for k in list(self.data) if self.live(k) and fnmatch.fnmatchcase(k.decode(), pattern.replace("\\", ""))]
+                return [b"0", keys]
+            return f"-ERR unknown command '{command}'"
+
+
+class _RespHandler(socketserver.StreamRequestHandler):
+    def _write(self, reply):
+        if reply is None:
+            self.wfile.write(b"$-1\r\n")
+        elif isinstance(reply, str):
+            self.wfile.write(reply.encode() + b"\r\n")
+        elif isinstance(reply, int):
+            self.wfile.write(b":%d\r\n" % reply)
+        elif isinstance(reply, bytes):
+            self.wfile.write(b"$%d\r\n%s\r\n" % (len(reply), reply))
+        else:
+            self.wfile.write(b"*%d\r\n" % len(reply))
+            for item in reply:
+                self._write(item)
+
+    def handle(self):
+        with self.server.lock:
+            self.server.connections.add(self.connection)
+        while True:
+            line = self.rfile.readline()
+            if not line.startswith(b"*"):
+                return
+            args = []
+            for _ in range(int(line[1:])):
+                size = int(self.rfile.readline()[1:])
+                args.append(self.rfile.read(size + 2)[:-2])
+            if self.server.delay:
+                time.sleep(self.server.delay)
+            self._write(self.server.execute(args[0].decode().upper(), args[1:]))
@@ -0,0 +1,166 @@
+"""
+Benchmark data: the same seeded users, orders and payments either loaded
+into a throwaway Postgres database from tables.sql, or served from memory
+by stand-ins for the order and revenue services.
+"""
+import os
+import random
+import re
+from collections import defaultdict
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.schemas.internal import (
+    OrderStatusResponse, RevenueBucket, RevenueRange, RevenueSeriesResponse, RevenueSummaryResponse,
+)
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+STATUSES = ["pending", "shipped", "delivered", "failed", "cancelled"]
+CURRENCIES = ["USD", "USD", "USD", "EUR", "GBP"]
+# Payments are spread over the year before this day
+END = datetime(2025, 1, 16)
+
+
+def generate(seed: int, orders: int) -> dict:
+    rng = random.Random(seed)
+    users = [{"id": i, "name": f"User {i}", "email": f"user{i}@example.com"} for i in range(1, orders // 4 + 2)]
+    order_rows, payment_rows = [], []
+    for order_id in range(1, orders + 1):
+        created_at = END - timedelta(seconds=rng.randrange(365 * 24 * 3600))
+        currency = rng.choice(CURRENCIES)
+        amount = round(rng.uniform(5, 500), 2)
+        status = rng.choice(STATUSES)
+        order_rows.append({
+            "id": order_id, "user_id": rng.choice(users)["id"], "status": status,
+            "total_amount": amount, "currency": currency, "created_at": created_at,
+        })
+        if status not in ("pending", "cancelled"):
+            paid_at = created_at + timedelta(minutes=rng.randrange(1, 120))
+            payment_rows.append({
+                "id": len(payment_rows) + 1, "order_id": order_id, "provider": "stripe",
+                "transaction_id": f"tx_{seed}_{order_id}", "payment_method": "card",
+                "payment_status": "failed" if status == "failed" else rng.choice(["paid"] * 9 + ["refunded"]),
+                "amount": amount, "currency": currency, "paid_at": paid_at, "created_at": paid_at,
+            })
+    return {"users": users, "orders": order_rows, "payments": payment_rows}
+
+
+def _read_sql(name: str) -> str:
+    with open(os.path.join(ROOT, name)) as f:
+        return f.read()
+
+
+def setup_postgres(url: str, data: dict):
+    """
+    Recreate every table in tables.sql, exchange_rates.sql and
+    revenue_rollup.sql on `url` (dropping existing ones) and load `data`.
+    """
+    from app.services import revenue_rollup
+
+    schema = _read_sql("tables.sql")
+    rates = _read_sql("exchange_rates.sql")
+    rollup = _read_sql("revenue_rollup.sql")
+    tables = re.findall(r"CREATE TABLE (?:IF NOT EXISTS )?(\w+)", schema + rates + rollup)
+    engine = create_engine(url)
+    with engine.begin() as conn:
+        conn.exec_driver_sql(f"DROP TABLE IF EXISTS {', '.join(reversed(tables))} CASCADE")
+        conn.exec_driver_sql(schema)
+        conn.exec_driver_sql(rates)
+        conn.exec_driver_sql(_read_sql("order_notify.sql"))
+        conn.exec_driver_sql(rollup)
+        conn.execute(text("INSERT INTO users (id, name, email) VALUES (:id, :name, :email)"), data["users"])
+        conn.execute(text(
+            "INSERT INTO orders (id, user_id, status, total_amount, currency, created_at) "
+            "VALUES (:id, :user_id, :status, :total_amount, :currency, :created_at)"
+        ), data["orders"])
+        conn.execute(text(
+            "INSERT INTO payments (id, order_id, provider, transaction_id, payment_method, payment_status, "
+            "amount, currency, paid_at, created_at) VALUES (:id, :order_id, :provider, :transaction_id, "
+            ":payment_method, :payment_status, :amount, :currency, :paid_at, :created_at)"
+        ), data["payments"])
+        for table in ("users", "orders", "payments"):
+            conn.exec_driver_sql(f"SELECT setval(pg_get_serial_sequence('{table}', 'id'), (SELECT MAX(id) FROM {table}))")
+    with Session(engine) as db:
+        revenue_rollup.refresh(db, full=True)
+    engine.dispose()
+
+
+class MemoryDB:
+    """Answers the order and revenue service calls from `data`, after a `db` latency draw."""
+
+    def __init__(self, data: dict, latency):
+        self.latency = latency
+        self.orders = {
+            row["id"]: OrderStatusResponse(
+                order_id=row["id"], status=row["status"], total_amount=row["total_amount"],
+                currency=row["currency"], created_at=row["created_at"],
+            )
+            for row in data["orders"]
+        }
+        self.paid = sorted(
+            ((row["created_at"], row["currency"], row["amount"]) for row in data["payments"] if row["payment_status"] == "paid"),
+        )
+
+    def _in(self, start_date: str, end_date: str):
+        start, end = datetime.fromisoformat(start_date), datetime.fromisoformat(end_date)
+        return [p for p in self.paid if start <= p[0] <= end]
+
+    @staticmethod
+    def _totals(payments) -> list[RevenueSummaryResponse]:
+        totals = defaultdict(lambda: [0, 0.0])
+        for _, currency, amount in payments:
+            totals[currency][0] += 1
+            totals[currency][1] += amount
+        return [
+            RevenueSummaryResponse(total_payments=n, total_revenue=round(total, 2), currency=currency)
+            for currency, (n, total) in sorted(totals.items())
+        ]
+
+    async def aget_order(self, db, order_id: int):
+        await self.latency.asleep("db")
+        return self.orders.get(order_id)
+
+    async def aget_orders(self, db, order_ids: list[int]) -> dict:
+        await self.latency.asleep("db")
+        return {i: self.orders[i] for i in order_ids if i in self.orders}
+
+    async def aget_revenue_summary(self, db, start_date: str, end_date: str):
+        await self.latency.asleep("db")
+        return self._totals(self._in(start_date, end_date))
+
+    async def aget_revenue_series(self, db, ranges, bucket: str = None):
+        await self.latency.asleep("db")
+        series = []
+        for start_date, end_date in ranges:
+            payments = self._in(start_date, end_date)
+            buckets = []
+            if bucket:
+                grouped = defaultdict(list)
+                for payment in payments:
+                    day = payment[0].date()
+                    if bucket == "week":
+                        day -= timedelta(days=day.weekday())
+                    elif bucket == "month":
+                        day = day.replace(day=1)
+                    grouped[day].append(payment)
+                buckets = [
+                    RevenueBucket(period=period, currency=t.currency, total_payments=t.total_payments, total_revenue=t.total_revenue)
+                    for period in sorted(grouped) for t in self._totals(grouped[period])
+                ]
+            series.append(RevenueRange(start_date=start_date, end_date=end_date, totals=self._totals(payments), buckets=buckets))
+        return RevenueSeriesResponse(bucket=bucket, ranges=series)
+
+    def install(self):
+        """Point the services (and the rate cache's table) at this data."""
+        from app.ai.tools import rate_cache
+        from app.services import orders, revenue
+
+        orders.aget_order, orders.aget_orders = self.aget_order, self.aget_orders
+        revenue.aget_revenue_summary, revenue.aget_revenue_series = self.aget_revenue_summary, self.aget_revenue_series
+
+        async def no_stored_rates(*args):
+            return None
+
+        rate_cache._aload_from_db = rate_cache._asave_to_db = no_stored_rates
@@ -0,0 +1,16 @@
+-- EXCHANGE RATES
+-- Persistent layer of the frankfurter.app rate cache (app/ai/tools/rate_cache.py).
+-- Run after tables.sql; safe to re-run on an existing database, including
+-- one with the older exchange_rates table that tables.sql used to sketch.
+CREATE TABLE IF NOT EXISTS exchange_rates (
+    base_currency TEXT NOT NULL,
+    target_currency TEXT NOT NULL,
+    rate NUMERIC(18, 8) NOT NULL,
+    rate_date DATE,
+    -- date the rate was published for
+    updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    -- UTC time it was fetched
+    PRIMARY KEY (base_currency, target_currency)
+);
+ALTER TABLE exchange_rates ADD COLUMN IF NOT EXISTS rate_date DATE;
+ALTER TABLE exchange_rates ALTER COLUMN rate TYPE NUMERIC(18, 8);
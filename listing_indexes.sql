@@ -0,0 +1,11 @@
+-- LISTING INDEXES
+-- Keyset pagination on /data/orders and /data/payments (newest first).
+-- tables.sql creates them on a fresh database; run this on an existing one
+-- (safe to re-run). CONCURRENTLY keeps the tables writable during the build
+-- but cannot run inside a transaction, so use plain psql -f, not -1.
+-- An interrupted build leaves an INVALID index that IF NOT EXISTS skips:
+-- DROP INDEX CONCURRENTLY it and run this again.
+CREATE INDEX CONCURRENTLY IF NOT EXISTS orders_created_at_id_idx
+ON orders (created_at DESC NULLS LAST, id DESC);
+CREATE INDEX CONCURRENTLY IF NOT EXISTS payments_created_at_id_idx
+ON payments (created_at DESC NULLS LAST, id DESC);
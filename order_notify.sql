@@ -0,0 +1,19 @@
+-- ORDER CHANGE NOTIFICATIONS
+-- Publishes the ID of every updated or deleted order on the order_changed
+-- channel; app/services/order_cache.py evicts it from the order cache.
+-- Run after tables.sql. Check with:
+-- python -m app.services.order_cache <order_id>
+CREATE OR REPLACE FUNCTION notify_order_change() RETURNS trigger AS $$
+BEGIN
+    PERFORM pg_notify('order_changed', OLD.id::text);
+    IF TG_OP = 'UPDATE' AND NEW.id <> OLD.id THEN
+        PERFORM pg_notify('order_changed', NEW.id::text);
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS orders_notify_change ON orders;
+CREATE TRIGGER orders_notify_change
+AFTER UPDATE OR DELETE ON orders
+FOR EACH ROW EXECUTE FUNCTION notify_order_change();
@@ -0,0 +1,49 @@
+-- REVENUE ROLLUP
+-- Paid payments per day and currency, for complete days only, read by
+-- revenue summaries when REVENUE_USE_ROLLUP is on. Maintained by
+-- app/services/revenue_rollup.py. Run after tables.sql (safe to re-run on
+-- an existing database), then backfill with
+-- python -m app.services.revenue_rollup --backfill
+CREATE TABLE IF NOT EXISTS revenue_daily (
+    day DATE NOT NULL,
+    currency TEXT NOT NULL,
+    total_payments INT NOT NULL,
+    total_revenue NUMERIC(14, 2) NOT NULL,
+    PRIMARY KEY (day, currency)
+);
+-- Single row: every day before rolled_until is complete in revenue_daily
+CREATE TABLE IF NOT EXISTS revenue_rollup_state (
+    id BOOLEAN PRIMARY KEY DEFAULT TRUE CHECK (id),
+    rolled_until DATE NOT NULL
+);
+-- Past days whose paid payments changed (a refund, a backdated payment,
+-- a deleted row); the next refresh recomputes them, however old
+CREATE TABLE IF NOT EXISTS revenue_dirty_days (
+    day DATE PRIMARY KEY
+);
+
+-- Today's payments are left alone: today is never rolled up, and marking
+-- it would make every new payment write the same row
+CREATE OR REPLACE FUNCTION mark_revenue_days_dirty() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP = 'UPDATE'
+       AND NEW.payment_status IS NOT DISTINCT FROM OLD.payment_status
+       AND NEW.amount IS NOT DISTINCT FROM OLD.amount
+       AND NEW.currency IS NOT DISTINCT FROM OLD.currency
+       AND NEW.created_at IS NOT DISTINCT FROM OLD.created_at THEN
+        RETURN NULL;
+    END IF;
+    IF TG_OP <> 'INSERT' AND OLD.payment_status = 'paid' AND CAST(OLD.created_at AS DATE) < CURRENT_DATE THEN
+        INSERT INTO revenue_dirty_days (day) VALUES (CAST(OLD.created_at AS DATE)) ON CONFLICT DO NOTHING;
+    END IF;
+    IF TG_OP <> 'DELETE' AND NEW.payment_status = 'paid' AND CAST(NEW.created_at AS DATE) < CURRENT_DATE THEN
+        INSERT INTO revenue_dirty_days (day) VALUES (CAST(NEW.created_at AS DATE)) ON CONFLICT DO NOTHING;
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+DROP TRIGGER IF EXISTS payments_mark_revenue_days_dirty ON payments;
+CREATE TRIGGER payments_mark_revenue_days_dirty
+AFTER INSERT OR UPDATE OR DELETE ON payments
+FOR EACH ROW EXECUTE FUNCTION mark_revenue_days_dirty();
@@ -57,12 +57,11 @@ CREATE TABLE payments (
     paid_at TIMESTAMP,
     created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
 );
--- (Optional for later – NOT required for Step 4)
--- Cached exchange rates for currency conversion
--- CREATE TABLE exchange_rates (
---     base_currency TEXT NOT NULL,
---     target_currency TEXT NOT NULL,
---     rate NUMERIC(12, 6) NOT NULL,
---     updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
---     PRIMARY KEY (base_currency, target_currency)
--- );
\ No newline at end of file
+-- LISTING INDEXES
+-- Keyset pagination on /data/orders and /data/payments (newest first);
+-- listing_indexes.sql adds them to an existing database
+CREATE INDEX orders_created_at_id_idx ON orders (created_at DESC NULLS LAST, id DESC);
+CREATE INDEX payments_created_at_id_idx ON payments (created_at DESC NULLS LAST, id DESC);
+-- Raw reads for revenue summaries (today's partial day with the rollup) and the rollup refresh
+CREATE INDEX payments_paid_created_at_idx ON payments (created_at) INCLUDE (amount, currency)
+WHERE payment_status = 'paid';
@@ -0,0 +1,71 @@
+"""
+The suite runs offline: OpenAI, Pinecone and Redis are replaced by the fakes
+in benchmarks/fakes.py, and the knowledge index lives in a temporary
+directory. Tests that need Postgres are skipped unless DATABASE_URL is set.
+"""
+import asyncio
+import os
+import sys
+import tempfile
+import uuid
+
+import pytest
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import sessionmaker
+from sqlalchemy.pool import NullPool
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+# Read at import time by the app modules, so set before any of them loads
+os.environ.setdefault("OPENAI_API_KEY", "sk-test")
+os.environ.update({
+    "VECTOR_STORE": "local",
+    "KNOWLEDGE_INDEX_DIR": tempfile.mkdtemp(prefix="test-index-"),
+    "CACHE_BACKEND": "memory",
+    "WARMUP": "false",
+})
+
+SCHEMA_FILES = ("tables.sql", "exchange_rates.sql", "order_notify.sql", "revenue_rollup.sql")
+
+
+@pytest.fixture
+def database(monkeypatch):
+    """
+    A throwaway schema on DATABASE_URL with every SQL file applied, and
+    app.db's engines pointed at it; dropped afterwards. Skipped without
+    DATABASE_URL.
+    """
+    from app import db
+
+    if not db.DATABASE_URL:
+        pytest.skip("DATABASE_URL is not set")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    admin = create_engine(db.DATABASE_URL, poolclass=NullPool)
+    with admin.begin() as conn:
+        conn.exec_driver_sql(f"CREATE SCHEMA {schema}")
+
+    engine = create_engine(db.DATABASE_URL, connect_args={"options": f"-csearch_path={schema}"})
+    # NullPool: asyncpg connections belong to the event loop that opened them
+    async_engine = create_async_engine(
+        db._async_database_url(db.DATABASE_URL),
+        connect_args={"server_settings": {"search_path": schema}},
+        poolclass=NullPool,
+    )
+    try:
+        with engine.begin() as conn:
+            for name in SCHEMA_FILES:
+                with open(os.path.join(ROOT, name)) as f:
+                    conn.exec_driver_sql(f.read())
+        monkeypatch.setattr(db, "_engine", engine)
+        monkeypatch.setattr(db, "_session_factory", sessionmaker(bind=engine))
+        monkeypatch.setattr(db, "_async_engine", async_engine)
+        monkeypatch.setattr(db, "_async_session_factory", async_sessionmaker(bind=async_engine, expire_on_commit=False))
+        yield engine
+    finally:
+        engine.dispose()
+        asyncio.run(async_engine.dispose())
+        with admin.begin() as conn:
+            conn.exec_driver_sql(f"DROP SCHEMA {schema} CASCADE")
+        admin.dispose()
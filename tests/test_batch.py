@@ -0,0 +1,111 @@
+import asyncio
+
+import httpx
+import pytest
+
+from app.ai import answer_cache, router
+from app.ai.tools import order_tool
+
+# All on the local fast path, so no intent-detection LLM call is needed
+QUESTIONS = [
+    "Where is order 12?",
+    "What is your refund policy?",
+    "Where is order 12?",
+    "Status of orders 12, 15 and 19",
+    "Track order 7 and what is your refund policy?",
+]
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    """Fake prefetches and DOCS answers that record what they were asked."""
+    calls = {"orders": [], "docs": [], "embedded": []}
+
+    async def statuses(order_ids):
+        calls["orders"].append(list(order_ids))
+        return {order_id: {"status": f"shipped #{order_id}"} for order_id in order_ids}
+
+    async def embed(questions):
+        calls["embedded"].append(list(questions))
+
+    async def docs(question):
+        calls["docs"].append(question)
+        return f"Docs answer to: {question}"
+
+    monkeypatch.setattr(router, "aget_order_statuses", statuses)
+    monkeypatch.setattr(router, "aembed_questions", embed)
+    monkeypatch.setattr(router, "aask_docs", docs)
+    monkeypatch.setattr(router, "needs_embedding", lambda question: True)
+    monkeypatch.setattr(answer_cache, "enabled", lambda intent: False)
+    return calls
+
+
+def test_shared_work_is_done_once_and_answers_keep_input_order(calls):
+    results = asyncio.run(router.aanswer_batch(QUESTIONS))
+
+    assert [r.question for r in results] == QUESTIONS
+    assert all(r.error is None for r in results)
+    assert results[0].answer == results[2].answer
+    assert results[0].answer.endswith("Order #12 details: {'status': 'shipped #12'}")
+    assert "Order #15 details" in results[3].answer and "Order #19 details" in results[3].answer
+    assert results[1].answer.endswith("Docs answer to: What is your refund policy?")
+    assert "Order #7 details" in results[4].answer and "Docs answer to: what is your refund policy" in results[4].answer
+
+    assert len(calls["orders"]) == 1 and set(calls["orders"][0]) == {7, 12, 15, 19}
+    assert calls["embedded"] == [["What is your refund policy?", "what is your refund policy"]]
+    assert calls["docs"] == ["What is your refund policy?", "what is your refund policy"]
+
+
+def test_a_failed_order_prefetch_falls_back_to_the_order_handler(calls, monkeypatch):
+    async def down(order_ids):
+        raise ConnectionError("orders database is down")
+
+    async def handle_order(question, args=None):
+        if args.get("order_id") == 7:
+            raise ConnectionError("still down")
+        return f"Fallback answer to: {question}"
+
+    monkeypatch.setattr(router, "aget_order_statuses", down)
+    monkeypatch.setattr(router, "ahandle_order", handle_order)
+    results = asyncio.run(router.aanswer_batch(QUESTIONS))
+
+    assert [r.question for r in results] == QUESTIONS
+    assert results[0].answer.endswith("Fallback answer to: Where is order 12?")
+    assert results[1].answer.endswith("Docs answer to: What is your refund policy?")
+    # The order that keeps failing only affects its own section
+    assert "Error: still down" in results[4].answer and "Docs answer to" in results[4].answer
+
+
+def test_a_failed_prefetch_is_not_a_500(calls, monkeypatch):
+    from app.main import app
+
+    async def down(questions):
+        raise TimeoutError("embeddings timed out")
+
+    async def ask():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as client:
+            return await client.post("/agent/ask/batch", json={"questions": QUESTIONS[:2]})
+
+    monkeypatch.setattr(router, "aembed_questions", down)
+    response = asyncio.run(ask())
+    assert response.status_code == 200
+    order, docs = response.json()["results"]
+    assert order["answer"].endswith("Order #12 details: {'status': 'shipped #12'}")
+    assert docs["answer"].endswith("Docs answer to: What is your refund policy?")
+
+
+def test_order_lookups_over_http_stay_within_the_listing_limit(monkeypatch):
+    requested = []
+
+    async def listing(path, params=None):
+        requested.append(params["ids"])
+        return [{"order_id": order_id} for order_id in params["ids"] if order_id % 2]
+
+    monkeypatch.setattr(order_tool, "use_http_transport", lambda: True)
+    monkeypatch.setattr(order_tool, "ainternal_get", listing)
+    statuses = asyncio.run(order_tool.aget_order_statuses(list(range(2500))))
+
+    assert [len(ids) for ids in requested] == [1000, 1000, 500]
+    assert len(statuses) == 2500
+    assert statuses[3] == {"order_id": 3} and statuses[4] == order_tool.ORDER_NOT_FOUND
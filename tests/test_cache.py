@@ -0,0 +1,130 @@
+import asyncio
+import socket
+import time
+
+import pytest
+
+from app import cache
+from benchmarks.fakes import FakeRedis
+
+
+@pytest.fixture
+def redis_server():
+    with FakeRedis() as server:
+        yield server
+
+
+@pytest.fixture(params=["memory", "sqlite", "redis"])
+def backend(request, tmp_path):
+    if request.param == "memory":
+        return cache.MemoryBackend(100)
+    if request.param == "sqlite":
+        return cache.SQLiteBackend(str(tmp_path / "cache.sqlite3"))
+    return cache.RedisBackend(request.getfixturevalue("redis_server").url)
+
+
+def test_values_round_trip(backend):
+    store = cache.Cache("test", backend, ttl=60)
+    store.set("answer", {"text": "42", "sources": ["a.txt"]})
+    assert store.get("answer") == {"text": "42", "sources": ["a.txt"]}
+    assert store.get("missing", "default") == "default"
+    store.delete("answer")
+    assert store.get("answer") is None
+    assert store.stats()["hits"] == 1
+
+
+def test_entries_expire(backend):
+    store = cache.Cache("test", backend)
+    store.set("short", "lived", ttl=0.1)
+    store.set("forever", "kept", ttl=0)
+    time.sleep(0.2)
+    assert store.get("short") is None
+    assert store.get("forever") == "kept"
+
+
+def test_invalidate_clears_one_namespace(backend):
+    answers, other = cache.Cache("answers", backend), cache.Cache("answers2", backend)
+    answers.set("q", "a")
+    other.set("q", "b")
+    answers.invalidate()
+    assert answers.get("q") is None
+    assert other.get("q") == "b"
+
+
+def test_async_methods(backend):
+    store = cache.Cache("test", backend, ttl=60)
+
+    async def scenario():
+        await store.aset("k", [1, 2])
+        value = await store.aget("k")
+        await store.ainvalidate()
+        return value, await store.aget("k")
+
+    assert asyncio.run(scenario()) == ([1, 2], None)
+
+
+def test_two_sqlite_connections_share_entries(tmp_path):
+    path = str(tmp_path / "cache.sqlite3")
+    cache.Cache("shared", cache.SQLiteBackend(path)).set("k", "from worker 1")
+    assert cache.Cache("shared", cache.SQLiteBackend(path)).get("k") == "from worker 1"
+
+
+def test_redis_reconnects_after_the_connection_drops(redis_server):
+    store = cache.Cache("test", cache.RedisBackend(redis_server.url), ttl=60)
+    store.set("k", "v")
+    redis_server.drop_connections()
+    assert store.get("k") == "v"
+    assert store.stats()["errors"] == 0
+
+
+def test_slow_redis_is_a_miss_and_does_not_block_the_loop(redis_server, monkeypatch):
+    monkeypatch.setattr(cache, "CACHE_TIMEOUT", 0.05)
+    store = cache.Cache("test", cache.RedisBackend(redis_server.url), ttl=60)
+    store.set("k", "v")
+    redis_server.delay = 0.5
+
+    async def scenario():
+        ticks = 0
+
+        async def tick():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.005)
+                ticks += 1
+
+        ticker = asyncio.create_task(tick())
+        value = await store.aget("k")
+        ticker.cancel()
+        return value, ticks
+
+    started = time.monotonic()
+    value, ticks = asyncio.run(scenario())
+    assert value is None
+    assert store.stats()["errors"] == 1
+    # The first attempt and its one retry, each cut off at CACHE_TIMEOUT
+    assert time.monotonic() - started < 0.4
+    assert ticks >= 5
+
+
+def test_unreachable_redis_fails_fast_after_the_first_attempt(monkeypatch):
+    with socket.socket() as probe:
+        probe.bind(("127.0.0.1", 0))
+        port = probe.getsockname()[1]
+    connects = []
+    create_connection = socket.create_connection
+    monkeypatch.setattr(cache.socket, "create_connection", lambda *a, **k: connects.append(1) or create_connection(*a, **k))
+
+    store = cache.Cache("test", cache.RedisBackend(f"redis://127.0.0.1:{port}/0"))
+    assert store.get("k") is None
+    assert store.get("k") is None
+    assert len(connects) == 1
+    assert store.stats()["errors"] == 2
+
+
+def test_backends_must_implement_the_whole_interface():
+    class Partial(cache.CacheBackend):
+        def get(self, key):
+            return None
+
+    with pytest.raises(TypeError):
+        Partial()
@@ -0,0 +1,29 @@
+from app.knowledge import context
+
+
+def match(text, chunk=None, source="a.txt", similarity=0.9):
+    return {"metadata": {"text": text, "source": source, "chunk": chunk}, "similarity": similarity}
+
+
+def test_neighbouring_chunks_merge_with_their_overlap_once():
+    texts = context.passages([match("of the file and the second part.", 1), match("The first part of the file and the", 0)])
+    assert texts == ["The first part of the file and the second part."]
+
+
+def test_chunks_sharing_a_stale_position_are_both_kept():
+    # Incremental ingest left the unchanged chunk at its old position
+    texts = context.passages([match("Old opening kept from before.", 0), match("New opening after an edit.", 0)])
+    assert texts == ["Old opening kept from before.", "New opening after an edit."]
+
+
+def test_the_same_chunk_twice_is_sent_once():
+    texts = context.passages([match("Refunds take five days.", 3), match("Refunds take five days.", 3, similarity=0.8)])
+    assert texts == ["Refunds take five days."]
+
+
+def test_assemble_skips_irrelevant_matches_and_keeps_the_budget():
+    long = "This sentence fills the context. " * 40
+    assert context.assemble([match("Unrelated.", 0, similarity=0.1)]) is None
+    text = context.assemble([match(long, 0), match("Second source.", 0, source="b.txt")], budget=50)
+    assert context.estimate_tokens(text) <= 50
+    assert text.endswith(".")
@@ -0,0 +1,69 @@
+import pytest
+
+from app.ai import intent_classifier
+
+
+@pytest.mark.parametrize("question, intent, args", [
+    ("Where is order 12?", "ORDER", {"order_id": 12}),
+    ("What is the status of orders 12, 15 and #19?", "ORDER", {"order_ids": [12, 15, 19]}),
+    ("What is our revenue for last week?", "REVENUE", {}),
+    ("Convert 100 USD to EUR", "CURRENCY", {"amount": 100.0, "from_currency": "USD", "to_currency": "EUR"}),
+    ("What is the USD to EUR exchange rate?", "EXCHANGE", {"from_currency": "USD", "to_currency": "EUR"}),
+    ("What is your refund policy?", "DOCS", {}),
+])
+def test_single_intents(question, intent, args):
+    assert intent_classifier.classify(question) == [{"intent": intent, "sub_question": question, "args": args}]
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("Track order 7 and what is your refund policy?", [
+        ("ORDER", "Track order 7", {"order_id": 7}),
+        ("DOCS", "what is your refund policy", {}),
+    ]),
+    ("What is the status of order 5, and what was revenue last month?", [
+        ("ORDER", "What is the status of order 5", {"order_id": 5}),
+        ("REVENUE", "what was revenue last month", {}),
+    ]),
+    ("Show revenue, track order 9 and the GBP/JPY rate", [
+        ("REVENUE", "Show revenue", {}),
+        ("ORDER", "track order 9", {"order_id": 9}),
+        ("EXCHANGE", "the GBP/JPY rate", {"from_currency": "GBP", "to_currency": "JPY"}),
+    ]),
+])
+def test_multiple_intents_keep_their_order(question, expected):
+    intents = intent_classifier.classify(question)
+    assert [(i["intent"], i["sub_question"], i["args"]) for i in intents] == expected
+
+
+@pytest.mark.parametrize("question", [
+    "Hello there",
+    "What is the exchange rate?",
+    "order status please",
+    # Two intents fit one clause
+    "Can I convert my order?",
+    # One clause is clear, the other is not
+    "Track order 7 and tell me a joke",
+])
+def test_unclear_questions_are_left_to_the_llm(question):
+    assert intent_classifier.classify(question) is None
+
+
+def test_the_threshold_can_turn_the_fast_path_off():
+    assert intent_classifier.classify("Where is order 12?", threshold=1.01) is None
+
+
+@pytest.mark.parametrize("intent, clause, args", [
+    ("ORDER", "order #42", {"order_id": 42}),
+    ("ORDER", "orders 3 & 4 or 5", {"order_ids": [3, 4, 5]}),
+    ("ORDER", "my order", {}),
+    ("CURRENCY", "convert 1,250.50 usd into jpy", {"amount": 1250.5, "from_currency": "USD", "to_currency": "JPY"}),
+    ("CURRENCY", "convert some dollars", {}),
+    ("EXCHANGE", "GBP vs JPY rate", {"from_currency": "GBP", "to_currency": "JPY"}),
+    # "try" is also the Turkish lira; in lower case only an explicit pair is trusted
+    ("EXCHANGE", "try the usd to eur rate", {"from_currency": "USD", "to_currency": "EUR"}),
+    ("EXCHANGE", "try the USD rate in eur", {}),
+    ("EXCHANGE", "rate of try versus usd", {}),
+    ("REVENUE", "revenue from 2025-01-01 to 2025-01-31", {}),
+])
+def test_argument_extraction(intent, clause, args):
+    assert intent_classifier.extract_args(intent, clause) == args
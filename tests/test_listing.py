@@ -0,0 +1,78 @@
+import sqlite3
+from datetime import datetime, timedelta
+
+import pytest
+from sqlalchemy import create_engine, text
+from sqlalchemy.orm import Session
+
+from app.routers.data import ORDERS, OrderItem, _list
+from app.services import listing
+
+
+@pytest.fixture
+def session():
+    """An orders table in in-memory SQLite: ties on created_at, and rows without one."""
+    engine = create_engine("sqlite://", connect_args={"detect_types": sqlite3.PARSE_DECLTYPES})
+    start = datetime(2025, 1, 1)
+    rows = [
+        {"id": n, "status": "shipped" if n % 2 else "pending", "total_amount": n, "currency": "USD", "user_id": 1,
+         "created_at": None if n in (3, 8) else start + timedelta(days=n // 3)}
+        for n in range(1, 11)
+    ]
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE orders (id INTEGER PRIMARY KEY, status TEXT, total_amount NUMERIC, currency TEXT,"
+            " user_id INTEGER, created_at TIMESTAMP)"
+        ))
+        conn.execute(text(
+            "INSERT INTO orders VALUES (:id, :status, :total_amount, :currency, :user_id, :created_at)"
+        ), rows)
+    with Session(engine) as db:
+        yield db
+
+
+def _pages(db, limit, **criteria):
+    columns = ORDERS.columns("order_id")
+    ids, cursor = [], None
+    while True:
+        rows, cursor = listing.fetch_page(db, ORDERS, columns, limit, cursor=cursor, **criteria)
+        ids.append([row.id for row in rows])
+        if cursor is None:
+            return ids
+
+
+def test_pages_cover_every_row_once_with_nulls_last(session):
+    pages = _pages(session, 3, filters={})
+    # Newest first, ties by id; the two rows without created_at at the end
+    assert sum(pages, []) == [10, 9, 7, 6, 5, 4, 2, 1, 8, 3]
+    assert [len(page) for page in pages] == [3, 3, 3, 1]
+
+
+def test_pages_apply_filters_across_the_null_phase(session):
+    pages = _pages(session, 2, filters={"status": "shipped"})
+    assert sum(pages, []) == [9, 7, 5, 1, 3]
+    assert listing.count_rows(session, ORDERS, {"status": "shipped"}) == 5
+
+
+def test_keyset_predicates_have_no_or(session):
+    rows, cursor = listing.fetch_page(session, ORDERS, ORDERS.columns(None), 2, filters={})
+    for sql, _ in ORDERS.queries(ORDERS.columns(None), {}, cursor=cursor, limit=3):
+        assert " OR " not in str(sql)
+
+
+def test_a_created_at_range_skips_the_null_phase(session):
+    _, cursor = listing.fetch_page(session, ORDERS, ORDERS.columns(None), 2, filters={})
+    parts = ORDERS.queries(ORDERS.columns(None), {}, created_from=datetime(2024, 1, 1), cursor=cursor)
+    assert len(parts) == 1
+
+
+def test_a_bad_cursor_is_rejected():
+    with pytest.raises(listing.InvalidListing):
+        ORDERS.queries(ORDERS.columns(None), {}, cursor="not-a-cursor")
+
+
+def test_only_the_first_page_counts_every_row(session):
+    first = _list(ORDERS, OrderItem, "orders", None, 3, None, "json", session, {}, None, None)
+    assert first["total"] == 10 and first["count"] == 3
+    second = _list(ORDERS, OrderItem, "orders", None, 3, first["next_cursor"], "json", session, {}, None, None)
+    assert "total" not in second and second["count"] == 3
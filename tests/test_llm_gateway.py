@@ -0,0 +1,128 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from app.ai import llm_gateway
+
+
+class SlowModel(BaseChatModel):
+    """Echoes the prompt after `delay` seconds and records how many calls overlapped."""
+
+    delay: float = 0.05
+    temperature: float = 0
+    calls: int = 0
+    active: int = 0
+    peak: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "slow"
+
+    @property
+    def _identifying_params(self) -> dict:
+        return {"model": "slow", "temperature": self.temperature}
+
+    def _enter(self):
+        self.calls += 1
+        self.active += 1
+        self.peak = max(self.peak, self.active)
+
+    def _result(self, messages) -> ChatResult:
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="A:" + messages[-1].content))])
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._enter()
+        try:
+            time.sleep(self.delay)
+            return self._result(messages)
+        finally:
+            self.active -= 1
+
+    async def _agenerate(self, messages, stop=None, run_manager=None, **kwargs):
+        self._enter()
+        try:
+            await asyncio.sleep(self.delay)
+            return self._result(messages)
+        finally:
+            self.active -= 1
+
+
+@pytest.fixture
+def budget(monkeypatch):
+    """Two gateway-wide slots and a fresh reply cache."""
+    monkeypatch.setattr(llm_gateway, "LLM_CACHE_SIZE", 100)
+    monkeypatch.setattr(llm_gateway, "_cache", llm_gateway.cache.get_cache("llm-test", ttl=60, size=100))
+    monkeypatch.setattr(llm_gateway, "_global_limit", llm_gateway._Budget(2))
+    monkeypatch.setattr(llm_gateway, "_purpose_limits", {})
+
+
+def test_cancelled_leader_does_not_fail_followers(budget):
+    model = SlowModel(delay=0.1)
+    llm = llm_gateway.LLM(model)
+
+    async def scenario():
+        leader = asyncio.create_task(llm.ainvoke("same"))
+        await asyncio.sleep(0.01)
+        followers = [asyncio.create_task(llm.ainvoke("same")) for _ in range(3)]
+        await asyncio.sleep(0.01)
+        leader.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await leader
+        return await asyncio.gather(*followers)
+
+    replies = asyncio.run(scenario())
+    assert [reply.content for reply in replies] == ["A:same"] * 3
+    # The cancelled call and one follower's retry; the other followers coalesced on it
+    assert model.calls == 2
+
+
+def test_timeout_of_one_caller_leaves_the_others(budget):
+    llm = llm_gateway.LLM(SlowModel(delay=0.1))
+
+    async def scenario():
+        short = asyncio.wait_for(llm.ainvoke("q"), 0.02)
+        long = llm.ainvoke("q")
+        return await asyncio.gather(short, long, return_exceptions=True)
+
+    short, long = asyncio.run(scenario())
+    assert isinstance(short, asyncio.TimeoutError)
+    assert long.content == "A:q"
+
+
+def test_sync_and_async_callers_share_one_budget(budget):
+    model = SlowModel(delay=0.05)
+    llm = llm_gateway.LLM(model)
+
+    async def many():
+        await asyncio.gather(*(llm.ainvoke(f"async {n}") for n in range(6)))
+
+    threads = [threading.Thread(target=llm.invoke, args=(f"sync {n}",)) for n in range(4)]
+    threads.append(threading.Thread(target=asyncio.run, args=(many(),)))
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert model.calls == 10
+    assert model.peak <= 2
+
+
+def test_cancelled_waiter_returns_its_slot():
+    limit = llm_gateway._Budget(1)
+
+    async def scenario():
+        await limit.aacquire()
+        waiter = asyncio.create_task(limit.aacquire())
+        await asyncio.sleep(0)
+        waiter.cancel()
+        limit.release()
+        with pytest.raises(asyncio.CancelledError):
+            await waiter
+        await asyncio.wait_for(limit.aacquire(), 1)
+
+    asyncio.run(scenario())
@@ -0,0 +1,92 @@
+import asyncio
+from datetime import datetime
+
+import pytest
+from sqlalchemy import text
+
+from app import db
+from app.schemas.internal import OrderStatusResponse
+from app.services import order_cache, orders as orders_service
+from app.services.order_loader import OrderLoader
+
+
+@pytest.fixture
+def cache():
+    order_cache._set_active(True)
+    yield order_cache
+    order_cache._set_active(False)
+
+
+def _order(order_id: int, status: str) -> OrderStatusResponse:
+    return OrderStatusResponse(order_id=order_id, status=status, total_amount=10, currency="USD", created_at=datetime(2025, 1, 1))
+
+
+def test_a_read_that_started_before_an_invalidation_is_not_stored(cache):
+    stale = cache.token()
+    cache.invalidate(1)
+    cache.put({1: _order(1, "pending"), 2: _order(2, "shipped")}, stale)
+    assert cache.get(1) is None
+    # Rows the invalidation did not touch are still fine to keep
+    assert cache.get(2).status == "shipped"
+
+    cache.put({1: _order(1, "shipped")}, cache.token())
+    assert cache.get(1).status == "shipped"
+
+
+def test_rows_read_before_the_listener_connected_are_not_stored():
+    order_cache._set_active(False)
+    before = order_cache.token()
+    order_cache._set_active(True)
+    try:
+        order_cache.put({1: _order(1, "pending")}, before)
+        assert order_cache.get(1) is None
+    finally:
+        order_cache._set_active(False)
+
+
+async def _wait_for(condition, timeout: float = 5):
+    for _ in range(int(timeout / 0.05)):
+        if condition():
+            return True
+        await asyncio.sleep(0.05)
+    return False
+
+
+async def _set_status(order_id: int, status: str):
+    async with db.get_async_engine().begin() as conn:
+        await conn.execute(text("UPDATE orders SET status = :status WHERE id = :id"), {"status": status, "id": order_id})
+
+
+def test_notify_evicts_updated_orders(database):
+    with database.begin() as conn:
+        conn.execute(text("INSERT INTO users (id, name, email) VALUES (1, 'Ada', 'ada@example.com')"))
+        conn.execute(text("INSERT INTO orders (id, user_id, status, total_amount) VALUES (7, 1, 'pending', 42)"))
+
+    async def scenario():
+        listener = asyncio.create_task(order_cache.listen_loop())
+        try:
+            assert await _wait_for(lambda: order_cache.stats()["active"]), "listener did not connect"
+            loader = OrderLoader(window=0)
+
+            assert (await loader.load(7)).status == "pending"
+            assert order_cache.get(7).status == "pending"
+
+            await _set_status(7, "shipped")
+            assert await _wait_for(lambda: order_cache.get(7) is None), "no notification received"
+            assert (await loader.load(7)).status == "shipped"
+
+            # A read that races an update: it sees the old row, and only
+            # finishes storing it after the notification arrived
+            read_token = order_cache.token()
+            async with db.AsyncSessionLocal() as session:
+                stale = await orders_service.aget_orders(session, [7])
+            await _set_status(7, "delivered")
+            assert await _wait_for(lambda: order_cache.get(7) is None), "no notification received"
+            order_cache.put(stale, read_token)
+            assert order_cache.get(7) is None
+            assert (await loader.load(7)).status == "delivered"
+        finally:
+            listener.cancel()
+            await asyncio.gather(listener, return_exceptions=True)
+
+    asyncio.run(scenario())
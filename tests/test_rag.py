@@ -0,0 +1,100 @@
+import asyncio
+
+import pytest
+
+from app.ai import llm_gateway
+from app.knowledge import bm25, context, ingest, query
+from app.knowledge.vector_store import LocalStore
+from benchmarks.fakes import FakeChatModel, FakeEmbeddings, Latency, fake_vector
+
+SHIPPING = (
+    "Standard shipping takes five to seven business days within the country. "
+    "Express shipping arrives in two business days and costs twelve dollars."
+)
+RETURNS = (
+    "Returns are accepted within thirty days of delivery. "
+    "Refunds go back to the original payment method once the parcel is inspected."
+)
+
+
+def paragraph(opening: str) -> str:
+    # Long enough that every paragraph becomes its own chunk
+    return opening + " " + " ".join(f"Warranty detail number {n} applies here." for n in range(9))
+
+
+@pytest.fixture
+def knowledge(tmp_path, monkeypatch):
+    """
+    A docs directory ingested into its own local store and BM25 index, with
+    fake embeddings and a fake chat model that answers with the first
+    sentence of the context.
+    """
+    index_dir, docs = tmp_path / "index", tmp_path / "docs"
+    docs.mkdir()
+    store = LocalStore(str(index_dir / "local_store"))
+    embeddings = FakeEmbeddings(Latency(scale=0))
+
+    monkeypatch.setattr(ingest, "INDEX_DIR", str(index_dir))
+    monkeypatch.setattr(ingest, "OpenAIEmbeddings", lambda: embeddings)
+    monkeypatch.setattr(ingest, "get_vector_store", lambda backend=None: store)
+    monkeypatch.setattr(query, "get_vector_store", lambda backend=None: store)
+    monkeypatch.setattr(bm25, "BM25_FILE", str(index_dir / "bm25.json"))
+    monkeypatch.setattr(bm25, "_loaded", {"mtime": None, "index": None})
+    monkeypatch.setattr(query, "embeddings", embeddings)
+    monkeypatch.setattr(query, "llm", llm_gateway.LLM(FakeChatModel(latency=Latency(scale=0))))
+    # Hashed bag-of-words vectors are far less similar than real embeddings
+    monkeypatch.setattr(context, "DOCS_MIN_SIMILARITY", 0.2)
+
+    def write(filename, *paragraphs):
+        (docs / filename).write_text("\n\n".join(paragraphs) + "\n")
+        return ingest.ingest(str(docs), backend="local")
+
+    return write
+
+
+def test_ingested_docs_answer_questions(knowledge):
+    stats = knowledge("shipping.txt", SHIPPING)
+    assert stats["upserted"] == 1
+    knowledge("returns.txt", RETURNS)
+
+    question = "How long does standard shipping take?"
+    assert query.ask(question) == SHIPPING.split(". ")[0] + "."
+    assert asyncio.run(query.aask("How many days do I have for returns?")).startswith("Returns are accepted")
+
+    async def streamed():
+        return "".join([part async for part in query.astream(question)])
+
+    assert asyncio.run(streamed()) == query.ask(question)
+    assert query.ask("Which planets orbit the sun?") == query.FALLBACK_ANSWER
+
+
+def positions(*openings) -> list[int]:
+    """Stored position of the chunk starting with each opening, in the vector store and the BM25 index."""
+    stored = {m["metadata"]["text"].split(" Warranty detail")[0]: m["metadata"]["chunk"]
+              for m in query.get_vector_store().query(fake_vector("warranty"), 10)}
+    lexical = {meta["text"].split(" Warranty detail")[0]: meta["chunk"] for meta in bm25.get_index().metadata}
+    assert stored == lexical
+    return [stored[opening] for opening in openings]
+
+
+def test_an_edit_above_kept_chunks_updates_their_positions(knowledge):
+    first, second = paragraph("Warranty covers screens."), paragraph("Warranty covers batteries.")
+    knowledge("warranty.txt", first, second)
+    # Only the new opening is embedded; the two kept chunks move down one
+    stats = knowledge("warranty.txt", paragraph("Warranty covers keyboards."), first, second)
+    assert (stats["upserted"], stats["moved"], stats["unchanged"]) == (1, 2, 2)
+    openings = ("Warranty covers keyboards.", "Warranty covers screens.", "Warranty covers batteries.")
+    assert positions(*openings) == [0, 1, 2]
+
+    question = "What does the warranty cover?"
+    prompt = query._build_prompt(question, query.retrieve(question))
+    # Neighbours are merged in file order
+    assert [prompt.index(opening) for opening in openings] == sorted(prompt.index(o) for o in openings)
+
+
+def test_reordering_a_file_embeds_nothing_and_moves_its_chunks(knowledge):
+    first, second = paragraph("Warranty covers screens."), paragraph("Warranty covers batteries.")
+    knowledge("warranty.txt", first, second)
+    stats = knowledge("warranty.txt", second, first)
+    assert (stats["upserted"], stats["moved"], stats["deleted"]) == (0, 2, 0)
+    assert positions("Warranty covers batteries.", "Warranty covers screens.") == [0, 1]
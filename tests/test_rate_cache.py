@@ -0,0 +1,182 @@
+import asyncio
+import json
+import threading
+import time
+
+import httpx
+import pytest
+import requests
+
+from app.ai.tools import rate_cache
+
+RATES = {"EUR": 0.9, "GBP": 0.8}
+
+
+class FakeFrankfurter:
+    """Stand-in for frankfurter.app, for both the requests and the httpx path."""
+
+    def __init__(self):
+        self.calls = 0
+        self.down = False
+        self.delay = 0.0
+        self.rates = dict(RATES)
+        self._lock = threading.Lock()
+
+    def _reply(self, base: str) -> dict:
+        with self._lock:
+            self.calls += 1
+        return {"base": base, "date": "2025-01-02", "rates": dict(self.rates)}
+
+    def get(self, url, params=None, timeout=None):
+        time.sleep(self.delay)
+        if self.down:
+            raise requests.ConnectionError("frankfurter is down")
+        response = requests.Response()
+        response.status_code = 200
+        response._content = json.dumps(self._reply(params["from"])).encode()
+        return response
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        await asyncio.sleep(self.delay)
+        if self.down:
+            raise httpx.ConnectError("frankfurter is down", request=request)
+        return httpx.Response(200, json=self._reply(request.url.params["from"]))
+
+
+@pytest.fixture
+def upstream(monkeypatch):
+    """A fake upstream, empty in-memory caches and a dict in place of the exchange_rates table."""
+    fake = FakeFrankfurter()
+    client = httpx.AsyncClient(transport=httpx.MockTransport(fake.handle))
+    monkeypatch.setattr(rate_cache.requests, "get", fake.get)
+    monkeypatch.setattr(rate_cache, "get_async_client", lambda: client)
+    for name in ("_snapshots", "_retry_at", "_sync_locks", "_inflight"):
+        monkeypatch.setattr(rate_cache, name, {})
+
+    fake.stored = {}
+
+    def save(snapshot):
+        fake.stored[snapshot.base] = snapshot
+
+    async def asave(snapshot):
+        save(snapshot)
+
+    async def aload(base):
+        return fake.stored.get(base)
+
+    monkeypatch.setattr(rate_cache, "_load_from_db", fake.stored.get)
+    monkeypatch.setattr(rate_cache, "_save_to_db", save)
+    monkeypatch.setattr(rate_cache, "_aload_from_db", aload)
+    monkeypatch.setattr(rate_cache, "_asave_to_db", asave)
+    return fake
+
+
+def expire(base: str, seconds: float):
+    """Make every cached snapshot of `base` this many seconds older."""
+    rate_cache._snapshots[base].fetched_at -= seconds
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_rates_are_fetched_once_then_served_from_memory(upstream, mode):
+    get_rate = rate_cache.get_rate if mode == "sync" else lambda *pair: asyncio.run(rate_cache.aget_rate(*pair))
+    quote = get_rate("usd", "eur")
+    assert (quote.from_currency, quote.to_currency, quote.rate, quote.stale) == ("USD", "EUR", 0.9, False)
+    assert get_rate("USD", "GBP").rate == 0.8
+    assert upstream.calls == 1
+    assert upstream.stored["USD"].rates == RATES
+    assert get_rate("EUR", "EUR").rate == 1.0 and upstream.calls == 1
+
+
+def test_concurrent_async_misses_share_one_fetch(upstream):
+    upstream.delay = 0.05
+
+    async def many():
+        return await asyncio.gather(*(rate_cache.aget_rate("USD", "EUR") for _ in range(20)))
+
+    assert {quote.rate for quote in asyncio.run(many())} == {0.9}
+    assert upstream.calls == 1
+
+
+def test_concurrent_sync_misses_share_one_fetch(upstream):
+    upstream.delay = 0.05
+    quotes = []
+    threads = [threading.Thread(target=lambda: quotes.append(rate_cache.get_rate("USD", "EUR"))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(quotes) == 8 and upstream.calls == 1
+
+
+def test_expired_rates_are_refetched(upstream):
+    rate_cache.get_rate("USD", "EUR")
+    upstream.rates["EUR"] = 0.95
+    expire("USD", rate_cache.RATE_CACHE_TTL + 1)
+    # The stored copy is just as old, so it does not count as fresh either
+    quote = rate_cache.get_rate("USD", "EUR")
+    assert quote.rate == 0.95 and not quote.stale and upstream.calls == 2
+
+
+def test_a_restart_reads_fresh_rates_from_the_table(upstream, monkeypatch):
+    asyncio.run(rate_cache.aget_rate("USD", "EUR"))
+    monkeypatch.setattr(rate_cache, "_snapshots", {})
+    assert asyncio.run(rate_cache.aget_rate("USD", "GBP")).rate == 0.8
+    assert upstream.calls == 1
+
+
+@pytest.mark.parametrize("mode", ["sync", "async"])
+def test_stale_rates_are_served_while_the_upstream_is_down(upstream, mode):
+    get_rate = rate_cache.get_rate if mode == "sync" else lambda *pair: asyncio.run(rate_cache.aget_rate(*pair))
+    get_rate("USD", "EUR")
+    expire("USD", rate_cache.RATE_CACHE_TTL + 1)
+    upstream.down = True
+
+    quote = get_rate("USD", "EUR")
+    assert quote.rate == 0.9 and quote.stale
+    # Within RATE_RETRY_BACKOFF the upstream is not asked again
+    assert get_rate("USD", "GBP").stale and upstream.calls == 1
+
+    # Past RATE_STALE_MAX the old rates are no longer good enough
+    expire("USD", rate_cache.RATE_STALE_MAX)
+    rate_cache._retry_at.clear()
+    with pytest.raises(rate_cache.RateUnavailable):
+        get_rate("USD", "EUR")
+
+
+def test_an_unknown_currency_is_reported(upstream):
+    with pytest.raises(rate_cache.RateUnavailable, match="USD to XYZ"):
+        rate_cache.get_rate("USD", "XYZ")
+
+
+def test_refresh_loop_keeps_known_bases_warm_and_survives_failures(upstream, monkeypatch):
+    monkeypatch.setattr(rate_cache, "RATE_PREFETCH_BASES", ["USD"])
+    monkeypatch.setattr(rate_cache, "RATE_REFRESH_INTERVAL", 0.01)
+    rate_cache.get_snapshot("EUR")
+
+    async def outage_then_recovery():
+        task = asyncio.create_task(rate_cache.refresh_loop())
+        upstream.down = True
+        await asyncio.sleep(0.05)
+        assert rate_cache._snapshots.keys() == {"EUR"}
+
+        upstream.down = False
+        upstream.rates["GBP"] = 0.85
+        rate_cache._retry_at.clear()
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(outage_then_recovery())
+    # Every known base is refetched, fresh or not, along with the prefetched ones
+    assert rate_cache._snapshots.keys() == {"EUR", "USD"}
+    assert rate_cache._snapshots["EUR"].rates["GBP"] == 0.85
+
+
+def test_rates_round_trip_through_the_table(database):
+    snapshot = rate_cache.RateSnapshot("USD", "2025-01-02", dict(RATES), time.time() - 60)
+    rate_cache._save_to_db(snapshot)
+    stored = rate_cache._load_from_db("USD")
+    assert stored.rates == RATES and stored.date == "2025-01-02"
+    assert abs(stored.fetched_at - snapshot.fetched_at) < 1
+    assert asyncio.run(rate_cache._aload_from_db("USD")).rates == RATES
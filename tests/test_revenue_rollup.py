@@ -0,0 +1,68 @@
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import text
+
+from app import db
+from app.services import revenue, revenue_rollup
+
+
+def test_ranges_join_consecutive_dirty_days_before_the_regular_chunks():
+    day = date(2025, 3, 1)
+    dirty = [day, day + timedelta(days=1), day + timedelta(days=5)]
+    assert revenue_rollup._ranges(dirty, date(2025, 4, 1), date(2025, 4, 3)) == [
+        (day, day + timedelta(days=2)),
+        (day + timedelta(days=5), day + timedelta(days=6)),
+        (date(2025, 4, 1), date(2025, 4, 3)),
+    ]
+
+
+def _summary(session, use_rollup: bool, monkeypatch, start: str, end: str):
+    monkeypatch.setattr(revenue, "REVENUE_USE_ROLLUP", use_rollup)
+    return sorted((r.currency, r.total_payments, float(r.total_revenue)) for r in revenue.get_revenue_summary(session, start, end))
+
+
+def test_rollup_follows_changes_to_old_payments(database, monkeypatch):
+    today = datetime.combine(date.today(), datetime.min.time())
+    payments = [
+        (1, "paid", 100, "USD", today - timedelta(days=40)),
+        (2, "paid", 50, "USD", today - timedelta(days=10)),
+        (3, "paid", 20, "EUR", today - timedelta(days=10)),
+        (4, "failed", 70, "USD", today - timedelta(days=3)),
+        (5, "paid", 5, "USD", today + timedelta(hours=1)),
+    ]
+    with db.SessionLocal() as session:
+        session.execute(text("INSERT INTO users (id, name, email) VALUES (1, 'Ada', 'ada@example.com')"))
+        session.execute(text("INSERT INTO orders (id, user_id, status, total_amount) VALUES (1, 1, 'delivered', 245)"))
+        session.execute(
+            text(
+                "INSERT INTO payments (id, order_id, provider, payment_status, amount, currency, created_at) "
+                "VALUES (:id, 1, 'test', :status, :amount, :currency, :created_at)"
+            ),
+            [dict(zip(("id", "status", "amount", "currency", "created_at"), p)) for p in payments],
+        )
+        session.commit()
+        revenue_rollup.refresh(session, full=True)
+
+        # Far behind the watermark: a refund, a late success, a backdated payment, a deletion
+        session.execute(text("UPDATE payments SET payment_status = 'refunded' WHERE id = 1"))
+        session.execute(text("UPDATE payments SET payment_status = 'paid' WHERE id = 4"))
+        session.execute(text(
+            "INSERT INTO payments (id, order_id, provider, payment_status, amount, currency, created_at) "
+            "VALUES (6, 1, 'test', 'paid', 30, 'USD', :created_at)"
+        ), {"created_at": today - timedelta(days=60)})
+        session.execute(text("DELETE FROM payments WHERE id = 3"))
+        # Not a revenue change, so no day is marked
+        session.execute(text("UPDATE payments SET paid_at = created_at WHERE id = 2"))
+        session.commit()
+
+        dirty = session.execute(text("SELECT day FROM revenue_dirty_days ORDER BY day")).scalars().all()
+        assert dirty == [(today - timedelta(days=n)).date() for n in (60, 40, 10, 3)]
+
+        stats = revenue_rollup.refresh(session)
+        assert stats["dirty_days"] == 4
+        assert session.execute(text("SELECT COUNT(*) FROM revenue_dirty_days")).scalar() == 0
+
+        start, end = (today - timedelta(days=90)).isoformat(), (today + timedelta(days=1)).isoformat()
+        raw = _summary(session, False, monkeypatch, start, end)
+        assert raw == [("USD", 4, 155.0)]
+        assert _summary(session, True, monkeypatch, start, end) == raw
@@ -0,0 +1,62 @@
+import threading
+
+import pytest
+
+from app.knowledge.vector_store import LocalStore, VectorStore
+from benchmarks.fakes import fake_vector
+
+
+def chunk(text: str) -> tuple:
+    return text, fake_vector(text), {"text": text}
+
+
+def test_a_store_must_implement_the_interface():
+    class Incomplete(VectorStore):
+        def query(self, vector, top_k):
+            return []
+
+    with pytest.raises(TypeError):
+        Incomplete()
+
+
+def test_upsert_replace_and_delete(tmp_path):
+    store = LocalStore(str(tmp_path))
+    assert store.query(fake_vector("refunds"), 3) == []
+
+    store.upsert([chunk("refunds take five days"), chunk("shipping is free")])
+    store.upsert([("shipping is free", fake_vector("shipping costs nothing"), {"text": "shipping costs nothing"})])
+    best = store.query(fake_vector("shipping costs nothing"), 1)[0]
+    assert best["id"] == "shipping is free" and best["metadata"]["text"] == "shipping costs nothing"
+
+    store.update_metadata([("shipping is free", {"text": "shipping is free", "chunk": 2}), ("unknown", {})])
+    best = store.query(fake_vector("shipping costs nothing"), 1)[0]
+    assert best["metadata"] == {"text": "shipping is free", "chunk": 2} and best["score"] > 0.99
+
+    store.delete(["refunds take five days"])
+    assert [m["id"] for m in store.query(fake_vector("refunds"), 5)] == ["shipping is free"]
+    # Another process opening the same files sees the same rows
+    assert [m["id"] for m in LocalStore(str(tmp_path)).query(fake_vector("refunds"), 5)] == ["shipping is free"]
+
+
+def test_reads_during_writes_see_consistent_rows(tmp_path):
+    store = LocalStore(str(tmp_path))
+    store.upsert([chunk(f"seed chunk {n}") for n in range(5)])
+    done, mismatches = threading.Event(), []
+
+    def read():
+        while not done.is_set():
+            for match in store.query(fake_vector("chunk"), 50):
+                if match["metadata"]["text"] != match["id"]:
+                    mismatches.append(match)
+
+    readers = [threading.Thread(target=read) for _ in range(4)]
+    for reader in readers:
+        reader.start()
+    for n in range(40):
+        store.upsert([chunk(f"chunk {n}")])
+        if n % 3 == 0:
+            store.delete([f"chunk {n - 1}"])
+    done.set()
+    for reader in readers:
+        reader.join()
+    assert mismatches == []